@@ -0,0 +1,77 @@
+# Copyright 2014 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Micro-benchmark for output port coalescing.
+#
+# Counts the event bus sends made for a stream of messages and measures
+# the time to send them, on a plain port and on coalescing ports. The
+# output module can only be imported within a Vertigo component, so the
+# component module is replaced by a stub before it is imported, and a
+# stub Java port counts the values passed to the event bus.
+#
+# Run with:
+#   vertx run benchmarks/coalesce_benchmark.py -cp src/main/resources
+import sys, time, types
+
+class _Config(object):
+    def context(self):
+        return self
+    def component(self):
+        return self
+    def config(self):
+        return None
+
+_component = types.ModuleType('vertigo.component')
+_component._component = _Config()
+sys.modules['vertigo.component'] = _component
+
+from vertigo.output import OutputPort
+
+class StubPort(object):
+    """A Java output port that counts sends and never fills."""
+    def __init__(self):
+        self.sends = 0
+    def name(self):
+        return 'out'
+    def send(self, value):
+        self.sends += 1
+    def sendQueueFull(self):
+        return False
+    def drainHandler(self, handler):
+        pass
+
+MESSAGES = 100000
+
+def bench(max_messages):
+    """Returns the event bus sends and the time in microseconds per message."""
+    java_obj = StubPort()
+    port = OutputPort(java_obj)
+    if max_messages is not None:
+        port.coalesce(max_messages, max_delay_ms=1000)
+    message = {'user': 'user1', 'body': 'foo'}
+    start = time.time()
+    for i in xrange(MESSAGES):
+        port.send(message)
+    port.flush()
+    return java_obj.sends, (time.time() - start) * 1000000.0 / MESSAGES
+
+def run():
+    print '%-14s %14s %14s' % ('port', 'sends', 'time')
+    for name, max_messages in (('plain', None), ('coalesce 50', 50), ('coalesce 500', 500)):
+        sends, elapsed = bench(max_messages)
+        print '%-14s %14d %11.3fus' % (name, sends, elapsed)
+
+# The first run warms up the JIT.
+run()
+run()
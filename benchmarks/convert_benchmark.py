@@ -0,0 +1,103 @@
+# Copyright 2014 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Micro-benchmark for message conversion.
+#
+# Compares vertigo.convert against the isinstance() chain built on
+# core.javautils that the input and output modules previously used.
+#
+# Run with:
+#   vertx run benchmarks/convert_benchmark.py -cp src/main/resources
+import time
+import org.vertx.java.core.json.JsonObject
+import org.vertx.java.core.json.JsonArray
+from java.lang import Long, Double, Integer
+from java.util import Map, Set, Collection
+from core.javautils import map_seq_to_java, map_dict_to_java, map_map_from_java, map_set_from_java, map_collection_from_java
+from vertigo.convert import map_to_vertx, map_from_vertx
+
+def legacy_to_vertx(value):
+    if value is None:
+        return value
+    if isinstance(value, (list, tuple)):
+        return org.vertx.java.core.json.JsonArray(map_seq_to_java(value))
+    elif isinstance(value, dict):
+        return org.vertx.java.core.json.JsonObject(map_dict_to_java(value))
+    elif isinstance(value, long):
+        return Long(value)
+    elif isinstance(value, float):
+        return Double(value)
+    elif isinstance(value, int):
+        return Integer(value)
+    return value
+
+def legacy_from_vertx(value):
+    if value is None:
+        return value
+    if isinstance(value, Map):
+        return map_map_from_java(value)
+    elif isinstance(value, Set):
+        return map_set_from_java(value)
+    elif isinstance(value, Collection):
+        return map_collection_from_java(value)
+    elif isinstance(value, org.vertx.java.core.json.JsonObject):
+        return map_map_from_java(value.toMap())
+    elif isinstance(value, org.vertx.java.core.json.JsonArray):
+        result = []
+        iter = value.iterator()
+        while iter.hasNext():
+            result.append(legacy_from_vertx(iter.next()))
+        return result
+    return value
+
+def nested(depth):
+    root = current = {}
+    for i in range(depth):
+        current['child'] = {'depth': i}
+        current = current['child']
+    return root
+
+PAYLOADS = (
+    ('string', 'Hello world!'),
+    ('integer', 12345),
+    ('flat dict', dict([('field%d' % i, i) for i in range(20)])),
+    ('mixed dict', {'id': 1, 'name': 'foo', 'score': 1.5, 'tags': ['a', 'b', 'c'], 'meta': {'x': 1, 'y': [1, 2, 3]}}),
+    ('list of dicts', [{'word': 'apple', 'count': i} for i in range(50)]),
+    ('nested (depth 100)', nested(100)),
+)
+
+ITERATIONS = 10000
+
+def bench(convert, value, iterations):
+    start = time.time()
+    for i in xrange(iterations):
+        convert(value)
+    return (time.time() - start) * 1000000.0 / iterations
+
+def run():
+    print '%-20s %14s %14s %14s %14s' % ('payload', 'legacy to', 'to', 'legacy from', 'from')
+    for name, payload in PAYLOADS:
+        iterations = ITERATIONS
+        if name.startswith('nested'):
+            iterations = ITERATIONS / 10
+        vertx_value = map_to_vertx(payload)
+        print '%-20s %11.2fus %11.2fus %11.2fus %11.2fus' % (name,
+            bench(legacy_to_vertx, payload, iterations),
+            bench(map_to_vertx, payload, iterations),
+            bench(legacy_from_vertx, vertx_value, iterations),
+            bench(map_from_vertx, vertx_value, iterations))
+
+# The first run warms up the JIT.
+run()
+run()
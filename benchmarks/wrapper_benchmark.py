@@ -0,0 +1,115 @@
+# Copyright 2014 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Micro-benchmark for the batch and group wrappers.
+#
+# Measures the heap footprint and creation time of the slotted input and
+# output wrappers, against a baseline of the same wrappers holding their
+# state in an instance dictionary as they did before they were slotted.
+# The input and output modules can only be imported within a Vertigo
+# component, so the component module is replaced by a stub before they
+# are imported. The wrappers only hold a reference to the Java object
+# they wrap, so a plain JsonObject stands in for it.
+#
+# Binding ports to handlers, so that module functions such as
+# output.send('out', ...) skip their port lookup, is out of scope here.
+#
+# Run with:
+#   vertx run benchmarks/wrapper_benchmark.py -cp src/main/resources
+import sys, time, types
+import org.vertx.java.core.json.JsonObject
+from java.lang import Runtime, System
+
+_component = types.ModuleType('vertigo.component')
+_component._component = object()
+sys.modules['vertigo.component'] = _component
+
+from vertigo.input import InputBatch, InputGroup
+from vertigo.output import OutputBatch, OutputGroup
+
+# Baseline: dictionary-based copies of the wrappers. They hold the same
+# state as the real wrappers, but in an instance dictionary rather than in
+# slots. They are only used by this benchmark.
+
+class LegacyInput(object):
+    def __init__(self, java_obj, decode=None, trace=None):
+        self.java_obj = java_obj
+        self._decode = decode
+        self._trace = trace
+        self._dedupe = self._metrics = self._batcher = None
+
+class LegacyInputBatch(LegacyInput):
+    pass
+
+class LegacyInputGroup(LegacyInput):
+    pass
+
+class LegacyOutput(object):
+    def __init__(self, java_obj, encode=None):
+        self.java_obj = java_obj
+        self._encode = encode
+        self._adaptive = self._metrics = self._waiting = self._drain = None
+
+class LegacyOutputBatch(LegacyOutput):
+    pass
+
+class LegacyOutputGroup(LegacyOutput):
+    pass
+
+def identity(value):
+    return value
+
+WRAPPERS = (
+    ('input batch', LegacyInputBatch, InputBatch, (identity, None)),
+    ('input group', LegacyInputGroup, InputGroup, (identity, None)),
+    ('output batch', LegacyOutputBatch, OutputBatch, (identity,)),
+    ('output group', LegacyOutputGroup, OutputGroup, (identity,)),
+)
+
+ITERATIONS = 100000
+
+def used():
+    runtime = Runtime.getRuntime()
+    for i in range(3):
+        System.gc()
+    return runtime.totalMemory() - runtime.freeMemory()
+
+def footprint(wrapper, args, count):
+    """Returns the heap bytes held by each live wrapper."""
+    java_obj = org.vertx.java.core.json.JsonObject()
+    before = used()
+    wrappers = [wrapper(java_obj, *args) for i in xrange(count)]
+    after = used()
+    del wrappers
+    return float(after - before) / count
+
+def bench(wrapper, args, iterations):
+    """Returns the time in microseconds to create a wrapper."""
+    java_obj = org.vertx.java.core.json.JsonObject()
+    start = time.time()
+    for i in xrange(iterations):
+        wrapper(java_obj, *args)
+    return (time.time() - start) * 1000000.0 / iterations
+
+def run():
+    print '%-14s %-10s %14s %14s' % ('wrapper', 'layout', 'size', 'time')
+    for name, legacy, wrapper, args in WRAPPERS:
+        for layout, cls in (('dict', legacy), ('slots', wrapper)):
+            print '%-14s %-10s %12.1fB %11.3fus' % (name, layout,
+                footprint(cls, args, ITERATIONS),
+                bench(cls, args, ITERATIONS))
+
+# The first run warms up the JIT.
+run()
+run()
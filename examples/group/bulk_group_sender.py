@@ -0,0 +1,28 @@
+# Copyright 2014 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from vertigo import component, output
+
+sentences = [
+    'Oak is strong and also gives shade',
+    'Cats and dogs each hate the other',
+    'The pipe began to rust while new',
+    'Open the crate but don\'t break the glass',
+    'Add the sum to the product of these three',
+]
+
+# Sends a 'sentences' group holding a nested 'words' group for each
+# sentence in a single call, without a callback for each group.
+@component.start_handler
+def start_handler(error):
+    output.send_group('out', 'sentences', [sentence.split(' ') for sentence in sentences], nested='words')
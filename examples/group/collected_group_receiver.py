@@ -0,0 +1,23 @@
+# Copyright 2014 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from vertigo import input
+
+# The handler is called once a sentences group and all of its nested
+# words groups have been received. Groups that stop receiving messages
+# for 30 seconds, for instance because their sender crashed, are evicted
+# instead of being buffered for as long as the component runs.
+@input.collect_group(port='in', group='sentences', nested=('words',), max_bytes=1048576, timeout=30)
+def sentences_handler(group):
+    counts = [len(words) for words in group.groups.get('words', [])]
+    print 'Received %d sentences in group %s with word counts %s' % (len(counts), group.id, counts)
@@ -0,0 +1,20 @@
+# Copyright 2014 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from vertigo import input
+
+# A windowed alternative to word_counter.py. Rather than sending a running
+# total for every word received, word counts are aggregated over one
+# second tumbling windows, and each word's count is sent on the out port
+# when its window closes.
+input.window('in', size=1000, key=lambda word: word, output='out')
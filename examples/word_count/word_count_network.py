@@ -16,7 +16,7 @@ import vertigo
 network = vertigo.create_network('word_count')
 network.add_verticle('word_feeder', 'word_count_feeder.py', config={'words': ['apple', 'banana', 'orange']})
 network.add_verticle('word_counter', 'word_count_worker.py', instances=2)
-network.create_connection(('word_feeder', 'out'), ('word_counter', 'in'), grouping='hash')
+network.create_connection(('word_feeder', 'out'), ('word_counter', 'in'), selector='hash')
 
 def deploy_handler(error, context):
     if error:
@@ -11,16 +11,17 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-import vertx
+import vertx, random
 from vertigo import component, output
 
 @component.start_handler
 def start_handler(error=None):
     if not error:
-        words = vertx.config['words']
+        words = vertx.config()['words']
 
-        def do_send():
-            while not output.port('out').send_queue_full():
-                output.port('out').send(words[rand(len(words)-1)])
-            output.port('out').drain_handler(do_send)
-        do_send()
+        # Stream an endless sequence of random words. The stream pauses
+        # whenever the port's send queue is full and resumes once it drains.
+        def feed():
+            while True:
+                yield random.choice(words)
+        output.stream('out', feed())
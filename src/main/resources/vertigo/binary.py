@@ -0,0 +1,132 @@
+# Copyright 2014 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import org.vertx.java.core.buffer.Buffer
+from core.buffer import Buffer
+
+def raw_from_vertx(value):
+    """Passes a Vert.x value through for a raw port.
+
+    Vert.x buffers are wrapped in a BufferView without copying their
+    contents. All other values are passed through unchanged.
+    """
+    if isinstance(value, org.vertx.java.core.buffer.Buffer):
+        return BufferView(value)
+    return value
+
+def raw_to_vertx(value):
+    """Converts a binary value to a Vert.x buffer for a raw port.
+
+    Buffer views and Vert.x buffers are sent without copying. Strings are
+    copied into a new buffer as raw bytes.
+    """
+    if isinstance(value, BufferView):
+        return value.to_java_buffer()
+    elif isinstance(value, org.vertx.java.core.buffer.Buffer):
+        return value
+    elif isinstance(value, Buffer):
+        return value._to_java_buffer()
+    elif isinstance(value, str):
+        buffer = org.vertx.java.core.buffer.Buffer(len(value))
+        buffer.appendBytes(value)
+        return buffer
+    raise TypeError("Raw ports can only send binary data, got %r" % (value,))
+
+class BufferView(object):
+    """Read-only view of a Vert.x buffer.
+
+    Views share the underlying buffer's memory. Slicing a view returns
+    another view of the same memory, and values are read directly from the
+    buffer without copying it into Jython.
+    """
+    __slots__ = ('java_obj', 'offset', 'length')
+
+    def __init__(self, java_obj, offset=0, length=None):
+        self.java_obj = java_obj
+        self.offset = offset
+        if length is None:
+            length = java_obj.length() - offset
+        self.length = length
+
+    def __len__(self):
+        return self.length
+
+    def _index(self, pos, size=1):
+        if pos < 0:
+            pos += self.length
+        if pos < 0 or pos + size > self.length:
+            raise IndexError("buffer index out of range")
+        return self.offset + pos
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.length)
+            if step != 1:
+                raise ValueError("Buffer views do not support extended slices.")
+            return BufferView(self.java_obj, self.offset + start, max(stop - start, 0))
+        return self.java_obj.getByte(self._index(index)) & 0xff
+
+    def __iter__(self):
+        get_byte = self.java_obj.getByte
+        for pos in xrange(self.offset, self.offset + self.length):
+            yield get_byte(pos) & 0xff
+
+    def get_byte(self, pos):
+        """Reads a signed byte at the given position."""
+        return self.java_obj.getByte(self._index(pos))
+
+    def get_short(self, pos):
+        """Reads a big-endian short at the given position."""
+        return self.java_obj.getShort(self._index(pos, 2))
+
+    def get_int(self, pos):
+        """Reads a big-endian int at the given position."""
+        return self.java_obj.getInt(self._index(pos, 4))
+
+    def get_long(self, pos):
+        """Reads a big-endian long at the given position."""
+        return self.java_obj.getLong(self._index(pos, 8))
+
+    def get_float(self, pos):
+        """Reads a big-endian float at the given position."""
+        return self.java_obj.getFloat(self._index(pos, 4))
+
+    def get_double(self, pos):
+        """Reads a big-endian double at the given position."""
+        return self.java_obj.getDouble(self._index(pos, 8))
+
+    def get_string(self, start=0, end=None, encoding='UTF-8'):
+        """Decodes a range of the view as a string."""
+        if end is None:
+            end = self.length
+        self._index(start, end - start)
+        return self.java_obj.getString(self.offset + start, self.offset + end, encoding)
+
+    def tostring(self):
+        """Copies the contents of the view into a byte string."""
+        return self.java_obj.getBytes(self.offset, self.offset + self.length).tostring()
+
+    def to_java_buffer(self):
+        """Returns a Vert.x buffer for the view.
+
+        A view of a whole buffer returns the buffer itself. Other views
+        return a buffer sharing the same memory.
+        """
+        if self.offset == 0 and self.length == self.java_obj.length():
+            return self.java_obj
+        return org.vertx.java.core.buffer.Buffer(self.java_obj.getByteBuf().slice(self.offset, self.length))
+
+    _to_java_buffer = to_java_buffer
+
+    def __repr__(self):
+        return '<BufferView offset=%d length=%d>' % (self.offset, self.length)
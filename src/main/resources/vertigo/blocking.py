@@ -0,0 +1,115 @@
+# Copyright 2014 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import sys, component, logger
+import org.vertx.java.core.Handler
+import org.vertx.java.platform.impl.JythonVerticleFactory
+from core.event_bus import EventBus
+from watchdog import BlockingDetector
+
+if component._component is None:
+    raise ImportError("Not a valid Vertigo component.")
+
+this = sys.modules[__name__]
+
+# The active detector, if blocking detection is enabled.
+_detector = None
+
+def detect(threshold_ms=100, address=None, multi_threaded=False):
+    """Enables event loop blocking detection.
+
+    Message handlers registered with input.message_handler(), before or
+    after detection is enabled, are watched by a background thread. A
+    handler that holds the event loop for longer than the threshold is
+    logged with a sample of its stack, and the component is advised to be
+    deployed as a worker. Worker components are not watched.
+
+    Keyword arguments:
+    @param threshold_ms: The time in milliseconds after which a handler is considered blocking.
+    @param address: An optional event bus address to which to publish advice.
+    @param multi_threaded: Whether to advise deploying the component as a
+    multi-threaded worker. Only advise this for thread-safe handlers.
+
+    @return: The blocking detector.
+    """
+    global _detector
+    if _detector is None:
+        def blocked(handler, elapsed, first):
+            _blocked(handler, elapsed, first, address)
+        context = org.vertx.java.platform.impl.JythonVerticleFactory.vertx.currentContext()
+        def run_on_context(function, *args):
+            context.runOnContext(_ContextCall(function, args))
+        _detector = BlockingDetector(threshold_ms, multi_threaded, blocked, run_on_context=run_on_context)
+        if _is_worker():
+            _detector.enabled = False
+        else:
+            _detector.start()
+    return _detector
+
+def wrap(name, handler):
+    """Wraps a handler to be watched while blocking detection is enabled.
+
+    Message handlers are registered with and without the wrapper, and the
+    wrapped handler is only called once detection has been enabled, so
+    handlers registered before detection is enabled are watched once it
+    is. While detection is not enabled, the wrapper only checks whether it
+    is.
+
+    Keyword arguments:
+    @param name: A name identifying the handler in reports.
+    @param handler: The handler to wrap.
+
+    @return: The wrapped handler.
+    """
+    def watched(*args):
+        detector = _detector
+        if detector is None or not detector.enabled:
+            return handler(*args)
+        return detector.call(name, handler, args)
+    return watched
+
+def advice():
+    """Returns the deployment advice for the component.
+
+    @return: A list of advice dictionaries, one for each blocking handler.
+    """
+    if _detector is None:
+        return []
+    context = component._component.context().component()
+    return _detector.advice(context.network().name(), context.name())
+
+def _is_worker():
+    context = component._component.context().component()
+    return hasattr(context, 'isWorker') and context.isWorker()
+
+def _blocked(handler, elapsed, first, address):
+    """Logs a blocking handler and publishes advice when it first blocks."""
+    if handler.stack is not None:
+        stack = '\n    '.join(handler.stack)
+    else:
+        stack = '(ended before its stack could be sampled)'
+    logger.warn("%s in component %s has blocked the event loop for %d ms (threshold %d ms):\n    %s\n"
+                "Consider deploying the component with %s"
+                % (handler.name, component._component.context().address(), elapsed, _detector.threshold / 1000000,
+                   stack, _detector.recommendation()))
+    if first and address is not None:
+        context = component._component.context().component()
+        EventBus.publish(address, _detector.handler_advice(handler, context.network().name(), context.name()))
+
+class _ContextCall(org.vertx.java.core.Handler):
+    """Calls a function on the component's context."""
+    def __init__(self, function, args):
+        self.function = function
+        self.args = args
+    def handle(self, void):
+        self.function(*self.args)
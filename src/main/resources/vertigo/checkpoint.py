@@ -0,0 +1,174 @@
+# Copyright 2014 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os, re, tempfile, cPickle
+
+# Active checkpointers, checkpointed together when batches end.
+_checkpointers = []
+
+_FILE = re.compile(r'^(snapshot|delta)-(\d+)\.pkl$')
+
+def batch_ended():
+    """Checkpoints all stores configured to checkpoint when a batch ends."""
+    for checkpointer in _checkpointers:
+        if checkpointer.on_batch_end:
+            checkpointer.checkpoint()
+
+def default_directory(address, name):
+    """Returns the default checkpoint directory for a component's store."""
+    return os.path.join(tempfile.gettempdir(), 'vertigo-checkpoint', '%s-%s' % (address, name))
+
+def _records(f):
+    """Iterates over the records of a snapshot file, loading one at a time."""
+    while True:
+        try:
+            record = cPickle.load(f)
+        except EOFError:
+            return
+        if isinstance(record, list):
+            # Snapshots written as a single list of items.
+            for item in record:
+                yield item
+        else:
+            yield record
+
+class Checkpointer(object):
+    """Incremental checkpoints of a state store.
+
+    Each checkpoint writes either a full snapshot of the store or a delta
+    of the keys updated and deleted since the previous checkpoint. Deltas
+    are only written for stores that track their changes, such as
+    vertigo.state.StateStore, and every snapshot_every checkpoints a new
+    snapshot replaces the previous snapshot and its deltas. Restoring loads
+    the latest snapshot and applies the deltas written after it in order.
+
+    Checkpoint files are written to a temporary file and renamed, so a
+    crash while checkpointing leaves the previous checkpoint intact.
+
+    Keyword arguments:
+    @param store: The state store, or any dictionary.
+    @param directory: The directory in which to write checkpoints.
+    @param snapshot_every: The number of checkpoints after which to write a new snapshot.
+    @param on_batch_end: Whether to checkpoint whenever an input batch ends.
+    """
+    def __init__(self, store, directory, snapshot_every=10, on_batch_end=True):
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.store = store
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        self.on_batch_end = on_batch_end
+        self.restored = False
+        self.sequence, self.deltas = self._latest()
+
+    def _files(self):
+        files = []
+        for name in os.listdir(self.directory):
+            match = _FILE.match(name)
+            if match is not None:
+                files.append((int(match.group(2)), match.group(1), os.path.join(self.directory, name)))
+        files.sort()
+        return files
+
+    def _latest(self):
+        """Returns the latest sequence number and the number of deltas since the latest snapshot."""
+        sequence, deltas = 0, None
+        for number, kind, path in self._files():
+            sequence = number
+            if kind == 'snapshot':
+                deltas = 0
+            elif deltas is not None:
+                deltas += 1
+        return sequence, deltas
+
+    def _write(self, kind, records):
+        self.sequence += 1
+        path = os.path.join(self.directory, '%s-%d.pkl' % (kind, self.sequence))
+        f = open(path + '.tmp', 'wb')
+        try:
+            for record in records:
+                cPickle.dump(record, f, 2)
+        finally:
+            f.close()
+        os.rename(path + '.tmp', path)
+        return path
+
+    def checkpoint(self):
+        """Writes a checkpoint of the store.
+
+        @return: The path of the checkpoint file, or None if nothing changed.
+        """
+        changes = getattr(self.store, 'changes', None)
+        if changes is not None and self.deltas is not None and self.deltas < self.snapshot_every:
+            updated, deleted = changes()
+            if not updated and not deleted:
+                return None
+            self.deltas += 1
+            return self._write('delta', [(updated, deleted)])
+        return self.snapshot()
+
+    def snapshot(self):
+        """Writes a full snapshot of the store and removes older checkpoints.
+
+        Each key and value is written as a separate record, read from the
+        store's scan() where it has one, so spilled state is not loaded
+        into memory all at once.
+
+        @return: The path of the snapshot file.
+        """
+        if hasattr(self.store, 'changes'):
+            self.store.changes()
+        if hasattr(self.store, 'scan'):
+            items = self.store.scan()
+        else:
+            items = self.store.iteritems()
+        path = self._write('snapshot', items)
+        for number, kind, old in self._files():
+            if number < self.sequence:
+                os.remove(old)
+        self.deltas = 0
+        return path
+
+    def restore(self):
+        """Restores the store from the latest snapshot and its deltas.
+
+        @return: The number of checkpoint files applied.
+        """
+        files = self._files()
+        start = None
+        for i in range(len(files)):
+            if files[i][1] == 'snapshot':
+                start = i
+        applied = 0
+        if start is not None:
+            store = self.store
+            for number, kind, path in files[start:]:
+                f = open(path, 'rb')
+                try:
+                    if kind == 'snapshot':
+                        for key, value in _records(f):
+                            store[key] = value
+                    else:
+                        updated, deleted = cPickle.load(f)
+                        for key, value in updated.items():
+                            store[key] = value
+                        for key in deleted:
+                            if key in store:
+                                del store[key]
+                finally:
+                    f.close()
+                applied += 1
+            if hasattr(store, 'changes'):
+                store.changes()
+        self.restored = True
+        return applied
@@ -0,0 +1,82 @@
+# Copyright 2014 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import org.vertx.java.core.json.JsonObject
+import org.vertx.java.core.json.JsonArray
+import org.vertx.java.core.buffer.Buffer
+
+# The field of a Json object holding coalesced messages.
+COALESCED = 'vertigo.coalesced'
+
+def pack(values):
+    """Packs encoded messages into a single envelope.
+
+    Keyword arguments:
+    @param values: A list of encoded Json messages.
+
+    @return: A Json object holding the messages in order.
+    """
+    array = org.vertx.java.core.json.JsonArray()
+    for value in values:
+        if isinstance(value, org.vertx.java.core.json.JsonObject):
+            array.addObject(value)
+        elif isinstance(value, org.vertx.java.core.json.JsonArray):
+            array.addArray(value)
+        else:
+            array.add(value)
+    envelope = org.vertx.java.core.json.JsonObject()
+    envelope.putArray(COALESCED, array)
+    return envelope
+
+def is_coalesced(value):
+    """Indicates whether a received value is an envelope of coalesced messages."""
+    return isinstance(value, org.vertx.java.core.json.JsonObject) and value.containsField(COALESCED)
+
+def unpack(value):
+    """Returns the messages packed into an envelope, in order."""
+    array = value.getArray(COALESCED)
+    return [array.get(i) for i in range(array.size())]
+
+def packets(values, max_messages):
+    """Splits encoded messages into the values to send on the event bus.
+
+    Runs of Json messages are packed into envelopes of at most max_messages
+    messages. Buffers, such as raw and compressed messages, cannot be held
+    in an envelope and are sent on their own. A run of a single message is
+    sent unpacked.
+
+    Keyword arguments:
+    @param values: A list of encoded messages.
+    @param max_messages: The maximum number of messages per envelope.
+
+    @return: A list of values to send, in order.
+    """
+    result, run = [], []
+    for value in values:
+        if isinstance(value, org.vertx.java.core.buffer.Buffer):
+            _pack_run(run, result)
+            run = []
+            result.append(value)
+        else:
+            run.append(value)
+            if len(run) == max_messages:
+                _pack_run(run, result)
+                run = []
+    _pack_run(run, result)
+    return result
+
+def _pack_run(run, result):
+    if len(run) == 1:
+        result.append(run[0])
+    elif run:
+        result.append(pack(run))
@@ -0,0 +1,223 @@
+# Copyright 2014 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import time, vertx
+import org.vertx.java.core.Handler
+import org.vertx.java.core.json.JsonObject
+import org.vertx.java.core.json.JsonArray
+import org.vertx.java.core.buffer.Buffer
+
+_OBJECT, _ARRAY, _VALUE = 0, 1, 2
+
+def _pack(value):
+    """Packs a Vert.x value into a compact form and returns it with its size in bytes."""
+    if isinstance(value, org.vertx.java.core.json.JsonObject):
+        data = value.encode()
+        return (_OBJECT, data), len(data)
+    elif isinstance(value, org.vertx.java.core.json.JsonArray):
+        data = value.encode()
+        return (_ARRAY, data), len(data)
+    elif isinstance(value, basestring):
+        return (_VALUE, value), len(value)
+    elif isinstance(value, org.vertx.java.core.buffer.Buffer):
+        return (_VALUE, value), value.length()
+    return (_VALUE, value), 16
+
+def _unpack(packed):
+    kind, data = packed
+    if kind == _OBJECT:
+        return org.vertx.java.core.json.JsonObject(data)
+    elif kind == _ARRAY:
+        return org.vertx.java.core.json.JsonArray(data)
+    return data
+
+class CollectedGroup(object):
+    """A completely received group.
+
+    Messages are held in their serialized form and decoded as they are
+    iterated. Nested groups are available by name.
+    """
+    def __init__(self, name, id, messages, groups, decode):
+        self.name = name
+        self.id = id
+        self.groups = groups
+        self._messages = messages
+        self._decode = decode
+
+    def __len__(self):
+        return len(self._messages)
+
+    def __iter__(self):
+        decode = self._decode
+        for packed in self._messages:
+            yield decode(_unpack(packed))
+
+    def messages(self):
+        """Returns a list of the group's decoded messages."""
+        return list(self)
+
+    def __repr__(self):
+        return '<CollectedGroup %s id=%s messages=%d>' % (self.name, self.id, len(self._messages))
+
+class _Assembly(object):
+    """A group being received."""
+    def __init__(self, collector, name, id, root=None):
+        self.collector = collector
+        self.name = name
+        self.id = id
+        self.root = root or self
+        self.messages = []
+        self.groups = {}
+        self.bytes = 0
+        self.started = self.updated = collector.clock()
+        self.evicted = False
+
+    def add(self, value):
+        root = self.root
+        if root.evicted:
+            return
+        packed, size = _pack(value)
+        self.messages.append(packed)
+        root.bytes += size
+        root.updated = self.collector.clock()
+        self.collector._grow(root, size)
+
+    def complete(self):
+        return CollectedGroup(self.name, self.id, self.messages, self.groups, self.collector.decode)
+
+class GroupCollector(object):
+    """Reassembles groups received on an input within a memory budget.
+
+    Members of each group, including named nested groups, are buffered in
+    serialized form until the group ends, and the completed group is then
+    passed to the handler. Groups that have not received a message for
+    timeout seconds are evicted, as are the oldest groups whenever the
+    buffered groups exceed max_bytes. Evicted groups are passed to the
+    evict handler, and their remaining messages are dropped.
+
+    Keyword arguments:
+    @param handler: A handler to be called with each completed group.
+    @param decode: The function decoding Vert.x values into messages.
+    @param nested: The names of nested groups to collect.
+    @param max_bytes: The maximum number of bytes to buffer across groups.
+    @param timeout: The time in seconds after which an inactive group is evicted.
+    @param on_evict: An optional handler to be called with a dictionary
+    describing each evicted group.
+    @param strip: An optional function removing transport fields from
+    received values before they are buffered.
+    """
+    def __init__(self, handler, decode, nested=(), max_bytes=16777216, timeout=60, on_evict=None, strip=None, clock=time.time):
+        self.handler = handler
+        self.decode = decode
+        self.nested = nested
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.on_evict = on_evict
+        self.strip = strip
+        self.clock = clock
+        self.groups = {}
+        self.bytes = 0
+        self.evicted = 0
+        self.timer_id = vertx.set_periodic(max(100, int(timeout * 500)), self.sweep)
+
+    def group_handler(self, name):
+        """Returns a Java handler collecting received groups of the given name."""
+        return _GroupHandler(self, name)
+
+    def start(self, java_group, name, parent=None):
+        """Starts collecting a received Java input group."""
+        if parent is None:
+            assembly = _Assembly(self, name, java_group.id())
+            self.groups[assembly.id] = assembly
+        else:
+            assembly = _Assembly(self, name, java_group.id(), parent.root)
+        java_group.messageHandler(_MessageHandler(assembly, self.strip))
+        for nested in self.nested:
+            java_group.groupHandler(nested, _GroupHandler(self, nested, assembly))
+        java_group.endHandler(_EndHandler(self, assembly, parent))
+
+    def _grow(self, root, size):
+        self.bytes += size
+        if self.bytes > self.max_bytes:
+            assemblies = [(assembly.started, assembly) for assembly in self.groups.values()]
+            assemblies.sort()
+            for started, assembly in assemblies:
+                if self.bytes <= self.max_bytes:
+                    break
+                self._evict(assembly, 'over budget')
+
+    def _end(self, assembly, parent):
+        root = assembly.root
+        if root.evicted:
+            return
+        group = assembly.complete()
+        if parent is not None:
+            parent.groups.setdefault(assembly.name, []).append(group)
+        else:
+            del self.groups[assembly.id]
+            self.bytes -= assembly.bytes
+            self.handler(group)
+
+    def _evict(self, assembly, reason):
+        assembly.evicted = True
+        del self.groups[assembly.id]
+        self.bytes -= assembly.bytes
+        self.evicted += 1
+        info = {
+            'name': assembly.name,
+            'id': assembly.id,
+            'reason': reason,
+            'messages': len(assembly.messages),
+            'bytes': assembly.bytes,
+            'age': self.clock() - assembly.started,
+        }
+        if self.on_evict is not None:
+            self.on_evict(info)
+
+    def sweep(self, timer_id=None):
+        """Evicts groups that have been inactive for longer than the timeout."""
+        expired = self.clock() - self.timeout
+        for assembly in self.groups.values():
+            if assembly.updated < expired:
+                self._evict(assembly, 'timed out')
+
+    def close(self):
+        """Stops the collector's eviction timer."""
+        vertx.cancel_timer(self.timer_id)
+
+class _MessageHandler(org.vertx.java.core.Handler):
+    def __init__(self, assembly, strip=None):
+        self.assembly = assembly
+        self.strip = strip
+    def handle(self, message):
+        if self.strip is not None:
+            self.strip(message)
+        self.assembly.add(message)
+
+class _GroupHandler(org.vertx.java.core.Handler):
+    def __init__(self, collector, name, parent=None):
+        self.collector = collector
+        self.name = name
+        self.parent = parent
+    def handle(self, group):
+        if self.parent is not None and self.parent.root.evicted:
+            return
+        self.collector.start(group, self.name, self.parent)
+
+class _EndHandler(org.vertx.java.core.Handler):
+    def __init__(self, collector, assembly, parent):
+        self.collector = collector
+        self.assembly = assembly
+        self.parent = parent
+    def handle(self, void):
+        self.collector._end(self.assembly, self.parent)
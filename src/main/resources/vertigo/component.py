@@ -38,9 +38,89 @@ def start_handler(handler):
     __start_handler = handler
     __check_start()
 
+def profile(sample_rate=0.01, output=None, interval=10000):
+    """Enables the sampling profiler for the component's handlers.
+
+    A sample of the invocations of message, group and batch handlers on
+    input ports is timed and profiled by call stack, including handlers
+    registered before the profiler was enabled. The profiler is off by default and
+    can be toggled at runtime with the returned profiler's enable() and
+    disable() methods.
+
+    Keyword arguments:
+    @param sample_rate: The fraction of handler invocations to profile.
+    @param output: An optional path of a file to which to periodically write reports.
+    @param interval: The interval in milliseconds at which to write reports.
+
+    @return: The profiler.
+    """
+    import profiler
+    return profiler.start(sample_rate, output, interval)
+
+def state(name='state', max_bytes=16777216, path=None):
+    """Returns a keyed state store for the component.
+
+    The store is a dictionary-like object whose least recently used keys
+    are spilled to disk once the estimated size of the keys held in memory
+    exceeds the memory budget. Stores are created on first use and shared
+    by name within the component instance.
+
+    Keyword arguments:
+    @param name: The name of the store.
+    @param max_bytes: The approximate memory budget of the store in bytes.
+    @param path: The path of the on-disk store. Defaults to a file in the
+    system temporary directory named after the component instance.
+
+    @return: The state store.
+    """
+    import state
+    return state.open_store(name, _component.context().address(), max_bytes, path)
+
+def checkpoint(store=None, name='state', directory=None, interval=None, on_batch_end=True, snapshot_every=10):
+    """Enables checkpointing of a state store.
+
+    The store is checkpointed whenever an input batch ends and, if an
+    interval is given, periodically. When the component starts, the store
+    is restored from its latest checkpoint before the start handler is
+    called. If the component has already started, the store is restored
+    immediately.
+
+    Keyword arguments:
+    @param store: The store to checkpoint. Defaults to the named component state store.
+    @param name: The name of the store, used to name the default store and directory.
+    @param directory: The checkpoint directory. Defaults to a directory in the
+    system temporary directory named after the component instance.
+    @param interval: An optional checkpoint interval in milliseconds.
+    @param on_batch_end: Whether to checkpoint whenever an input batch ends.
+    @param snapshot_every: The number of checkpoints after which to write a full snapshot.
+
+    @return: The checkpointer.
+    """
+    import checkpoint, vertx
+    address = _component.context().address()
+    if store is None:
+        store = state(name)
+    if directory is None:
+        directory = checkpoint.default_directory(address, name)
+    checkpointer = checkpoint.Checkpointer(store, directory, snapshot_every, on_batch_end)
+    checkpoint._checkpointers.append(checkpointer)
+    if interval is not None:
+        vertx.set_periodic(interval, lambda timer_id: checkpointer.checkpoint())
+    if __started is not None:
+        checkpointer.restore()
+    return checkpointer
+
+def __restore():
+    import checkpoint
+    for checkpointer in checkpoint._checkpointers:
+        if not checkpointer.restored:
+            checkpointer.restore()
+
 class StartHandler(org.vertx.java.core.AsyncResultHandler):
     def handle(self, result):
         global __started
+        if result.succeeded():
+            __restore()
         __started = result
         __check_start()
 
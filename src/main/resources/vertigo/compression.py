@@ -0,0 +1,148 @@
+# Copyright 2014 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import jarray
+import org.vertx.java.core.json.JsonObject
+import org.vertx.java.core.json.JsonArray
+import org.vertx.java.core.buffer.Buffer
+from java.lang import String
+from java.io import (
+    ByteArrayInputStream,
+    ByteArrayOutputStream
+)
+from java.util.zip import (
+    Deflater,
+    DeflaterOutputStream,
+    InflaterInputStream,
+    GZIPOutputStream,
+    GZIPInputStream
+)
+
+# Compressed messages are sent as buffers starting with this marker,
+# followed by a codec byte, a type byte and the compressed payload.
+COMPRESSED = '\x00vzc'
+_HEADER = len(COMPRESSED) + 2
+
+def _zlib_output(stream, level):
+    return DeflaterOutputStream(stream, Deflater(level))
+
+def _gzip_output(stream, level):
+    return GZIPOutputStream(stream)
+
+_CODECS = {
+    'zlib': (_zlib_output, InflaterInputStream),
+    'gzip': (_gzip_output, GZIPInputStream),
+}
+
+_CODEC_IDS = {'zlib': 1, 'gzip': 2}
+_CODEC_NAMES = dict([(codec_id, name) for name, codec_id in _CODEC_IDS.items()])
+_OBJECT, _ARRAY, _BUFFER = 1, 2, 3
+
+def _deflate(data, codec, level):
+    output = ByteArrayOutputStream(len(data) / 2)
+    stream = _CODECS[codec][0](output, level)
+    stream.write(data)
+    stream.close()
+    return output.toByteArray()
+
+def _inflate(data, codec):
+    stream = _CODECS[codec][1](ByteArrayInputStream(data))
+    output = ByteArrayOutputStream(len(data) * 4)
+    buffer = jarray.zeros(8192, 'b')
+    count = stream.read(buffer)
+    while count >= 0:
+        output.write(buffer, 0, count)
+        count = stream.read(buffer)
+    stream.close()
+    return output.toByteArray()
+
+def compressor(encode, codec='zlib', threshold=4096, level=6):
+    """Wraps an encoder to compress large messages.
+
+    Encoded Json objects, Json arrays and buffers whose serialized size is
+    at least threshold bytes are compressed and sent as a buffer starting
+    with the COMPRESSED marker. Json is measured by its UTF-8 encoded
+    length. Smaller messages are sent unchanged.
+
+    Keyword arguments:
+    @param encode: The encoder to wrap.
+    @param codec: The compression codec, either 'zlib' or 'gzip'.
+    @param threshold: The minimum size in bytes of messages to compress.
+    @param level: The zlib compression level.
+
+    @return: An encoder.
+    """
+    if codec not in _CODECS:
+        raise ValueError("Unknown compression codec %r" % (codec,))
+    codec_id = _CODEC_IDS[codec]
+    def compress(message):
+        value = encode(message)
+        if isinstance(value, org.vertx.java.core.json.JsonObject):
+            kind = _OBJECT
+        elif isinstance(value, org.vertx.java.core.json.JsonArray):
+            kind = _ARRAY
+        elif isinstance(value, org.vertx.java.core.buffer.Buffer):
+            if value.length() < threshold:
+                return value
+            return _envelope(codec_id, _BUFFER, _deflate(value.getBytes(), codec, level))
+        else:
+            return value
+        data = String(value.encode()).getBytes('UTF-8')
+        if len(data) < threshold:
+            return value
+        return _envelope(codec_id, kind, _deflate(data, codec, level))
+    return compress
+
+def _envelope(codec_id, kind, payload):
+    envelope = org.vertx.java.core.buffer.Buffer(_HEADER + len(payload))
+    envelope.appendString(COMPRESSED, 'ISO-8859-1')
+    envelope.appendByte(codec_id)
+    envelope.appendByte(kind)
+    envelope.appendBytes(payload)
+    return envelope
+
+def is_compressed(value):
+    """Indicates whether a Vert.x value is a compressed message."""
+    return (isinstance(value, org.vertx.java.core.buffer.Buffer) and value.length() >= _HEADER
+            and value.getString(0, len(COMPRESSED), 'ISO-8859-1') == COMPRESSED)
+
+def inflate(value):
+    """Inflates a compressed message envelope.
+
+    Keyword arguments:
+    @param value: The Vert.x value to inflate.
+
+    @return: The original Vert.x value, or the value itself if it is not compressed.
+    """
+    if not is_compressed(value):
+        return value
+    codec = _CODEC_NAMES[value.getByte(len(COMPRESSED))]
+    kind = value.getByte(len(COMPRESSED) + 1)
+    data = _inflate(value.getBytes(_HEADER, value.length()), codec)
+    if kind == _BUFFER:
+        return org.vertx.java.core.buffer.Buffer(data)
+    elif kind == _ARRAY:
+        return org.vertx.java.core.json.JsonArray(String(data, 'UTF-8'))
+    return org.vertx.java.core.json.JsonObject(String(data, 'UTF-8'))
+
+def decompressor(decode):
+    """Wraps a decoder to inflate compressed messages.
+
+    Keyword arguments:
+    @param decode: The decoder to wrap.
+
+    @return: A decoder.
+    """
+    def decompress(value):
+        return decode(inflate(value))
+    return decompress
@@ -0,0 +1,259 @@
+# Copyright 2014 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import org.vertx.java.core.json.JsonObject
+import org.vertx.java.core.json.JsonArray
+import org.vertx.java.core.buffer.Buffer
+from java.lang import (
+    Long,
+    Double,
+    Integer,
+    Boolean
+)
+from java.util import (
+    Map,
+    Set,
+    Collection,
+    HashMap,
+    ArrayList
+)
+from core.buffer import Buffer
+from binary import BufferView
+
+# Conversion kinds. Converters look up the exact type of each value in a
+# dispatch table and only fall back to isinstance() checks for types that
+# have not been seen before, caching the result for subsequent values.
+_PASS, _NUMBER, _DICT, _SEQ, _BUFFER = range(5)
+_OBJECT, _ARRAY, _MAP, _SET, _COLLECTION, _JAVA_BUFFER = range(5, 11)
+
+_to_java_types = {
+    type(None): (_PASS, None),
+    str: (_PASS, None),
+    unicode: (_PASS, None),
+    bool: (_NUMBER, Boolean),
+    int: (_NUMBER, Integer),
+    long: (_NUMBER, Long),
+    float: (_NUMBER, Double),
+    dict: (_DICT, None),
+    list: (_SEQ, None),
+    tuple: (_SEQ, None),
+    set: (_SEQ, None),
+    frozenset: (_SEQ, None),
+    Buffer: (_BUFFER, None),
+    BufferView: (_BUFFER, None),
+}
+
+# Order matters: bool must be checked before int.
+_to_java_bases = (
+    (basestring, (_PASS, None)),
+    (bool, (_NUMBER, Boolean)),
+    (int, (_NUMBER, Integer)),
+    (long, (_NUMBER, Long)),
+    (float, (_NUMBER, Double)),
+    (dict, (_DICT, None)),
+    ((list, tuple, set, frozenset), (_SEQ, None)),
+    ((Buffer, BufferView), (_BUFFER, None)),
+)
+
+_from_java_types = {
+    type(None): _PASS,
+    str: _PASS,
+    unicode: _PASS,
+    bool: _PASS,
+    int: _PASS,
+    long: _PASS,
+    float: _PASS,
+}
+
+_from_java_bases = (
+    (org.vertx.java.core.json.JsonObject, _OBJECT),
+    (org.vertx.java.core.json.JsonArray, _ARRAY),
+    (org.vertx.java.core.buffer.Buffer, _JAVA_BUFFER),
+    (Map, _MAP),
+    (Set, _SET),
+    (Collection, _COLLECTION),
+)
+
+def _to_java_kind(t):
+    """Resolves and caches the conversion kind for a Jython type."""
+    for base, kind in _to_java_bases:
+        if issubclass(t, base):
+            break
+    else:
+        kind = (_PASS, None)
+    _to_java_types[t] = kind
+    return kind
+
+def _from_java_kind(t):
+    """Resolves and caches the conversion kind for a Java type."""
+    for base, kind in _from_java_bases:
+        if issubclass(t, base):
+            break
+    else:
+        kind = _PASS
+    _from_java_types[t] = kind
+    return kind
+
+def map_to_java(value):
+    """Converts a Jython value to a Java value.
+
+    Dictionaries and sequences are converted to java.util.Map and
+    java.util.List instances without recursion, so arbitrarily deep
+    structures can be converted. Json has no set type, so sets are
+    converted to lists.
+    """
+    types = _to_java_types
+    try:
+        kind, cls = types[type(value)]
+    except KeyError:
+        kind, cls = _to_java_kind(type(value))
+    if kind == _PASS:
+        return value
+    elif kind == _NUMBER:
+        return cls(value)
+    elif kind == _BUFFER:
+        return value._to_java_buffer().getBytes()
+
+    if kind == _DICT:
+        root = HashMap(len(value))
+    else:
+        root = ArrayList(len(value))
+    stack = [(value, root, kind)]
+    pop, push = stack.pop, stack.append
+    while stack:
+        source, target, kind = pop()
+        if kind == _DICT:
+            items = source.iteritems()
+            put = target.put
+        else:
+            items = source
+            add = target.add
+        for item in items:
+            if kind == _DICT:
+                key, item = item
+            try:
+                item_kind, cls = types[type(item)]
+            except KeyError:
+                item_kind, cls = _to_java_kind(type(item))
+            if item_kind == _NUMBER:
+                item = cls(item)
+            elif item_kind == _DICT:
+                child = HashMap(len(item))
+                push((item, child, _DICT))
+                item = child
+            elif item_kind == _SEQ:
+                child = ArrayList(len(item))
+                push((item, child, _SEQ))
+                item = child
+            elif item_kind == _BUFFER:
+                item = item._to_java_buffer().getBytes()
+            if kind == _DICT:
+                put(key, item)
+            else:
+                add(item)
+    return root
+
+def map_to_vertx(value):
+    """Converts a Jython type to a Vert.x type."""
+    try:
+        kind, cls = _to_java_types[type(value)]
+    except KeyError:
+        kind, cls = _to_java_kind(type(value))
+    if kind == _PASS:
+        return value
+    elif kind == _NUMBER:
+        return cls(value)
+    elif kind == _DICT:
+        return org.vertx.java.core.json.JsonObject(map_to_java(value))
+    elif kind == _SEQ:
+        return org.vertx.java.core.json.JsonArray(map_to_java(value))
+    return value._to_java_buffer()
+
+def map_from_vertx(value):
+    """Converts a Vert.x type to a Jython type.
+
+    Json objects, maps and collections are converted to dictionaries and
+    lists without recursion, so arbitrarily deep structures can be converted.
+    Java sets are converted to sets, whether or not they are nested.
+    """
+    types = _from_java_types
+    try:
+        kind = types[type(value)]
+    except KeyError:
+        kind = _from_java_kind(type(value))
+    if kind == _PASS:
+        return value
+    elif kind == _JAVA_BUFFER:
+        return Buffer(value)
+    is_set = kind == _SET
+    if kind == _OBJECT:
+        value, kind = value.toMap(), _MAP
+    elif kind == _ARRAY:
+        value, kind = value.toList(), _COLLECTION
+
+    if kind == _MAP:
+        root = {}
+    else:
+        root = []
+    # Sets are filled as lists and converted once the walk has finished,
+    # since their items must be converted before they can be hashed.
+    sets = []
+    stack = [(value, root, kind)]
+    pop, push = stack.pop, stack.append
+    while stack:
+        source, target, kind = pop()
+        if kind == _MAP:
+            items = source.entrySet()
+        else:
+            items = source
+            append = target.append
+        for item in items:
+            if kind == _MAP:
+                key, item = item.getKey(), item.getValue()
+            try:
+                item_kind = types[type(item)]
+            except KeyError:
+                item_kind = _from_java_kind(type(item))
+            if item_kind == _PASS:
+                pass
+            elif item_kind == _MAP or item_kind == _OBJECT:
+                if item_kind == _OBJECT:
+                    item = item.toMap()
+                child = {}
+                push((item, child, _MAP))
+                item = child
+            elif item_kind == _JAVA_BUFFER:
+                item = Buffer(item)
+            else:
+                if item_kind == _ARRAY:
+                    item = item.toList()
+                child = []
+                push((item, child, _COLLECTION))
+                if item_kind == _SET:
+                    if kind == _MAP:
+                        sets.append((target, key, child))
+                    else:
+                        sets.append((target, len(target), child))
+                item = child
+            if kind == _MAP:
+                target[key] = item
+            else:
+                append(item)
+
+    # Sets are created after their parents, so converting them in reverse
+    # converts nested sets before the sets that contain them.
+    for target, key, child in reversed(sets):
+        target[key] = set(child)
+    if is_set:
+        return set(root)
+    return root
@@ -0,0 +1,114 @@
+# Copyright 2014 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import time
+import org.vertx.java.core.json.JsonObject
+import org.vertx.java.core.json.JsonArray
+import org.vertx.java.core.buffer.Buffer
+
+def message_size(value):
+    """Returns the size of a Vert.x value.
+
+    Json objects and arrays are measured by the length of their encoded
+    form, so they are serialized to be measured while metrics are enabled.
+    Buffers are measured in bytes, and strings and other values by the
+    length of their text.
+    """
+    if isinstance(value, basestring):
+        return len(value)
+    elif isinstance(value, org.vertx.java.core.buffer.Buffer):
+        return value.length()
+    elif isinstance(value, (org.vertx.java.core.json.JsonObject, org.vertx.java.core.json.JsonArray)):
+        return len(value.encode())
+    elif value is None:
+        return 0
+    return len(str(value))
+
+class PortMetrics(object):
+    """Throughput and queue metrics for a single port."""
+    enabled = False
+
+    def __init__(self, direction, name, clock=time.time):
+        self.direction = direction
+        self.name = name
+        self.clock = clock
+        self.reset()
+
+    def reset(self):
+        """Resets the metrics."""
+        self.messages = 0
+        self.bytes = 0
+        self.handler_time = 0
+        self.handler_max = 0
+        self.queue_full = 0
+        self.queue_full_time = 0
+        self._full_since = None
+        self.queue_max_size = None
+
+    def received(self, value, elapsed):
+        """Records a message handled by the port.
+
+        Keyword arguments:
+        @param value: The received Vert.x value.
+        @param elapsed: The handler time in nanoseconds.
+        """
+        self.messages += 1
+        self.bytes += message_size(value)
+        self.handler_time += elapsed
+        if elapsed > self.handler_max:
+            self.handler_max = elapsed
+
+    def sent(self, value, count=1, size=0):
+        """Records messages sent on the port.
+
+        Keyword arguments:
+        @param value: The sent Vert.x value, if a single message was sent.
+        @param count: The number of messages sent.
+        @param size: The total size of the messages, if several were sent.
+        """
+        self.messages += count
+        if value is not None:
+            self.bytes += message_size(value)
+        else:
+            self.bytes += size
+
+    def full(self, max_size=None):
+        """Records that the port's send queue is full."""
+        if self._full_since is None:
+            self.queue_full += 1
+            self._full_since = self.clock()
+        if max_size is not None:
+            self.queue_max_size = max_size
+
+    def drained(self):
+        """Records that the port's send queue has drained."""
+        if self._full_since is not None:
+            self.queue_full_time += self.clock() - self._full_since
+            self._full_since = None
+
+    def to_dict(self):
+        """Returns the metrics as a dictionary.
+
+        Handler times are reported in milliseconds.
+        """
+        result = {'messages': self.messages, 'bytes': self.bytes}
+        if self.direction == 'input':
+            result['handler_time'] = self.handler_time / 1000000.0
+            result['handler_max'] = self.handler_max / 1000000.0
+            if self.messages:
+                result['handler_mean'] = self.handler_time / 1000000.0 / self.messages
+        else:
+            result['queue_full'] = self.queue_full
+            result['queue_full_time'] = self.queue_full_time * 1000.0
+            result['queue_max_size'] = self.queue_max_size
+        return result
@@ -0,0 +1,122 @@
+# Copyright 2014 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import time
+from collections import deque
+
+class DedupeWindow(object):
+    """Bounded window of recently seen keys.
+
+    Keys are held for at most ttl seconds after they were last seen and, if
+    a window size is given, only the most recently seen keys are held. Seeing
+    a key again moves it to the back of the window and refreshes its ttl, so
+    keys that keep repeating are not evicted.
+
+    Refreshed keys are appended to the eviction queue and their earlier
+    entries are skipped when they reach the front, so each check and
+    eviction is amortized O(1).
+
+    Keyword arguments:
+    @param window: The maximum number of keys to hold.
+    @param ttl: The maximum time in seconds to hold a key.
+    """
+    def __init__(self, window=None, ttl=None, clock=time.time):
+        if window is None and ttl is None:
+            raise ValueError("A dedupe window requires a window size or a ttl.")
+        self.window = window
+        self.ttl = ttl
+        self.clock = clock
+        self._keys = {}
+        self._order = deque()
+        self._seq = 0
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def _evict(self, now=None):
+        """Evicts the least recently seen key, or expired keys if now is given."""
+        keys, order = self._keys, self._order
+        while order:
+            seq, key = order[0]
+            entry = keys.get(key)
+            if entry is None or entry[0] != seq:
+                order.popleft()
+            elif now is None:
+                order.popleft()
+                del keys[key]
+                return
+            elif entry[1] <= now:
+                order.popleft()
+                del keys[key]
+            else:
+                return
+
+    def seen(self, key):
+        """Records a key.
+
+        Keyword arguments:
+        @param key: The key to record.
+
+        @return: Indicates whether the key was already in the window.
+        """
+        keys, order = self._keys, self._order
+        expiry = None
+        if self.ttl is not None:
+            now = self.clock()
+            self._evict(now)
+            expiry = now + self.ttl
+        found = key in keys
+        self._seq += 1
+        keys[key] = (self._seq, expiry)
+        order.append((self._seq, key))
+        if found:
+            if len(order) > 2 * len(keys) + 32:
+                self._order = deque([(seq, k) for seq, k in order if keys[k][0] == seq])
+        elif self.window is not None and len(keys) > self.window:
+            self._evict()
+        return found
+
+class Deduplicator(object):
+    """Drops messages whose key was already seen within a window.
+
+    Keyword arguments:
+    @param key: A message field name or a function returning a message's key.
+    @param window: The maximum number of keys to remember.
+    @param ttl: The maximum time in seconds to remember a key.
+    """
+    def __init__(self, key, window=None, ttl=None):
+        if not callable(key):
+            field = key
+            key = lambda message: message[field]
+        self.key = key
+        self.window = DedupeWindow(window, ttl)
+        self.dropped = 0
+
+    def filter(self, handler):
+        """Wraps a message handler to drop duplicate messages.
+
+        Keyword arguments:
+        @param handler: The message handler to wrap.
+
+        @return: The wrapped handler.
+        """
+        key, seen = self.key, self.window.seen
+        def dedupe(message):
+            if seen(key(message)):
+                self.dropped += 1
+            else:
+                handler(message)
+        return dedupe
@@ -0,0 +1,194 @@
+# Copyright 2014 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import threading, traceback
+from collections import deque
+import java.lang.Runnable
+import java.util.concurrent.Executors
+import org.vertx.java.core.Handler
+import org.vertx.java.platform.impl.JythonVerticleFactory
+from java.lang import Runtime
+from java.util.concurrent.atomic import AtomicInteger, AtomicBoolean
+from hashing import hash32
+
+def pool(threads=None, max_pending=1000, lanes=None):
+    """Creates a bounded thread pool for offloading handlers.
+
+    Keyword arguments:
+    @param threads: The number of threads. Defaults to the number of processors.
+    @param max_pending: The number of pending messages at which inputs are paused.
+    @param lanes: The number of ordered lanes into which keys are hashed.
+    Defaults to four lanes per thread.
+
+    @return: A keyed executor.
+    """
+    if threads is None:
+        threads = Runtime.getRuntime().availableProcessors()
+    if lanes is None:
+        lanes = threads * 4
+    return KeyedExecutor(java.util.concurrent.Executors.newFixedThreadPool(threads), max_pending, lanes)
+
+class _Task(java.lang.Runnable):
+    def __init__(self, function):
+        self.function = function
+    def run(self):
+        self.function()
+
+class _Lane(java.lang.Runnable):
+    """Runs tasks one at a time, in submission order, on an executor."""
+    # Tasks run per turn before a busy lane yields its thread to other lanes.
+    TURN = 64
+
+    def __init__(self, executor):
+        self.executor = executor
+        self.tasks = deque()
+        self.lock = threading.Lock()
+        self.scheduled = False
+
+    def add(self, task):
+        self.lock.acquire()
+        try:
+            self.tasks.append(task)
+            if self.scheduled:
+                return
+            self.scheduled = True
+        finally:
+            self.lock.release()
+        self.executor.execute(self)
+
+    def run(self):
+        for i in xrange(self.TURN):
+            self.lock.acquire()
+            try:
+                if not self.tasks:
+                    self.scheduled = False
+                    return
+                task = self.tasks.popleft()
+            finally:
+                self.lock.release()
+            task()
+        self.executor.execute(self)
+
+class _Resume(org.vertx.java.core.Handler):
+    def __init__(self, executor):
+        self.executor = executor
+    def handle(self, void):
+        self.executor._resume()
+
+class KeyedExecutor(object):
+    """Runs handlers on a Java thread pool with per-key ordering.
+
+    Messages with the same key are hashed to the same lane and handled one
+    at a time in the order they were received. Messages without a key are
+    handled in any order. Once max_pending messages are waiting or running,
+    offloaded inputs are paused, and they are resumed on the event loop
+    once the number of pending messages falls to half of max_pending.
+
+    Handlers run on pool threads, so they must not use ports or other
+    Vert.x objects directly. Use run_on_context() to call back into the
+    component's event loop, for example to send results.
+
+    Keyword arguments:
+    @param executor: A Java executor.
+    @param max_pending: The number of pending messages at which inputs are paused.
+    @param lanes: The number of ordered lanes into which keys are hashed.
+    """
+    def __init__(self, executor, max_pending=1000, lanes=16):
+        self.executor = executor
+        self.max_pending = max_pending
+        self.low_watermark = max_pending / 2
+        self.pending = AtomicInteger()
+        self.lanes = [_Lane(executor) for i in range(lanes)]
+        self.context = org.vertx.java.platform.impl.JythonVerticleFactory.vertx.currentContext()
+        self.paused = []
+        self._resuming = AtomicBoolean()
+
+    def run_on_context(self, function, *args):
+        """Calls a function on the event loop of the component that created the executor."""
+        self.context.runOnContext(_Callback(function, args))
+
+    def submit(self, key, function, *args):
+        """Submits a function call to be run on the pool.
+
+        Keyword arguments:
+        @param key: The ordering key, or None to run the call in any order.
+        @param function: The function to call.
+
+        @return: Indicates whether the number of pending calls has reached max_pending.
+        """
+        def task():
+            try:
+                try:
+                    function(*args)
+                except:
+                    self._error(function)
+            finally:
+                self._done()
+        pending = self.pending.incrementAndGet()
+        if key is None:
+            self.executor.execute(_Task(task))
+        else:
+            self.lanes[hash32(key) % len(self.lanes)].add(task)
+        return pending >= self.max_pending
+
+    def offload(self, input, handler, key=None):
+        """Wraps an input's message handler to run on the pool.
+
+        Keyword arguments:
+        @param input: The input, which is paused while the pool is saturated.
+        @param handler: The message handler.
+        @param key: A message field name or a function returning a message's ordering key.
+
+        @return: A message handler submitting messages to the pool.
+        """
+        if key is not None and not callable(key):
+            field = key
+            key = lambda message: message[field]
+        def offloaded(message):
+            full = self.submit(key(message) if key is not None else None, handler, message)
+            if full and input not in self.paused:
+                self.paused.append(input)
+                input.pause()
+                # The pool may have drained before the input was recorded as paused.
+                if self.pending.get() <= self.low_watermark:
+                    self._resume()
+        return offloaded
+
+    def _done(self):
+        if self.pending.decrementAndGet() <= self.low_watermark and self.paused and self._resuming.compareAndSet(False, True):
+            self.context.runOnContext(_Resume(self))
+
+    def _resume(self):
+        self._resuming.set(False)
+        if self.pending.get() < self.max_pending:
+            paused, self.paused = self.paused, []
+            for input in paused:
+                input.resume()
+
+    def _error(self, function):
+        try:
+            import logger
+            logger.error("Offloaded handler %r failed:\n%s" % (function, traceback.format_exc()))
+        except ImportError:
+            traceback.print_exc()
+
+    def shutdown(self):
+        """Shuts down the pool once pending calls have run."""
+        self.executor.shutdown()
+
+class _Callback(org.vertx.java.core.Handler):
+    def __init__(self, function, args):
+        self.function = function
+        self.args = args
+    def handle(self, void):
+        self.function(*self.args)
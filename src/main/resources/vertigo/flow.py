@@ -0,0 +1,74 @@
+# Copyright 2014 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import time
+
+class AdaptiveQueueSize(object):
+    """Adaptive send queue size controller.
+
+    The queue size is tuned with additive-increase/multiplicative-decrease
+    from the time it takes a full send queue to drain. While full queues
+    drain within the target latency the size grows by a fixed step. When a
+    drain takes longer than the target the size is cut by a factor. The
+    observed drain rate in messages per second is kept for reporting.
+
+    Keyword arguments:
+    @param size: The initial queue size.
+    @param min_size: The minimum queue size.
+    @param max_size: The maximum queue size.
+    @param target_latency_ms: The target time in milliseconds for a full queue to drain.
+    @param step: The number of messages to grow the queue by.
+    @param factor: The factor to shrink the queue by.
+    @param on_resize: A function to be called with the new size when the size changes.
+    """
+    def __init__(self, size, min_size=100, max_size=100000, target_latency_ms=50, step=100, factor=0.5, on_resize=None, clock=time.time):
+        if min_size > max_size:
+            raise ValueError("min_size must not be greater than max_size")
+        self.min_size = min_size
+        self.max_size = max_size
+        self.target_latency = target_latency_ms / 1000.0
+        self.step = step
+        self.factor = factor
+        self.on_resize = on_resize
+        self.clock = clock
+        self.size = max(min_size, min(max_size, size))
+        self.full_since = None
+        self.latency = None
+        self.rate = None
+
+    def full(self):
+        """Records that the send queue is full."""
+        if self.full_since is None:
+            self.full_since = self.clock()
+
+    def drained(self):
+        """Records that the send queue has drained.
+
+        @return: The new queue size.
+        """
+        if self.full_since is None:
+            return self.size
+        latency = self.clock() - self.full_since
+        self.full_since = None
+        self.latency = latency
+        if latency > 0:
+            self.rate = self.size / latency
+        if latency <= self.target_latency:
+            size = min(self.max_size, self.size + self.step)
+        else:
+            size = max(self.min_size, int(self.size * self.factor))
+        if size != self.size:
+            self.size = size
+            if self.on_resize is not None:
+                self.on_resize(size)
+        return size
@@ -0,0 +1,51 @@
+# Copyright 2014 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import zlib, struct
+try:
+    from hashlib import md5
+except ImportError:
+    from md5 import new as md5
+
+def _repr(value):
+    if isinstance(value, unicode):
+        return repr(value.encode('utf-8'))
+    elif isinstance(value, (int, long)) and not isinstance(value, bool):
+        return str(value)
+    elif isinstance(value, tuple):
+        if len(value) == 1:
+            return '(%s,)' % _repr(value[0])
+        return '(%s)' % ', '.join([_repr(item) for item in value])
+    return repr(value)
+
+def _bytes(value):
+    if isinstance(value, unicode):
+        return value.encode('utf-8')
+    elif isinstance(value, str):
+        return value
+    return _repr(value)
+
+def hash32(value):
+    """Returns a stable unsigned 32-bit hash of a value.
+
+    Unlike the builtin hash(), the result is the same in every JVM and
+    process, so it can be used to route and aggregate across instances.
+    Strings hash by their UTF-8 bytes, so equal str and unicode strings
+    hash alike, and integers hash alike whether they are int or long, as
+    do tuples of them. Other values hash by their repr().
+    """
+    return zlib.crc32(_bytes(value)) & 0xffffffff
+
+def hash128(value):
+    """Returns two stable, independent unsigned 64-bit hashes of a value."""
+    return struct.unpack('>QQ', md5(_bytes(value)).digest())
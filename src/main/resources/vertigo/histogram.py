@@ -0,0 +1,163 @@
+# Copyright 2014 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+_PERCENTILES = ((50, 'p50'), (90, 'p90'), (99, 'p99'), (99.9, 'p999'))
+
+class Histogram(object):
+    """Bounded latency histogram.
+
+    Values are counted in log-linear buckets in the style of HdrHistogram:
+    each power of two range is split into a fixed number of linear sub
+    buckets, so every value is recorded with a relative error of at most
+    1/sub_buckets. Values above the highest trackable value are clamped,
+    which bounds the number of buckets regardless of how many values are
+    recorded. Histograms with the same number of sub buckets can be merged.
+
+    Keyword arguments:
+    @param sub_buckets: The number of sub buckets per power of two. Must be a power of two.
+    @param highest: The highest trackable value.
+    """
+    def __init__(self, sub_buckets=64, highest=3600000000):
+        if sub_buckets < 2 or sub_buckets & (sub_buckets - 1):
+            raise ValueError("sub_buckets must be a power of two")
+        self.sub_buckets = sub_buckets
+        self.highest = highest
+        self.reset()
+
+    def reset(self):
+        """Resets the histogram."""
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def _index(self, value):
+        size = self.sub_buckets
+        if value < size * 2:
+            return value
+        shift = 1
+        value >>= 1
+        while value >= size * 2:
+            shift += 1
+            value >>= 1
+        return (shift + 1) * size + value - size
+
+    def _value(self, index):
+        """Returns the lowest value and width of a bucket."""
+        size = self.sub_buckets
+        if index < size * 2:
+            return index, 1
+        shift = index / size - 1
+        return (index % size + size) << shift, 1 << shift
+
+    def record(self, value, count=1):
+        """Records a value.
+
+        Keyword arguments:
+        @param value: The value to record. Negative values are recorded as zero.
+        @param count: The number of times to record the value.
+        """
+        value = min(max(int(value), 0), self.highest)
+        index = self._index(value)
+        counts = self.counts
+        counts[index] = counts.get(index, 0) + count
+        self.count += count
+        self.total += value * count
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        return self
+
+    def mean(self):
+        """Returns the mean recorded value."""
+        if not self.count:
+            return None
+        return float(self.total) / self.count
+
+    def percentile(self, percentile):
+        """Returns the value at a percentile.
+
+        Keyword arguments:
+        @param percentile: The percentile, from 0 to 100.
+
+        @return: The value at the percentile, or None if no values were recorded.
+        """
+        if not self.count:
+            return None
+        target = max(1, int(self.count * percentile / 100.0 + 0.5))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                low, width = self._value(index)
+                return min(max(low + (width - 1) / 2.0, self.min), self.max)
+        return self.max
+
+    def merge(self, other):
+        """Merges another histogram into this histogram.
+
+        Keyword arguments:
+        @param other: A histogram or a dictionary returned by to_dict().
+
+        @return: self
+        """
+        if isinstance(other, dict):
+            other = Histogram.from_dict(other)
+        if other.sub_buckets != self.sub_buckets:
+            raise ValueError("Cannot merge histograms with different sub bucket counts.")
+        counts = self.counts
+        for index, count in other.counts.items():
+            counts[index] = counts.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        if other.max is not None and (self.max is None or other.max > self.max):
+            self.max = other.max
+        return self
+
+    def to_dict(self):
+        """Returns the histogram as a dictionary.
+
+        The dictionary holds the bucket counts, from which the histogram can
+        be rebuilt and merged, along with a summary of the recorded values.
+        """
+        result = {
+            'sub_buckets': self.sub_buckets,
+            'highest': self.highest,
+            'count': self.count,
+            'total': self.total,
+            'buckets': [[index, count] for index, count in sorted(self.counts.items())],
+        }
+        if self.count:
+            result['min'] = self.min
+            result['max'] = self.max
+            result['mean'] = self.mean()
+            for percentile, key in _PERCENTILES:
+                result[key] = self.percentile(percentile)
+        return result
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuilds a histogram from a dictionary returned by to_dict()."""
+        histogram = cls(data['sub_buckets'], data['highest'])
+        counts = histogram.counts
+        for index, count in data['buckets']:
+            counts[int(index)] = counts.get(int(index), 0) + count
+        histogram.count = data['count']
+        histogram.total = data['total']
+        histogram.min = data.get('min')
+        histogram.max = data.get('max')
+        return histogram
@@ -11,18 +11,20 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-import sys, component
+import sys, component, vertx, tracing, profiler, blocking, checkpoint, logger
 import org.vertx.java.core.Handler
-from core.buffer import Buffer
-import org.vertx.java.core.json.JsonObject
-import org.vertx.java.core.json.JsonArray
-import org.vertx.java.core.buffer.Buffer
-from java.util import (
-    Map,
-    Set,
-    Collection
-)
-from core.javautils import map_map_from_java, map_set_from_java, map_collection_from_java
+from java.lang import System
+from convert import map_from_vertx
+from schema import compile_schema
+from lazy import lazy_from_vertx
+from binary import raw_from_vertx
+from compression import decompressor
+from dedupe import Deduplicator
+from metrics import port_metrics
+from window import Windows
+from collect import GroupCollector
+from tracing import port_trace
+from coalescing import is_coalesced, unpack
 
 if component._component is None:
     raise ImportError("Not a valid Vertigo component.")
@@ -31,6 +33,12 @@ this = sys.modules[__name__]
 
 _ports = {}
 
+_default_decode = map_from_vertx
+_lazy_decode = lazy_from_vertx
+# Decoders for ports that inflate compressed messages.
+_inflate_decode = decompressor(map_from_vertx)
+_lazy_inflate_decode = decompressor(lazy_from_vertx)
+
 def port(name):
     """Returns an input port by name.
 
@@ -39,25 +47,55 @@ def port(name):
 
     @returns: An input port.
     """
-    if name not in _ports:
-        _ports[name] = InputPort(component._component.input().port(name))
-    return _ports[name]
+    try:
+        return _ports[name]
+    except KeyError:
+        # Module functions also accept a port in place of a port name.
+        if isinstance(name, InputPort):
+            return name
+        port = _ports[name] = InputPort(component._component.input().port(name))
+        return port
 
 get_port = port
 
-def message_handler(port, handler=None):
+def message_handler(port, handler=None, lazy=False, executor=None, key=None):
     """Registers a message handler for a port.
 
     Keyword arguments:
     @param port: The port for which to register the handler.
     @param handler: The handler to register.
+    @param lazy: Whether to pass read-only views that convert message
+    fields only when they are read.
+    @param executor: An optional executor from vertigo.executor on which to run the handler.
+    @param key: A message field name or a function returning the key by
+    which to order messages run on the executor.
     """
     if handler is not None:
-        get_port(port).message_handler(handler)
+        get_port(port).message_handler(handler, lazy, executor, key)
         return this
     else:
         def wrap(f):
-            get_port(port).message_handler(f)
+            get_port(port).message_handler(f, lazy, executor, key)
+            return f
+        return wrap
+
+def batch_message_handler(port, handler=None, max_size=100, max_wait_ms=10, lazy=False):
+    """Registers a handler to be called with lists of messages from a port.
+
+    Keyword arguments:
+    @param port: The port for which to register the handler.
+    @param handler: The handler to register.
+    @param max_size: The maximum number of messages per list.
+    @param max_wait_ms: The maximum time in milliseconds a message is buffered.
+    @param lazy: Whether to pass read-only views that convert message
+    fields only when they are read.
+    """
+    if handler is not None:
+        get_port(port).batch_message_handler(handler, max_size, max_wait_ms, lazy)
+        return this
+    else:
+        def wrap(f):
+            get_port(port).batch_message_handler(f, max_size, max_wait_ms, lazy)
             return f
         return wrap
 
@@ -94,6 +132,85 @@ def group_handler(port, group, handler=None):
             return f
         return wrap
 
+def collect_group(port, group, handler=None, nested=(), max_bytes=16777216, timeout=60, on_evict=None):
+    """Registers a handler to be called with completely received groups.
+
+    Keyword arguments:
+    @param port: The port for which to register the handler.
+    @param group: The name of the group to collect.
+    @param handler: A handler to be called with each completed group.
+    @param nested: The names of nested groups to collect.
+    @param max_bytes: The maximum number of bytes to buffer across incomplete groups.
+    @param timeout: The time in seconds after which an inactive group is evicted.
+    @param on_evict: An optional handler to be called with a dictionary
+    describing each evicted group.
+    """
+    if handler is not None:
+        get_port(port).collect_group(group, handler, nested, max_bytes, timeout, on_evict)
+        return this
+    else:
+        def wrap(f):
+            get_port(port).collect_group(group, f, nested, max_bytes, timeout, on_evict)
+            return f
+        return wrap
+
+def schema(port, schema):
+    """Sets a message schema on a port.
+
+    Keyword arguments:
+    @param port: The port on which to set the schema.
+    @param schema: The message schema.
+    """
+    get_port(port).schema(schema)
+    return this
+
+def raw(port):
+    """Switches an input port to raw binary mode.
+
+    Keyword arguments:
+    @param port: The port to switch to raw mode.
+    """
+    get_port(port).raw()
+    return this
+
+def decompress(port):
+    """Inflates compressed messages received on a port.
+
+    Keyword arguments:
+    @param port: The port on which to inflate messages.
+    """
+    get_port(port).decompress()
+    return this
+
+def dedupe(port, key, window=None, ttl=None):
+    """Drops duplicate messages on a port.
+
+    Keyword arguments:
+    @param port: The port on which to drop duplicates.
+    @param key: A message field name or a function returning a message's key.
+    @param window: The maximum number of keys to remember.
+    @param ttl: The maximum time in seconds to remember a key.
+    """
+    get_port(port).dedupe(key, window, ttl)
+    return this
+
+def window(port, size, slide=None, key=None, aggregates=None, output=None, handler=None):
+    """Aggregates messages on a port over tumbling or sliding windows.
+
+    Keyword arguments:
+    @param port: The port whose messages to aggregate.
+    @param size: The window size in milliseconds.
+    @param slide: The interval in milliseconds at which windows start.
+    Defaults to the window size, producing tumbling windows.
+    @param key: A message field name or a function returning a message's key.
+    @param aggregates: A dictionary of named aggregates. Defaults to a count.
+    @param output: The name of an output port on which to send window results.
+    @param handler: A handler to be called with each window result.
+
+    @return: The windows.
+    """
+    return get_port(port).window(size, slide, key, aggregates, output, handler)
+
 def pause(port):
     """Pauses a port.
 
@@ -115,9 +232,22 @@ def resume(port):
     return this
 
 class Input(object):
-    """Base input."""
-    def __init__(self, java_obj):
+    """Base input.
+
+    An input is created for each received batch and group, so inputs hold
+    their state in slots rather than in a per-instance dictionary.
+    """
+    __slots__ = ('java_obj', '_decode', '_trace', '_dedupe', '_metrics', '_batcher')
+
+    def __init__(self, java_obj, decode=None, trace=None, metrics=None):
         self.java_obj = java_obj
+        self._decode = decode or _default_decode
+        self._trace = trace
+        self._metrics = metrics
+        self._dedupe = self._batcher = None
+
+    def _profile_name(self):
+        return 'input'
 
     def pause(self):
         """Pauses the input."""
@@ -129,15 +259,74 @@ class Input(object):
         self.java_obj.resume()
         return self
 
-    def message_handler(self, handler):
+    def message_handler(self, handler, lazy=False, executor=None, key=None):
         """Sets a message handler on the input.
 
+        If an executor is given, messages are decoded on the event loop and
+        the handler is run on the executor's thread pool. Messages with the
+        same key are handled in the order they were received, and the input
+        is paused while the pool is saturated.
+
         Keyword arguments:
         @param handler: A handler to be called when a message is received on the input.
+        @param lazy: Whether to pass read-only views that convert message
+        fields only when they are read. Lazy views cannot be used on ports
+        with a schema or in raw mode.
+        @param executor: An optional executor from vertigo.executor on which to run the handler.
+        @param key: A message field name or a function returning the key by
+        which to order messages run on the executor.
 
         @return: self
         """
-        self.java_obj.messageHandler(MessageHandler(handler))
+        name = 'message handler on %s' % self._profile_name()
+        # Profiling and blocking detection are off in most components, so
+        # the handler is registered both with and without their wrappers
+        # and the wrapped handler is only called while either is started.
+        plain, watched = handler, profiler.wrap(name, handler)
+        if executor is not None:
+            plain, watched = executor.offload(self, plain, key), executor.offload(self, watched, key)
+        if self._dedupe is not None:
+            plain, watched = self._dedupe.filter(plain), self._dedupe.filter(watched)
+        watched = blocking.wrap(name, watched)
+        self.java_obj.messageHandler(MessageHandler(plain, self._message_decode(lazy), self._metrics, self._trace, watched))
+        return self
+
+    def _message_decode(self, lazy):
+        if not lazy:
+            return self._decode
+        if self._decode is _default_decode:
+            return _lazy_decode
+        elif self._decode is _inflate_decode:
+            return _lazy_inflate_decode
+        raise ValueError("Lazy views cannot be used on ports with a schema or in raw mode.")
+
+    def batch_message_handler(self, handler, max_size=100, max_wait_ms=10, lazy=False):
+        """Sets a handler to be called with lists of messages on the input.
+
+        Received messages are decoded and buffered, and the handler is
+        called with a list of messages once max_size messages have been
+        buffered or the oldest buffered message has waited max_wait_ms,
+        whichever comes first.
+
+        Keyword arguments:
+        @param handler: A handler to be called with a list of received messages.
+        @param max_size: The maximum number of messages per list.
+        @param max_wait_ms: The maximum time in milliseconds a message is buffered.
+        @param lazy: Whether to pass read-only views that convert message
+        fields only when they are read.
+
+        @return: self
+        """
+        self._batcher = _MessageBatcher(handler, max_size, max_wait_ms)
+        return self.message_handler(self._batcher.add, lazy)
+
+    def flush(self):
+        """Passes any messages buffered for a batch message handler to the handler.
+
+        @return: self
+        """
+        if self._batcher is not None:
+            self._batcher.flush()
         return self
 
     def group_handler(self, name, handler=None):
@@ -151,19 +340,164 @@ class Input(object):
         """
         if handler is None:
             def wrap(handler):
-                self.java_obj.groupHandler(name, GroupHandler(handler))
+                self.group_handler(name, handler)
             return wrap
         else:
-            self.java_obj.groupHandler(name, GroupHandler(handler))
+            profiled = profiler.wrap('group handler for %s on %s' % (name, self._profile_name()), handler)
+            self.java_obj.groupHandler(name, GroupHandler(handler, self._decode, self._trace, profiled, self._metrics))
             return self
 
 class InputPort(Input):
     """Input port."""
+    __slots__ = ('_codec', '_inflate')
+
+    def __init__(self, java_obj, decode=None):
+        Input.__init__(self, java_obj, decode, port_trace(java_obj.name()), port_metrics('input', java_obj.name()))
+        self._codec = self._decode
+        self._inflate = False
+
     @property
     def name(self):
         """Returns the port name."""
         return self.java_obj.name()
 
+    def _profile_name(self):
+        return "port '%s'" % self.java_obj.name()
+
+    def schema(self, schema):
+        """Sets a message schema on the port.
+
+        Messages received on the port are decoded by a codec compiled from
+        the schema, and messages that do not match the schema are rejected.
+        The schema must be set before handlers are registered on the port.
+
+        Keyword arguments:
+        @param schema: The message schema.
+
+        @return: self
+        """
+        self._set_codec(compile_schema(schema).decode)
+        return self
+
+    def raw(self):
+        """Switches the port to raw binary mode.
+
+        Buffers received on a raw port are passed to handlers as BufferView
+        instances sharing the received buffer's memory, and all other
+        messages are passed through unconverted. Raw mode must be set
+        before handlers are registered on the port.
+
+        @return: self
+        """
+        self._set_codec(raw_from_vertx)
+        return self
+
+    def decompress(self):
+        """Inflates compressed messages received on the port.
+
+        Messages sent by output ports with compression enabled are inflated
+        before they are decoded. Other messages are decoded as usual.
+        Decompression must be enabled before handlers are registered on
+        the port.
+
+        @return: self
+        """
+        self._inflate = True
+        self._set_codec(self._codec)
+        return self
+
+    def _set_codec(self, decode):
+        self._codec = decode
+        if self._inflate:
+            if decode is _default_decode:
+                decode = _inflate_decode
+            else:
+                decode = decompressor(decode)
+        self._decode = decode
+
+    def dedupe(self, key, window=None, ttl=None):
+        """Drops duplicate messages on the port.
+
+        Messages whose key was already seen within the window are dropped
+        before reaching the port's message handler. The window holds the
+        window most recently seen keys and, if a ttl is given, forgets keys
+        ttl seconds after they were last seen. Deduplication must be enabled
+        before a message handler is registered on the port.
+
+        Keyword arguments:
+        @param key: A message field name or a function returning a message's key.
+        @param window: The maximum number of keys to remember.
+        @param ttl: The maximum time in seconds to remember a key.
+
+        @return: self
+        """
+        self._dedupe = Deduplicator(key, window, ttl)
+        return self
+
+    def window(self, size, slide=None, key=None, aggregates=None, output=None, handler=None):
+        """Aggregates messages on the port over tumbling or sliding windows.
+
+        Messages are aggregated incrementally by the window aggregates as
+        they arrive. When a window closes, a result for each key is sent on
+        the output port and passed to the handler, and the window is
+        evicted. Windowing registers the port's message handler.
+
+        Keyword arguments:
+        @param size: The window size in milliseconds.
+        @param slide: The interval in milliseconds at which windows start.
+        Defaults to the window size, producing tumbling windows.
+        @param key: A message field name or a function returning a message's key.
+        @param aggregates: A dictionary of named aggregates from vertigo.window.
+        Defaults to a count.
+        @param output: The name of an output port on which to send window results.
+        @param handler: A handler to be called with each window result.
+
+        @return: The windows.
+        """
+        emitters = []
+        if output is not None:
+            import output as output_module
+            emitters.append(output_module.port(output).send)
+        if handler is not None:
+            emitters.append(handler)
+        def emit(result):
+            for emitter in emitters:
+                emitter(result)
+        windows = Windows(size, slide, key, aggregates, emit, vertx.set_timer)
+        self.message_handler(windows.add)
+        return windows
+
+    def collect_group(self, name, handler, nested=(), max_bytes=16777216, timeout=60, on_evict=None):
+        """Collects groups received on the port.
+
+        Messages of each group named name, and of its nested groups with
+        the given names, are buffered in serialized form. Once the group
+        ends, the handler is called with a CollectedGroup which decodes its
+        messages as they are iterated and holds its nested groups by name.
+        Incomplete groups are evicted, logged and reported once they have
+        been inactive for timeout seconds, or oldest first whenever the
+        buffered groups exceed max_bytes.
+
+        Keyword arguments:
+        @param name: The name of the group to collect.
+        @param handler: A handler to be called with each completed group.
+        @param nested: The names of nested groups to collect.
+        @param max_bytes: The maximum number of bytes to buffer across incomplete groups.
+        @param timeout: The time in seconds after which an inactive group is evicted.
+        @param on_evict: An optional handler to be called with a dictionary
+        describing each evicted group.
+
+        @return: The group collector.
+        """
+        def evicted(info):
+            logger.warn("Evicted incomplete group %s (%s) after %.1f seconds: %s, %d messages, %d bytes"
+                        % (info['name'], info['id'], info['age'], info['reason'], info['messages'], info['bytes']))
+            if on_evict is not None:
+                on_evict(info)
+        collector = GroupCollector(handler, self._decode, nested, max_bytes, timeout, evicted, tracing.strip)
+        self.java_obj.groupHandler(name, collector.group_handler(name))
+        return collector
+
     def batch_handler(self, handler=None):
         """Sets a batch handler on the port.
 
@@ -174,14 +508,20 @@ class InputPort(Input):
         """
         if handler is None:
             def wrap(handler):
-                self.java_obj.batchHandler(name, BatchHandler(handler))
+                self.batch_handler(handler)
             return wrap
         else:
-            self.java_obj.batchHandler(BatchHandler(handler))
+            profiled = profiler.wrap('batch handler on %s' % self._profile_name(), handler)
+            self.java_obj.batchHandler(BatchHandler(handler, self._decode, self._trace, profiled, self._metrics))
             return self
 
 class InputBatch(Input):
     """Input batch."""
+    __slots__ = ()
+
+    def _profile_name(self):
+        return 'batch'
+
     @property
     def id(self):
         """Returns the unique batch ID."""
@@ -201,16 +541,24 @@ class InputBatch(Input):
     def end_handler(self, handler):
         """Sets an end handler on the batch.
 
+        Stores checkpointed on batch end are checkpointed after the handler
+        has been called.
+
         Keyword arguments:
         @param handler: A handler to be called when the batch has ended.
 
         @return: self
         """
-        self.java_obj.endHandler(VoidHandler(handler))
+        self.java_obj.endHandler(VoidHandler(handler, checkpoint.batch_ended))
         return self
 
 class InputGroup(Input):
     """Input group."""
+    __slots__ = ()
+
+    def _profile_name(self):
+        return "group '%s'" % self.java_obj.name()
+
     @property
     def id(self):
         """Returns the unique group ID."""
@@ -244,56 +592,122 @@ class InputGroup(Input):
         return self
 
 class VoidHandler(org.vertx.java.core.Handler):
-    def __init__(self, handler):
+    def __init__(self, handler, after=None):
         self.handler = handler
+        self.after = after
     def handle(self, void=None):
         if self.handler is not None:
             self.handler()
+        if self.after is not None:
+            self.after()
 
 class BatchHandler(org.vertx.java.core.Handler):
-    def __init__(self, handler):
+    def __init__(self, handler, decode=None, trace=None, profiled=None, metrics=None):
         self.handler = handler
+        self.decode = decode
+        self.trace = trace
+        self.profiled = profiled or handler
+        self.metrics = metrics
     def handle(self, batch):
-        self.handler(InputBatch(batch))
+        batch = InputBatch(batch, self.decode, self.trace, self.metrics)
+        if checkpoint._checkpointers:
+            batch.end_handler(None)
+        if profiler._profiler is not None:
+            self.profiled(batch)
+        else:
+            self.handler(batch)
 
 class GroupHandler(org.vertx.java.core.Handler):
-    def __init__(self, handler):
+    def __init__(self, handler, decode=None, trace=None, profiled=None, metrics=None):
         self.handler = handler;
+        self.decode = decode
+        self.trace = trace
+        self.profiled = profiled or handler
+        self.metrics = metrics
     def handle(self, group):
-        self.handler(InputGroup(group))
+        group = InputGroup(group, self.decode, self.trace, self.metrics)
+        if profiler._profiler is not None:
+            self.profiled(group)
+        else:
+            self.handler(group)
 
 class MessageHandler(org.vertx.java.core.Handler):
-    def __init__(self, handler):
+    """Decodes received messages and passes them to a handler.
+
+    The watched handler, which is profiled and checked for blocking, is
+    called instead of the handler once profiling or blocking detection has
+    been started.
+    """
+    def __init__(self, handler, decode=_default_decode, metrics=None, trace=None, watched=None):
         self.handler = handler;
+        self.decode = decode
+        self.metrics = metrics
+        self.trace = trace
+        self.watched = watched or handler
     def handle(self, message):
-        self.handler(map_from_vertx(message))
+        if is_coalesced(message):
+            for value in unpack(message):
+                self.handle(value)
+            return
+        trace = tracing.strip(message)
+        if trace is None:
+            self._handle(message)
+            return
+        if self.trace is not None and tracing.is_enabled():
+            self.trace.received(trace)
+        # Messages sent by the handler continue the received message's trace.
+        tracing._current = trace
+        try:
+            self._handle(message)
+        finally:
+            tracing._current = None
+    def _handle(self, message):
+        handler = self.handler
+        if profiler._profiler is not None or blocking._detector is not None:
+            handler = self.watched
+        metrics = self.metrics
+        if metrics is not None and metrics.enabled:
+            start = System.nanoTime()
+            handler(self.decode(message))
+            metrics.received(message, System.nanoTime() - start)
+        else:
+            handler(self.decode(message))
+
+class _MessageBatcher(object):
+    """Buffers decoded messages and passes them to a handler in lists."""
+    def __init__(self, handler, max_size, max_wait_ms):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.handler = handler
+        self.max_size = max_size
+        self.max_wait = max_wait_ms
+        self.messages = []
+        self.timer_id = None
+
+    def add(self, message):
+        messages = self.messages
+        messages.append(message)
+        if len(messages) >= self.max_size:
+            self.flush()
+        elif self.timer_id is None:
+            self.timer_id = vertx.set_timer(self.max_wait, self._timeout)
+
+    def _timeout(self, timer_id):
+        self.timer_id = None
+        self.flush()
+
+    def flush(self):
+        if self.timer_id is not None:
+            vertx.cancel_timer(self.timer_id)
+            self.timer_id = None
+        if self.messages:
+            messages, self.messages = self.messages, []
+            self.handler(messages)
 
 def map_array_from_java(array):
     """Converts a JsonArray to a list."""
-    result = []
-    iter = array.iterator()
-    while iter.hasNext():
-        result.append(map_from_vertx(iter.next()))
-    return result
+    return map_from_vertx(array)
 
 def map_object_from_java(obj):
     """Converts a JsonObject to a dictionary."""
-    return map_map_from_java(obj.toMap())
-
-def map_from_vertx(value):
-    """Converts a Vert.x type to a Jython type."""
-    if value is None:
-        return value
-    if isinstance(value, Map):
-        return map_map_from_java(value)
-    elif isinstance(value, Set):
-        return map_set_from_java(value)
-    elif isinstance(value, Collection):
-        return map_collection_from_java(value)
-    elif isinstance(value, org.vertx.java.core.json.JsonObject):
-        return map_object_from_java(value)
-    elif isinstance(value, org.vertx.java.core.json.JsonArray):
-        return map_array_from_java(value)
-    elif isinstance(value, org.vertx.java.core.buffer.Buffer):
-        return Buffer(value)
-    return value
+    return map_from_vertx(obj)
@@ -0,0 +1,143 @@
+# Copyright 2014 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import org.vertx.java.core.json.JsonObject
+import org.vertx.java.core.json.JsonArray
+from java.util import (
+    Map,
+    List
+)
+from UserDict import DictMixin
+from convert import map_from_vertx
+
+_PRIMITIVES = (type(None), str, unicode, bool, int, long, float)
+
+def lazy_from_vertx(value):
+    """Converts a Vert.x type to a lazy Jython view.
+
+    Json objects and arrays are wrapped in read-only views which convert
+    their fields only when they are read. Other values are converted as usual.
+    """
+    if type(value) in _PRIMITIVES:
+        return value
+    elif isinstance(value, org.vertx.java.core.json.JsonObject):
+        return LazyObject(value)
+    elif isinstance(value, org.vertx.java.core.json.JsonArray):
+        return LazyArray(value)
+    elif isinstance(value, Map):
+        return LazyObject(org.vertx.java.core.json.JsonObject(value))
+    elif isinstance(value, List):
+        return LazyArray(org.vertx.java.core.json.JsonArray(value))
+    return map_from_vertx(value)
+
+class LazyObject(DictMixin, object):
+    """Read-only mapping view of a JsonObject.
+
+    Fields are converted the first time they are read and cached thereafter.
+    """
+    def __init__(self, java_obj):
+        self.java_obj = java_obj
+        self._cache = {}
+
+    def __getitem__(self, key):
+        try:
+            return self._cache[key]
+        except KeyError:
+            pass
+        value = self.java_obj.getField(key)
+        if value is None and not self.java_obj.containsField(key):
+            raise KeyError(key)
+        value = self._cache[key] = lazy_from_vertx(value)
+        return value
+
+    def __setitem__(self, key, value):
+        raise TypeError("Lazy message views are read-only.")
+
+    def __delitem__(self, key):
+        raise TypeError("Lazy message views are read-only.")
+
+    def __contains__(self, key):
+        return key in self._cache or self.java_obj.containsField(key)
+
+    has_key = __contains__
+
+    def __iter__(self):
+        return iter(self.java_obj.getFieldNames())
+
+    def __len__(self):
+        return self.java_obj.size()
+
+    def keys(self):
+        return list(self.java_obj.getFieldNames())
+
+    def to_dict(self):
+        """Converts the view to a dictionary."""
+        return map_from_vertx(self.java_obj)
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+class LazyArray(object):
+    """Read-only sequence view of a JsonArray.
+
+    Items are converted the first time they are read and cached thereafter.
+    """
+    __slots__ = ('java_obj', '_cache')
+    _MISSING = object()
+
+    def __init__(self, java_obj):
+        self.java_obj = java_obj
+        self._cache = None
+
+    def __len__(self):
+        return self.java_obj.size()
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        size = self.java_obj.size()
+        if index < 0:
+            index += size
+        if index < 0 or index >= size:
+            raise IndexError("list index out of range")
+        if self._cache is None:
+            self._cache = [self._MISSING] * size
+        value = self._cache[index]
+        if value is self._MISSING:
+            value = self._cache[index] = lazy_from_vertx(self.java_obj.get(index))
+        return value
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __contains__(self, value):
+        for item in self:
+            if item == value:
+                return True
+        return False
+
+    def __eq__(self, other):
+        if not isinstance(other, (list, tuple, LazyArray)):
+            return False
+        return list(self) == list(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def to_list(self):
+        """Converts the view to a list."""
+        return map_from_vertx(self.java_obj)
+
+    def __repr__(self):
+        return repr(self.to_list())
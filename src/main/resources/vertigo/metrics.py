@@ -0,0 +1,91 @@
+# Copyright 2014 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import sys, time, component, vertx
+from core.event_bus import EventBus
+from counters import PortMetrics
+
+if component._component is None:
+    raise ImportError("Not a valid Vertigo component.")
+
+this = sys.modules[__name__]
+
+_ports = {}
+
+def enable():
+    """Enables port metrics.
+
+    @return: The metrics module.
+    """
+    PortMetrics.enabled = True
+    return this
+
+def disable():
+    """Disables port metrics.
+
+    @return: The metrics module.
+    """
+    PortMetrics.enabled = False
+    return this
+
+def is_enabled():
+    """Indicates whether port metrics are enabled."""
+    return PortMetrics.enabled
+
+def port_metrics(direction, name):
+    """Returns the metrics for a port.
+
+    Keyword arguments:
+    @param direction: The port direction, either 'input' or 'output'.
+    @param name: The port name.
+
+    @return: The port metrics.
+    """
+    key = (direction, name)
+    if key not in _ports:
+        _ports[key] = PortMetrics(direction, name)
+    return _ports[key]
+
+def snapshot():
+    """Returns a snapshot of all port metrics.
+
+    @return: A dictionary with the component address and the metrics for
+    each input and output port.
+    """
+    result = {'address': component._component.context().address(), 'time': int(time.time() * 1000), 'input': {}, 'output': {}}
+    for (direction, name), metrics in _ports.items():
+        result[direction][name] = metrics.to_dict()
+    return result
+
+def reset():
+    """Resets all port metrics.
+
+    @return: The metrics module.
+    """
+    for metrics in _ports.values():
+        metrics.reset()
+    return this
+
+def publish(address, interval=1000):
+    """Periodically publishes metrics snapshots on the event bus.
+
+    Keyword arguments:
+    @param address: The event bus address to which to publish snapshots.
+    @param interval: The publish interval in milliseconds.
+
+    @return: The periodic timer ID.
+    """
+    enable()
+    def publish_snapshot(timer_id):
+        EventBus.publish(address, snapshot())
+    return vertx.set_periodic(interval, publish_snapshot)
@@ -13,6 +13,7 @@
 # limitations under the License.
 import org.vertx.java.core.AsyncResultHandler
 from core.javautils import map_from_java, map_to_java
+from partition import CONFIG_FIELD
 import net.kuujo.vertigo.component.ModuleConfig
 import net.kuujo.vertigo.io.selector.RoundRobinSelector
 import net.kuujo.vertigo.io.selector.RandomSelector
@@ -69,6 +70,51 @@ class NetworkConfig(Config):
         self.java_obj.removeComponent(name)
         return self
 
+    def get_component(self, name):
+        """Returns a component configuration.
+
+        Keyword arguments:
+        @param name: The name of the component.
+
+        @return: The component configuration, or None if the component does not exist.
+        """
+        component = self.java_obj.getComponent(name)
+        if component is None:
+            return None
+        elif isinstance(component, net.kuujo.vertigo.component.ModuleConfig):
+            return ModuleConfig(component)
+        else:
+            return VerticleConfig(component)
+
+    def apply_advice(self, advice):
+        """Applies deployment advice published by blocking detectors.
+
+        Verticle components that were advised to run as workers are
+        configured as workers, and as multi-threaded workers if advised.
+        Advice for other networks, unknown components and module components
+        is ignored.
+
+        Keyword arguments:
+        @param advice: An advice dictionary or a list of advice dictionaries.
+
+        @return: A list of the updated component configurations.
+        """
+        if isinstance(advice, dict):
+            advice = [advice]
+        updated = []
+        for item in advice:
+            if item.get('network', self.name) != self.name:
+                continue
+            component = self.get_component(item['component'])
+            if not isinstance(component, VerticleConfig):
+                continue
+            if item.get('worker'):
+                component.worker = True
+                if item.get('multi_threaded'):
+                    component.multi_threaded = True
+                updated.append(component)
+        return updated
+
     def add_verticle(self, name, main, config=None, instances=1):
         """Adds a verticle component to the network.
 
@@ -117,18 +163,38 @@ class NetworkConfig(Config):
         self.java_obj.removeComponent(name)
         return self
 
-    def create_connection(self, source, target, selector=None):
+    def create_connection(self, source, target, selector=None, key=None):
         """Creates a connection between two components.
 
+        If a key is given, the source component's output port routes Json
+        object messages by the stable hash of the key field rather than by
+        the whole message, so all messages with the same key are sent to
+        the same target instance. The key applies to every connection from
+        the output port, and is stored in the source component's
+        configuration, so the source component must be added first.
+
         Keyword arguments:
         @param source: A two-tuple indicating the source component name and output port.
         @param target: A two-tuple indicating the target component name and input port.
-        @param selector: A connection selector type.
+        @param selector: A connection selector type. Defaults to 'hash' if a key is given.
+        @param key: The name of the message field by which to partition messages.
+        Nested fields are named by dotted paths such as 'user.id'.
 
         @return: The connection configuration.
         """
+        if key is not None:
+            if not isinstance(key, basestring):
+                raise TypeError("Connection keys must be field names. Use OutputPort.partition() for key functions.")
+            component = self.get_component(source[0])
+            if component is None:
+                raise ValueError("Unknown source component %r" % (source[0],))
+            config = component.config or {}
+            config.setdefault(CONFIG_FIELD, {})[source[1]] = key
+            component.config = config
+            if selector is None:
+                selector = 'hash'
         if selector is not None:
-            return ConnectionConfig(self.java_obj.createConnection(source[0], source[1], target[0], target[1], self._SELECTORS[selector]))
+            return ConnectionConfig(self.java_obj.createConnection(source[0], source[1], target[0], target[1], self._SELECTORS[selector]()))
         else:
             return ConnectionConfig(self.java_obj.createConnection(source[0], source[1], target[0], target[1]))
 
@@ -11,17 +11,17 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-import sys, component
+import sys, component, vertx, tracing
 import org.vertx.java.core.Handler
-from java.lang import (
-    Long,
-    Double,
-    Integer
-)
-from core.buffer import Buffer
-import org.vertx.java.core.json.JsonObject
-import org.vertx.java.core.json.JsonArray
-from core.javautils import map_to_java, map_seq_to_java, map_dict_to_java
+from convert import map_to_vertx
+from schema import compile_schema
+from binary import raw_to_vertx
+from flow import AdaptiveQueueSize
+from compression import compressor
+from metrics import port_metrics
+from counters import message_size
+from partition import partitioner, CONFIG_FIELD
+from coalescing import packets
 
 if component._component is None:
     raise ImportError("Not a valid Vertigo component.")
@@ -38,9 +38,14 @@ def port(name):
 
     @return: An output port.
     """
-    if name not in _ports:
-        _ports[name] = OutputPort(component._component.output().port(name))
-    return _ports[name]
+    try:
+        return _ports[name]
+    except KeyError:
+        # Module functions also accept a port in place of a port name.
+        if isinstance(name, OutputPort):
+            return name
+        port = _ports[name] = OutputPort(component._component.output().port(name))
+        return port
 
 get_port = port
 
@@ -54,6 +59,69 @@ def send(port, message):
     get_port(port).send(message)
     return this
 
+def send_many(port, messages, handler=None):
+    """Sends a sequence of messages on an output port.
+
+    Keyword arguments:
+    @param port: The port on which to send the messages.
+    @param messages: An iterable of messages to send.
+    @param handler: An optional handler to be called once all messages have been sent.
+    """
+    get_port(port).send_many(messages, handler)
+    return this
+
+def stream(port, messages, on_complete=None):
+    """Streams messages from an iterable or generator on an output port.
+
+    Keyword arguments:
+    @param port: The port on which to send the messages.
+    @param messages: An iterable or generator of messages to send.
+    @param on_complete: An optional handler to be called once the iterator is exhausted.
+    """
+    get_port(port).stream(messages, on_complete)
+    return this
+
+def schema(port, schema):
+    """Sets a message schema on an output port.
+
+    Keyword arguments:
+    @param port: The port on which to set the schema.
+    @param schema: The message schema.
+    """
+    get_port(port).schema(schema)
+    return this
+
+def raw(port):
+    """Switches an output port to raw binary mode.
+
+    Keyword arguments:
+    @param port: The port to switch to raw mode.
+    """
+    get_port(port).raw()
+    return this
+
+def compress(port, codec='zlib', threshold=4096):
+    """Enables payload compression on an output port.
+
+    Keyword arguments:
+    @param port: The port on which to enable compression.
+    @param codec: The compression codec, either 'zlib' or 'gzip'.
+    @param threshold: The minimum size in bytes of messages to compress.
+    """
+    get_port(port).compress(codec, threshold)
+    return this
+
+def coalesce(port, max_messages=500, max_delay_ms=5):
+    """Enables message coalescing on an output port.
+
+    Keyword arguments:
+    @param port: The port on which to coalesce messages.
+    @param max_messages: The maximum number of messages packed together.
+    @param max_delay_ms: The maximum time in milliseconds a message is held.
+    """
+    get_port(port).coalesce(max_messages, max_delay_ms)
+    return this
+
 def batch(port, handler=None):
     """Creates a batch for a specific port.
 
@@ -87,6 +155,21 @@ def group(port, group, handler=None):
             return f
         return wrap
 
+def send_group(port, name, messages, nested=None, handler=None):
+    """Sends a group of messages, and optionally nested groups, in one call.
+
+    Keyword arguments:
+    @param port: The port on which to send the group.
+    @param name: The name of the group.
+    @param messages: An iterable of messages, or of iterables of nested
+    group members if nested group names are given.
+    @param nested: The name of the nested groups, or a sequence of names
+    for each level of nesting.
+    @param handler: An optional handler to be called once the group has been sent.
+    """
+    get_port(port).send_group(name, messages, nested, handler)
+    return this
+
 def send_queue_full(port):
     """Checks if a send queue is full on a port.
 
@@ -96,6 +179,18 @@ def send_queue_full(port):
     """
     return get_port(port).send_queue_full()
 
+def adaptive_send_queue(port, min_size=100, max_size=100000, target_latency_ms=50):
+    """Enables adaptive send queue sizing on a port.
+
+    Keyword arguments:
+    @param port: The port on which to enable adaptive sizing.
+    @param min_size: The minimum send queue size.
+    @param max_size: The maximum send queue size.
+    @param target_latency_ms: The target time in milliseconds for a full queue to drain.
+    """
+    get_port(port).adaptive_send_queue(min_size, max_size, target_latency_ms)
+    return this
+
 def drain_handler(port, handler=None):
     """Sets a drain handler on a port.
 
@@ -112,17 +207,36 @@ def drain_handler(port, handler=None):
             return f
         return wrap
 
+def _partition_key(name):
+    """Returns the partition key configured for a port by the network."""
+    config = component._component.context().component().config()
+    if config is None:
+        return None
+    keys = config.getObject(CONFIG_FIELD)
+    if keys is None:
+        return None
+    return keys.getString(name)
+
 class Output(object):
-    """Base output."""
-    def __init__(self, java_obj):
+    """Base output.
+
+    An output is created for each new batch and group, so outputs hold
+    their state in slots rather than in a per-instance dictionary.
+    """
+    __slots__ = ('java_obj', '_encode', '_adaptive', '_metrics', '_waiting', '_drain')
+
+    def __init__(self, java_obj, encode=None, metrics=None):
         self.java_obj = java_obj
+        self._encode = encode or map_to_vertx
+        self._metrics = metrics
+        self._adaptive = self._waiting = self._drain = None
 
     def set_send_queue_max_size(self, max_size):
         """Sets the maximum send queue size for the output."""
         self.java_obj.setSendQueueMaxSize(max_size)
         return self
 
-    def get_send_queue_max_size(self, max_size):
+    def get_send_queue_max_size(self):
         """Returns the maximum send queue size for the output."""
         return self.java_obj.getSendQueueMaxSize()
 
@@ -130,11 +244,54 @@ class Output(object):
 
     def send_queue_full(self):
         """Indicates whether the send queue is full."""
-        return self.java_obj.sendQueueFull()
+        full = self.java_obj.sendQueueFull()
+        if full:
+            self._queue_full()
+        return full
+
+    def _queue_full(self):
+        if self._adaptive is not None:
+            self._adaptive.full()
+        if self._metrics is not None and self._metrics.enabled:
+            self._metrics.full(self.java_obj.getSendQueueMaxSize())
+
+    def _queue_drained(self):
+        if self._adaptive is not None:
+            self._adaptive.drained()
+        if self._metrics is not None and self._metrics.enabled:
+            self._metrics.drained()
+        waiting = self._waiting
+        if waiting:
+            self._waiting = None
+            for callback in waiting:
+                callback()
+
+    def _wait_for_drain(self, callback):
+        """Calls a callback once, when the send queue next drains.
+
+        Streams and coalescers waiting on the same output share a single
+        drain handler. Once it fires, the drain handler registered with
+        drain_handler(), if any, is restored, so finished streams are not
+        resumed by later drains.
+        """
+        if self._waiting is None:
+            self._waiting = []
+            self.java_obj.drainHandler(_WaitHandler(self))
+        self._waiting.append(callback)
+
+    def _wait_drained(self):
+        drain = self._drain
+        self.java_obj.drainHandler(drain)
+        if drain is not None:
+            drain.handle(None)
+        else:
+            self._queue_drained()
 
     def drain_handler(self, handler):
         """Sets a drain handler on the output."""
-        self.java_obj.drainHandler(DrainHandler(handler))
+        self._drain = DrainHandler(handler, self)
+        if self._waiting is None:
+            self.java_obj.drainHandler(self._drain)
         return self
 
     def group(self, name, handler=None):
@@ -147,10 +304,10 @@ class Output(object):
         """
         if handler is None:
             def wrap(f):
-                self.java_obj.group(name, GroupHandler(f))
+                self.java_obj.group(name, GroupHandler(f, self._encode, self._metrics))
             return wrap
         else:
-            self.java_obj.group(name, GroupHandler(handler))
+            self.java_obj.group(name, GroupHandler(handler, self._encode, self._metrics))
         return self
 
     def send(self, message):
@@ -161,16 +318,229 @@ class Output(object):
 
         @return: self
         """
-        self.java_obj.send(map_to_vertx(message))
+        value = tracing.stamp(self._encode(message))
+        self.java_obj.send(value)
+        metrics = self._metrics
+        if metrics is not None and metrics.enabled:
+            metrics.sent(value)
+        return self
+
+    def send_group(self, name, messages, nested=None, handler=None):
+        """Sends a group of messages, and optionally nested groups, in one call.
+
+        The group is created, filled and ended directly on the Java output
+        group without creating wrappers or callbacks for each group. When
+        nested group names are given, each item of messages is an iterable
+        of members of a nested group, so sentences of words can be sent as:
+
+            output.send_group('out', 'sentences', [s.split() for s in sentences], nested='words')
+
+        Keyword arguments:
+        @param name: The name of the group.
+        @param messages: An iterable of messages, or of iterables of nested
+        group members if nested group names are given.
+        @param nested: The name of the nested groups, or a sequence of names
+        for each level of nesting.
+        @param handler: An optional handler to be called once the group has been sent.
+
+        @return: self
+        """
+        if isinstance(nested, basestring):
+            nested = (nested,)
+        self.java_obj.group(name, _BulkGroupHandler(messages, nested and tuple(nested) or (), self._encode, self._metrics, handler))
+        return self
+
+    def send_many(self, messages, handler=None):
+        """Sends a sequence of messages.
+
+        Messages are sent until the send queue is full. Sending is resumed
+        from the drain handler once the queue has drained.
+
+        Keyword arguments:
+        @param messages: An iterable of messages to send.
+        @param handler: An optional handler to be called once all messages have been sent.
+
+        @return: self
+        """
+        return self.stream(messages, handler)
+
+    def stream(self, messages, on_complete=None):
+        """Streams messages from an iterable or generator.
+
+        Messages are pulled from the iterator only while the send queue is
+        not full. When the queue fills the stream parks on the drain handler
+        and resumes once the queue has drained. A drain handler registered
+        on the output is kept, and is still called each time the queue
+        drains.
+
+        Keyword arguments:
+        @param messages: An iterable or generator of messages to send.
+        @param on_complete: An optional handler to be called once the iterator is exhausted.
+
+        @return: self
+        """
+        _Pump(self, messages, on_complete).pump()
         return self
 
 class OutputPort(Output):
     """Output port."""
+    __slots__ = ('_coalescer', '_codec', '_partition')
+
+    def __init__(self, java_obj, encode=None):
+        Output.__init__(self, java_obj, encode, port_metrics('output', java_obj.name()))
+        self._coalescer = None
+        self._codec = self._encode
+        self._partition = None
+        key = _partition_key(java_obj.name())
+        if key is not None:
+            self.partition(key)
+
     @property
     def name(self):
         """Returns the port name."""
         return self.java_obj.name()
 
+    def schema(self, schema):
+        """Sets a message schema on the port.
+
+        Messages sent on the port are encoded by a codec compiled from the
+        schema, and messages that do not match the schema are rejected.
+
+        Keyword arguments:
+        @param schema: The message schema.
+
+        @return: self
+        """
+        self._set_codec(compile_schema(schema).encode)
+        return self
+
+    def raw(self):
+        """Switches the port to raw binary mode.
+
+        Buffer views and Vert.x buffers sent on a raw port are passed to
+        the event bus without being copied or converted.
+
+        @return: self
+        """
+        self._set_codec(raw_to_vertx)
+        return self
+
+    def compress(self, codec='zlib', threshold=4096):
+        """Enables payload compression on the port.
+
+        Messages whose serialized size is at least threshold bytes are
+        compressed and sent as a buffer marked as compressed. Receiving
+        input ports must enable decompress() to inflate them. Compression
+        wraps the port's current codec, so any schema must be set first.
+
+        Keyword arguments:
+        @param codec: The compression codec, either 'zlib' or 'gzip'.
+        @param threshold: The minimum size in bytes of messages to compress.
+
+        @return: self
+        """
+        self._set_codec(compressor(self._codec, codec, threshold))
+        return self
+
+    def partition(self, key):
+        """Routes messages on the port by a key.
+
+        Hash selectors on the port's connections route each Json object
+        message, including messages compressed into buffers, by the stable
+        hash of its key rather than by its whole content, so all messages
+        with the same key go to the same target instance. Other messages
+        are routed as before. Ports of connections created with a key are
+        partitioned automatically.
+
+        Keyword arguments:
+        @param key: A function returning a message's key, or a message field
+        name. Nested fields are named by dotted paths such as 'user.id'.
+
+        @return: self
+        """
+        if self._coalescer is not None:
+            raise ValueError("Coalescing ports cannot be partitioned.")
+        self._partition = key
+        self._set_codec(self._codec)
+        return self
+
+    def _set_codec(self, encode):
+        self._codec = encode
+        if self._partition is not None:
+            encode = partitioner(encode, self._partition)
+        self._encode = encode
+
+    def adaptive_send_queue(self, min_size=100, max_size=100000, target_latency_ms=50):
+        """Enables adaptive send queue sizing on the port.
+
+        The maximum send queue size is tuned from the time it takes a full
+        send queue to drain, growing while the queue drains within the
+        target latency and shrinking when it does not. Full queues are
+        observed through send_queue_full(), drain handlers and streams.
+
+        Keyword arguments:
+        @param min_size: The minimum send queue size.
+        @param max_size: The maximum send queue size.
+        @param target_latency_ms: The target time in milliseconds for a full queue to drain.
+
+        @return: self
+        """
+        self._adaptive = AdaptiveQueueSize(self.java_obj.getSendQueueMaxSize(), min_size, max_size,
+                                           target_latency_ms, on_resize=self.java_obj.setSendQueueMaxSize)
+        self.java_obj.setSendQueueMaxSize(self._adaptive.size)
+        return self
+
+    def coalesce(self, max_messages=500, max_delay_ms=5):
+        """Enables message coalescing on the port.
+
+        Messages sent on the port, including messages sent with
+        send_many() and stream(), are packed into a single event bus
+        message once max_messages have been sent or the oldest message has
+        been held for max_delay_ms, whichever comes first. While the send
+        queue is full, messages are held until it drains. Buffers, such as
+        raw and compressed messages, are sent on their own. Receiving
+        message handlers unpack coalesced messages and are called once for
+        each message. Partitioned ports cannot coalesce, since messages
+        with different keys would be routed together.
+
+        Keyword arguments:
+        @param max_messages: The maximum number of messages packed together.
+        @param max_delay_ms: The maximum time in milliseconds a message is held.
+
+        @return: self
+        """
+        if self._partition is not None:
+            raise ValueError("Partitioned ports cannot coalesce messages.")
+        self.flush()
+        self._coalescer = _Coalescer(self, max_messages, max_delay_ms)
+        return self
+
+    def flush(self):
+        """Sends any messages held by the port's coalescer.
+
+        @return: self
+        """
+        if self._coalescer is not None:
+            self._coalescer.flush()
+        return self
+
+    def send(self, message):
+        """Sends a message.
+
+        Keyword arguments:
+        @param message: The message to send.
+
+        @return: self
+        """
+        value = tracing.stamp(self._encode(message))
+        if self._coalescer is not None:
+            self._coalescer.add(value)
+        else:
+            self.java_obj.send(value)
+        if self._metrics.enabled:
+            self._metrics.sent(value)
+        return self
+
     def batch(self, handler=None):
         """Creates an output batch.
 
@@ -181,14 +551,16 @@ class OutputPort(Output):
         """
         if handler is None:
             def wrap(f):
-                self.java_obj.batch(BatchHandler(f))
+                self.java_obj.batch(BatchHandler(f, self._encode, self._metrics))
             return wrap
         else:
-            self.java_obj.batch(BatchHandler(handler))
+            self.java_obj.batch(BatchHandler(handler, self._encode, self._metrics))
         return self
 
 class OutputBatch(Output):
     """Output batch."""
+    __slots__ = ()
+
     @property
     def id(self):
         """Returns the unique group identifier."""
@@ -200,6 +572,8 @@ class OutputBatch(Output):
 
 class OutputGroup(Output):
     """Output group."""
+    __slots__ = ()
+
     @property
     def id(self):
         """Returns the unique group identifier."""
@@ -215,37 +589,196 @@ class OutputGroup(Output):
         self.java_obj.end()
 
 class BatchHandler(org.vertx.java.core.Handler):
-    def __init__(self, handler):
+    def __init__(self, handler, encode=None, metrics=None):
         self.handler = handler
+        self.encode = encode
+        self.metrics = metrics
     def handle(self, batch):
-        self.handler(OutputBatch(batch))
+        self.handler(OutputBatch(batch, self.encode, self.metrics))
 
 class GroupHandler(org.vertx.java.core.Handler):
-    def __init__(self, handler):
+    def __init__(self, handler, encode=None, metrics=None):
         self.handler = handler;
+        self.encode = encode
+        self.metrics = metrics
     def handle(self, group):
-        self.handler(OutputGroup(group))
+        self.handler(OutputGroup(group, self.encode, self.metrics))
 
 class DrainHandler(org.vertx.java.core.Handler):
-    def __init__(self, handler):
+    def __init__(self, handler, output=None):
         self.handler = handler;
+        self.output = output
+    def handle(self, nothing):
+        if self.output is not None:
+            self.output._queue_drained()
+        if self.handler is not None:
+            self.handler()
+
+class _WaitHandler(org.vertx.java.core.Handler):
+    """Drain handler installed while streams or coalescers are waiting."""
+    def __init__(self, output):
+        self.output = output
     def handle(self, nothing):
-        self.handler()
-
-def map_to_vertx(value):
-    """Converts a Jython type to a Vert.x type."""
-    if value is None:
-        return value
-    if isinstance(value, (list, tuple)):
-        return org.vertx.java.core.json.JsonArray(map_seq_to_java(value))
-    elif isinstance(value, dict):
-        return org.vertx.java.core.json.JsonObject(map_dict_to_java(value))
-    elif isinstance(value, Buffer):
-        return value._to_java_buffer()
-    elif isinstance(value, long):
-        return Long(value)
-    elif isinstance(value, float):
-        return Double(value)
-    elif isinstance(value, int):
-        return Integer(value)
-    return value
+        self.output._wait_drained()
+
+class _BulkGroupHandler(org.vertx.java.core.Handler):
+    """Fills and ends a Java output group, creating nested groups.
+
+    Nested groups are opened asynchronously, so a group with nested groups
+    is only ended, and its handler only called, once the handlers of all of
+    its nested groups have finished.
+    """
+    def __init__(self, messages, nested, encode, metrics=None, handler=None):
+        self.messages = messages
+        self.nested = nested
+        self.encode = encode
+        self.metrics = metrics
+        self.handler = handler
+        self.group = None
+        self.pending = 0
+    def handle(self, group):
+        nested, encode, metrics = self.nested, self.encode, self.metrics
+        if nested:
+            members = list(self.messages)
+            if members:
+                name, children = nested[0], nested[1:]
+                self.group = group
+                # Children may end before group() returns, so all of them
+                # are counted before the first one is requested.
+                self.pending = len(members)
+                for items in members:
+                    group.group(name, _BulkGroupHandler(items, children, encode, metrics, self._child_ended))
+                return
+        else:
+            send, stamp = group.send, tracing.stamp
+            measure = metrics is not None and metrics.enabled
+            count = size = 0
+            for message in self.messages:
+                value = stamp(encode(message))
+                send(value)
+                count += 1
+                if measure:
+                    size += message_size(value)
+            if count and measure:
+                metrics.sent(None, count, size)
+        self._end(group)
+    def _child_ended(self):
+        self.pending -= 1
+        if self.pending == 0:
+            self._end(self.group)
+    def _end(self, group):
+        group.end()
+        if self.handler is not None:
+            self.handler()
+
+class _Coalescer(object):
+    """Packs encoded messages into single event bus messages.
+
+    Nothing is sent while the output's send queue is full. Messages are
+    held, and sent once the queue drains.
+    """
+    def __init__(self, output, max_messages, max_delay_ms):
+        self.output = output
+        self.java_obj = output.java_obj
+        self.max_messages = max_messages
+        self.max_delay = max_delay_ms
+        self.messages = []
+        self.timer_id = None
+        self.waiting = False
+
+    def add(self, message):
+        messages = self.messages
+        messages.append(message)
+        if len(messages) >= self.max_messages:
+            self.flush()
+        elif self.timer_id is None and not self.waiting:
+            self.timer_id = vertx.set_timer(self.max_delay, self._timeout)
+
+    def _timeout(self, timer_id):
+        self.timer_id = None
+        self.flush()
+
+    def _drained(self):
+        self.waiting = False
+        self.flush()
+
+    def flush(self):
+        if self.timer_id is not None:
+            vertx.cancel_timer(self.timer_id)
+            self.timer_id = None
+        if not self.messages or self.waiting:
+            return
+        if self.java_obj.sendQueueFull():
+            self.waiting = True
+            self.output._queue_full()
+            self.output._wait_for_drain(self._drained)
+            return
+        messages, self.messages = self.messages, []
+        send = self.java_obj.send
+        for value in packets(messages, self.max_messages):
+            send(value)
+
+class _Pump(object):
+    """Sends messages from an iterator while the send queue is not full.
+
+    The pump parks on the output's drain handler when the send queue fills
+    and resumes pulling from the iterator once it drains. Drain events are
+    ignored unless the pump is parked, so repeated or re-entrant drains
+    cannot send twice. Messages sent on a coalescing port are passed to
+    its coalescer.
+    """
+    def __init__(self, output, messages, handler=None):
+        self.output = output
+        self.java_obj = output.java_obj
+        self.messages = iter(messages)
+        self.handler = handler
+        self.encode = output._encode
+        self.coalescer = getattr(output, '_coalescer', None)
+        self.parked = False
+        self.running = False
+        self.complete = False
+
+    def _drain(self):
+        if self.parked:
+            self.parked = False
+            self.pump()
+
+    def _park(self):
+        self.parked = True
+        self.output._queue_full()
+        self.output._wait_for_drain(self._drain)
+
+    def pump(self):
+        if self.running or self.complete:
+            return
+        java_obj = self.java_obj
+        send, full, encode, stamp = java_obj.send, java_obj.sendQueueFull, self.encode, tracing.stamp
+        if self.coalescer is not None:
+            send = self.coalescer.add
+        if full():
+            self._park()
+            return
+        self.running = True
+        metrics = self.output._metrics
+        measure = metrics is not None and metrics.enabled
+        count = size = 0
+        try:
+            for message in self.messages:
+                value = stamp(encode(message))
+                send(value)
+                count += 1
+                if measure:
+                    size += message_size(value)
+                if full():
+                    self._park()
+                    return
+            self.complete = True
+        except:
+            self.complete = True
+            raise
+        finally:
+            self.running = False
+            if count and measure:
+                metrics.sent(None, count, size)
+        if self.handler is not None:
+            self.handler()
@@ -0,0 +1,108 @@
+# Copyright 2014 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import org.vertx.java.core.json.JsonObject
+import org.vertx.java.core.buffer.Buffer
+from hashing import hash32
+from convert import map_to_vertx, map_to_java
+
+# The field of a component's configuration holding the partition key
+# field paths of its output ports, keyed by port name.
+CONFIG_FIELD = 'vertigo.partition'
+
+def key_extractor(key):
+    """Returns a function extracting a partition key from a message.
+
+    Keyword arguments:
+    @param key: A function returning a message's key, or a message field
+    name. Nested fields are named by dotted paths such as 'user.id'.
+
+    @return: A function returning a message's key, or None if the message
+    does not have the key field.
+    """
+    if callable(key):
+        return key
+    path = key.split('.')
+    def extract(message):
+        for field in path:
+            try:
+                message = message.get(field)
+            except AttributeError:
+                return None
+            if message is None:
+                return None
+        return message
+    return extract
+
+def partitioner(encode, key):
+    """Wraps an encoder to key encoded messages for hash selectors.
+
+    Vertigo's hash selector routes each message by its hash code, which
+    for a Json object or buffer is computed from its whole content.
+    Encoded Json objects are sent as KeyedJsonObjects and buffers, such as
+    compressed messages, as KeyedBuffers, so that only the message's key
+    is hashed. Buffers whose message has no key and other messages are
+    sent unchanged.
+
+    Keyword arguments:
+    @param encode: The encoder to wrap.
+    @param key: A function returning a message's key, or a message field path.
+
+    @return: An encoder.
+    """
+    extract = key_extractor(key)
+    def encode_keyed(message):
+        if encode is map_to_vertx and isinstance(message, dict):
+            return KeyedJsonObject(map_to_java(message), extract(message))
+        value = encode(message)
+        if isinstance(value, org.vertx.java.core.json.JsonObject):
+            return KeyedJsonObject(value.toMap(), extract(message))
+        elif isinstance(value, org.vertx.java.core.buffer.Buffer):
+            message_key = extract(message)
+            if message_key is not None:
+                return KeyedBuffer(value, message_key)
+        return value
+    return encode_keyed
+
+def key_hash(key):
+    """Returns the stable hash of a key as a signed 32-bit Java int."""
+    value = hash32(key)
+    if value & 0x80000000:
+        value -= 0x100000000
+    return value
+
+class KeyedJsonObject(org.vertx.java.core.json.JsonObject):
+    """Json object whose hash code is the stable hash of a partition key.
+
+    The object is created from the message's Java map, and the hash code
+    is the same in every JVM.
+    """
+    def __init__(self, map, key):
+        org.vertx.java.core.json.JsonObject.__init__(self, map)
+        self._hash = key_hash(key)
+
+    def hashCode(self):
+        return self._hash
+
+class KeyedBuffer(org.vertx.java.core.buffer.Buffer):
+    """Buffer whose hash code is the stable hash of a partition key.
+
+    The buffer shares the memory of the encoded buffer rather than
+    copying it.
+    """
+    def __init__(self, value, key):
+        org.vertx.java.core.buffer.Buffer.__init__(self, value.getByteBuf())
+        self._hash = key_hash(key)
+
+    def hashCode(self):
+        return self._hash
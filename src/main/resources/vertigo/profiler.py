@@ -0,0 +1,272 @@
+# Copyright 2014 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import sys, os, time, vertx
+from java.lang import System
+
+# The active profiler, if the component is being profiled.
+_profiler = None
+
+# Deeper call stacks are truncated to bound the number of distinct stacks.
+_MAX_DEPTH = 32
+
+def _clock():
+    return System.nanoTime() / 1000000000.0
+
+def start(sample_rate=0.01, output=None, interval=10000):
+    """Starts profiling the component's handlers.
+
+    Keyword arguments:
+    @param sample_rate: The fraction of handler invocations to profile.
+    @param output: An optional path of a file to which to write reports.
+    @param interval: The interval in milliseconds at which to write reports.
+
+    @return: The profiler.
+    """
+    global _profiler
+    if _profiler is None:
+        _profiler = Profiler(sample_rate, output)
+    else:
+        _profiler.sample_rate = sample_rate
+        _profiler.output = output
+    if output is not None and _profiler.timer_id is None:
+        _profiler.timer_id = vertx.set_periodic(interval, lambda timer_id: _profiler.write())
+    return _profiler.enable()
+
+def stop():
+    """Stops profiling and writes a final report if an output file was given.
+
+    Handlers remain wrapped, so profiling can be resumed with start().
+    """
+    if _profiler is not None:
+        _profiler.disable()
+        if _profiler.timer_id is not None:
+            vertx.cancel_timer(_profiler.timer_id)
+            _profiler.timer_id = None
+        if _profiler.output is not None:
+            _profiler.write()
+
+def wrap(name, handler):
+    """Wraps a handler for profiling.
+
+    Input handlers are registered with and without the wrapper, and the
+    wrapped handler is only called once profiling has been started, so
+    handlers registered before profiling is started are profiled once it
+    is. While the component is not being profiled, the wrapper only checks
+    whether it is.
+
+    Keyword arguments:
+    @param name: A name identifying the handler in reports.
+    @param handler: The handler to wrap.
+
+    @return: The wrapped handler.
+    """
+    def profiled(*args):
+        profiler = _profiler
+        if profiler is None or not profiler.enabled:
+            return handler(*args)
+        return profiler.call(name, handler, args)
+    return profiled
+
+def _label(code):
+    return '%s (%s:%d)' % (code.co_name, os.path.basename(code.co_filename), code.co_firstlineno)
+
+class HandlerProfile(object):
+    """Timings and call stacks of a profiled handler."""
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.samples = 0
+        self.time = 0.0
+        self.max = 0.0
+        self.stacks = {}
+
+    def mean(self):
+        """Returns the mean time of sampled invocations in seconds."""
+        if not self.samples:
+            return 0.0
+        return self.time / self.samples
+
+    def hottest(self, count=10):
+        """Returns the call stacks with the most time spent in their innermost call.
+
+        @return: A list of (time, stack) tuples, hottest first.
+        """
+        stacks = [(elapsed, stack) for stack, elapsed in self.stacks.items()]
+        stacks.sort()
+        stacks.reverse()
+        return stacks[:count]
+
+class _Sampler(object):
+    """Profile function attributing elapsed time to the current call stack."""
+    def __init__(self, stacks, clock):
+        self.stacks = stacks
+        self.clock = clock
+        self.stack = []
+        self.last = clock()
+
+    def __call__(self, frame, event, arg):
+        now = self.clock()
+        stack = self.stack
+        if stack:
+            key = tuple(stack)
+            self.stacks[key] = self.stacks.get(key, 0.0) + now - self.last
+        if event == 'call':
+            if len(stack) < _MAX_DEPTH:
+                stack.append(_label(frame.f_code))
+            else:
+                stack.append(stack[-1])
+        elif event == 'return' and stack:
+            stack.pop()
+        self.last = self.clock()
+
+class Profiler(object):
+    """Sampling profiler for component handlers.
+
+    Every Nth invocation of a wrapped handler is timed and run under a
+    profile function that attributes time to the call stacks it spends it
+    in, where N is derived from the sample rate. Other invocations only
+    increment a counter, so the overhead of an enabled profiler is
+    proportional to the sample rate and that of a disabled one is a single
+    attribute check.
+
+    Keyword arguments:
+    @param sample_rate: The fraction of handler invocations to profile.
+    @param output: An optional path of a file to which write() writes reports.
+    """
+    timer_id = None
+
+    def __init__(self, sample_rate=0.01, output=None, clock=_clock):
+        self.sample_rate = sample_rate
+        self.output = output
+        self.clock = clock
+        self.enabled = False
+        self.handlers = {}
+
+    def _get_sample_rate(self):
+        return self._sample_rate
+
+    def _set_sample_rate(self, sample_rate):
+        if sample_rate <= 0 or sample_rate > 1:
+            raise ValueError("The sample rate must be greater than 0 and at most 1.")
+        self._sample_rate = sample_rate
+        self.period = max(1, int(round(1.0 / sample_rate)))
+
+    sample_rate = property(_get_sample_rate, _set_sample_rate)
+
+    def enable(self):
+        """Enables profiling."""
+        self.enabled = True
+        return self
+
+    def disable(self):
+        """Disables profiling."""
+        self.enabled = False
+        return self
+
+    def reset(self):
+        """Discards all collected profiles."""
+        for name in self.handlers.keys():
+            self.handlers[name] = HandlerProfile(name)
+        return self
+
+    def _profile(self, name):
+        if name not in self.handlers:
+            self.handlers[name] = HandlerProfile(name)
+        return self.handlers[name]
+
+    def wrap(self, name, handler):
+        """Wraps a handler for profiling.
+
+        Keyword arguments:
+        @param name: A name identifying the handler in reports.
+        @param handler: The handler to wrap.
+
+        @return: The wrapped handler.
+        """
+        self._profile(name)
+        def profiled(*args):
+            return self.call(name, handler, args)
+        return profiled
+
+    def call(self, name, handler, args):
+        """Calls a handler, profiling the call if it is sampled.
+
+        Keyword arguments:
+        @param name: A name identifying the handler in reports.
+        @param handler: The handler to call.
+        @param args: A tuple of the arguments with which to call the handler.
+
+        @return: The handler's result.
+        """
+        if not self.enabled:
+            return handler(*args)
+        profile = self._profile(name)
+        profile.calls += 1
+        if profile.calls % self.period:
+            return handler(*args)
+        return self._sample(profile, handler, args)
+
+    def _sample(self, profile, handler, args):
+        clock = self.clock
+        sampler = _Sampler(profile.stacks, clock)
+        start = clock()
+        sys.setprofile(sampler)
+        try:
+            return handler(*args)
+        finally:
+            sys.setprofile(None)
+            elapsed = clock() - start
+            profile.samples += 1
+            profile.time += elapsed
+            if elapsed > profile.max:
+                profile.max = elapsed
+
+    def report(self, stacks=10):
+        """Returns a text report of the hottest handlers and call stacks.
+
+        Keyword arguments:
+        @param stacks: The number of call stacks to report for each handler.
+
+        @return: The report.
+        """
+        lines = ['Handler profile at %s, sampling 1 in %d invocations' % (time.strftime('%Y-%m-%d %H:%M:%S'), self.period)]
+        profiles = [(profile.time, name, profile) for name, profile in self.handlers.items()]
+        profiles.sort()
+        profiles.reverse()
+        for total, name, profile in profiles:
+            lines.append('')
+            lines.append('%s: %d calls, %d sampled, mean %.3f ms, max %.3f ms' % (name, profile.calls, profile.samples, profile.mean() * 1000, profile.max * 1000))
+            for elapsed, stack in profile.hottest(stacks):
+                percent = total and elapsed / total * 100 or 0.0
+                lines.append('  %5.1f%% %10.3f ms  %s' % (percent, elapsed * 1000, ' > '.join(stack)))
+        return '\n'.join(lines) + '\n'
+
+    def write(self, output=None):
+        """Writes a report to a file.
+
+        Keyword arguments:
+        @param output: The path of the file to write. Defaults to the profiler's output.
+
+        @return: self
+        """
+        if output is None:
+            output = self.output
+        if output is None:
+            raise ValueError("No profiler output file given.")
+        f = open(output, 'w')
+        try:
+            f.write(self.report())
+        finally:
+            f.close()
+        return self
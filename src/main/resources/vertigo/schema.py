@@ -0,0 +1,242 @@
+# Copyright 2014 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import org.vertx.java.core.json.JsonObject
+from java.lang import (
+    Long,
+    Double,
+    Integer,
+    Boolean
+)
+from java.util import (
+    Map,
+    List,
+    HashMap,
+    ArrayList
+)
+from convert import map_to_java, map_from_vertx
+
+class SchemaError(ValueError):
+    """Raised when a message does not match a port schema."""
+
+def compile_schema(schema):
+    """Compiles a message schema into a codec.
+
+    A schema is a dictionary mapping field names to field types. Field types
+    may be one of bool, int, long, float, str, unicode, dict or list, a
+    nested schema dictionary, or a single element list containing the type
+    of each item in a list field. All fields are required and messages with
+    unknown fields are rejected.
+
+    Keyword arguments:
+    @param schema: The schema to compile.
+
+    @return: A compiled codec.
+    """
+    return Codec(schema)
+
+class Codec(object):
+    """Message codec compiled from a schema."""
+    def __init__(self, schema):
+        if not isinstance(schema, dict):
+            raise SchemaError("A schema must be a dictionary of field types.")
+        self.schema = schema
+        self._encoder = _encoder(schema)
+        self._decoder = _decoder(schema)
+
+    def encode(self, message):
+        """Encodes a message to a Vert.x type.
+
+        Keyword arguments:
+        @param message: The message to encode.
+
+        @return: A JsonObject.
+        """
+        return org.vertx.java.core.json.JsonObject(self._encoder(message, None, None))
+
+    def decode(self, message):
+        """Decodes a Vert.x type to a message.
+
+        Keyword arguments:
+        @param message: The JsonObject to decode.
+
+        @return: A dictionary.
+        """
+        if not isinstance(message, org.vertx.java.core.json.JsonObject):
+            raise SchemaError("expected an object, got %r" % (message,))
+        return self._decoder(message.toMap(), None, None)
+
+def _path(path, name):
+    """Returns the path to a field for error messages."""
+    if name is None:
+        return path
+    elif isinstance(name, int):
+        return '%s[%d]' % (path or '', name)
+    elif path is None:
+        return name
+    return '%s.%s' % (path, name)
+
+def _error(path, name, message):
+    return SchemaError('%s: %s' % (_path(path, name) or 'message', message))
+
+# Field types mapped to (accepted Jython types, Java constructor).
+_SCALARS = {
+    bool: ((bool,), Boolean),
+    int: ((int, long), Integer),
+    long: ((int, long), Long),
+    float: ((int, long, float), Double),
+    str: ((str, unicode), None),
+    unicode: ((str, unicode), None),
+    basestring: ((str, unicode), None),
+}
+
+def _encoder(spec):
+    """Compiles an encoder for a field type."""
+    if isinstance(spec, dict):
+        return _object_encoder(spec)
+    elif isinstance(spec, list):
+        if len(spec) != 1:
+            raise SchemaError("List field types must contain exactly one item type.")
+        return _list_encoder(_encoder(spec[0]))
+    elif spec in _SCALARS:
+        types, cls = _SCALARS[spec]
+        return _scalar_encoder(types, cls, spec.__name__)
+    elif spec is dict or spec is list:
+        return _any_encoder(spec is dict and (dict,) or (list, tuple), spec.__name__)
+    raise SchemaError("Unsupported field type %r." % (spec,))
+
+def _scalar_encoder(types, cls, type_name):
+    def encode(value, path, name):
+        if type(value) not in types:
+            raise _error(path, name, "expected %s, got %r" % (type_name, value))
+        if cls is not None:
+            return cls(value)
+        return value
+    return encode
+
+def _any_encoder(types, type_name):
+    def encode(value, path, name):
+        if not isinstance(value, types):
+            raise _error(path, name, "expected %s, got %r" % (type_name, value))
+        return map_to_java(value)
+    return encode
+
+def _list_encoder(item_encoder):
+    def encode(value, path, name):
+        if type(value) is not list and type(value) is not tuple:
+            raise _error(path, name, "expected list, got %r" % (value,))
+        path = _path(path, name)
+        result = ArrayList(len(value))
+        add = result.add
+        index = 0
+        for item in value:
+            add(item_encoder(item, path, index))
+            index += 1
+        return result
+    return encode
+
+def _object_encoder(schema):
+    fields = [(name, _encoder(spec)) for name, spec in schema.iteritems()]
+    count = len(fields)
+    def encode(value, path, name):
+        if type(value) is not dict:
+            raise _error(path, name, "expected object, got %r" % (value,))
+        path = _path(path, name)
+        if len(value) > count:
+            raise _error(path, None, "unknown fields %s" % ', '.join([repr(key) for key in value if key not in schema]))
+        result = HashMap(count)
+        put = result.put
+        for field, encoder in fields:
+            try:
+                item = value[field]
+            except KeyError:
+                raise _error(path, field, "missing field")
+            put(field, encoder(item, path, field))
+        return result
+    return encode
+
+# Field types mapped to the Jython types Java values are converted to.
+_SCALAR_TYPES = {
+    bool: (bool,),
+    int: (int, long),
+    long: (int, long),
+    float: (int, long, float),
+    str: (unicode, str),
+    unicode: (unicode, str),
+    basestring: (unicode, str),
+}
+
+def _decoder(spec):
+    """Compiles a decoder for a field type."""
+    if isinstance(spec, dict):
+        return _object_decoder(spec)
+    elif isinstance(spec, list):
+        if len(spec) != 1:
+            raise SchemaError("List field types must contain exactly one item type.")
+        return _list_decoder(_decoder(spec[0]))
+    elif spec in _SCALAR_TYPES:
+        return _scalar_decoder(_SCALAR_TYPES[spec], spec is float and float or None, spec.__name__)
+    elif spec is dict:
+        return _any_decoder(Map, 'object')
+    elif spec is list:
+        return _any_decoder(List, 'list')
+    raise SchemaError("Unsupported field type %r." % (spec,))
+
+def _scalar_decoder(types, cls, type_name):
+    def decode(value, path, name):
+        if type(value) not in types:
+            raise _error(path, name, "expected %s, got %r" % (type_name, value))
+        if cls is not None:
+            return cls(value)
+        return value
+    return decode
+
+def _any_decoder(java_type, type_name):
+    def decode(value, path, name):
+        if not isinstance(value, java_type):
+            raise _error(path, name, "expected %s, got %r" % (type_name, value))
+        return map_from_vertx(value)
+    return decode
+
+def _list_decoder(item_decoder):
+    def decode(value, path, name):
+        if not isinstance(value, List):
+            raise _error(path, name, "expected list, got %r" % (value,))
+        path = _path(path, name)
+        result = []
+        append = result.append
+        index = 0
+        for item in value:
+            append(item_decoder(item, path, index))
+            index += 1
+        return result
+    return decode
+
+def _object_decoder(schema):
+    fields = [(name, _decoder(spec)) for name, spec in schema.iteritems()]
+    count = len(fields)
+    def decode(value, path, name):
+        if not isinstance(value, Map):
+            raise _error(path, name, "expected object, got %r" % (value,))
+        path = _path(path, name)
+        if value.size() > count:
+            raise _error(path, None, "unknown fields %s" % ', '.join([repr(key) for key in value.keySet() if key not in schema]))
+        result = {}
+        get = value.get
+        for field, decoder in fields:
+            item = get(field)
+            if item is None:
+                raise _error(path, field, "missing field")
+            result[field] = decoder(item, path, field)
+        return result
+    return decode
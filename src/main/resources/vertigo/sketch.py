@@ -0,0 +1,317 @@
+# Copyright 2014 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import math, heapq
+from hashing import hash128
+
+_MASK64 = (1 << 64) - 1
+
+def from_dict(data):
+    """Rebuilds a sketch from a dictionary returned by its to_dict() method."""
+    return _TYPES[data['type']].from_dict(data)
+
+def merge(sketches):
+    """Merges a sequence of sketches or sketch dictionaries.
+
+    @return: A new sketch.
+    """
+    result = None
+    for sketch in sketches:
+        if isinstance(sketch, dict):
+            sketch = from_dict(sketch)
+        if result is None:
+            result = from_dict(sketch.to_dict())
+        else:
+            result.merge(sketch)
+    return result
+
+class CountMin(object):
+    """Count-Min sketch for frequency estimation.
+
+    Estimates never undercount, and overcount by at most
+    e / width * total with probability 1 - e ** -depth, using
+    width * depth counters regardless of the number of distinct items.
+
+    Keyword arguments:
+    @param width: The number of counters per row.
+    @param depth: The number of rows.
+    """
+    def __init__(self, width=2719, depth=5):
+        self.width = width
+        self.depth = depth
+        self.total = 0
+        self.rows = [[0] * width for i in range(depth)]
+
+    def _indexes(self, item):
+        h1, h2 = hash128(item)
+        width = self.width
+        return [((h1 + i * h2) & _MASK64) % width for i in range(self.depth)]
+
+    def add(self, item, count=1):
+        """Adds an item to the sketch.
+
+        Keyword arguments:
+        @param item: The item to count.
+        @param count: The number of occurrences to add.
+
+        @return: self
+        """
+        rows = self.rows
+        for i, index in enumerate(self._indexes(item)):
+            rows[i][index] += count
+        self.total += count
+        return self
+
+    def estimate(self, item):
+        """Returns the estimated count of an item."""
+        rows = self.rows
+        return min([rows[i][index] for i, index in enumerate(self._indexes(item))])
+
+    __getitem__ = estimate
+
+    def merge(self, other):
+        """Merges another sketch of the same dimensions into this sketch.
+
+        @return: self
+        """
+        if isinstance(other, dict):
+            other = CountMin.from_dict(other)
+        if other.width != self.width or other.depth != self.depth:
+            raise ValueError("Cannot merge Count-Min sketches with different dimensions.")
+        for row, other_row in zip(self.rows, other.rows):
+            for i in xrange(self.width):
+                row[i] += other_row[i]
+        self.total += other.total
+        return self
+
+    def to_dict(self):
+        """Returns the sketch as a dictionary."""
+        return {'type': 'count-min', 'width': self.width, 'depth': self.depth, 'total': self.total, 'rows': self.rows}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuilds a sketch from a dictionary returned by to_dict()."""
+        sketch = cls(data['width'], data['depth'])
+        sketch.total = data['total']
+        sketch.rows = [list(row) for row in data['rows']]
+        return sketch
+
+class SpaceSaving(object):
+    """Space-Saving summary of the most frequent items.
+
+    At most k items are counted. When a new item arrives while the summary
+    is full, it replaces the item with the smallest count and inherits that
+    count as its maximum overcount. Every item occurring more than
+    total / k times is guaranteed to be in the summary.
+
+    Keyword arguments:
+    @param k: The number of items to count.
+    """
+    def __init__(self, k=100):
+        self.k = k
+        self.total = 0
+        self.counters = {}
+        self._heap = []
+
+    def add(self, item, count=1):
+        """Adds an item to the summary.
+
+        Keyword arguments:
+        @param item: The item to count.
+        @param count: The number of occurrences to add.
+
+        @return: self
+        """
+        counters = self.counters
+        self.total += count
+        counter = counters.get(item)
+        if counter is not None:
+            counter[0] += count
+        elif len(counters) < self.k:
+            counter = counters[item] = [count, 0]
+        else:
+            minimum, evicted = self._pop_min()
+            del counters[evicted]
+            counter = counters[item] = [minimum + count, minimum]
+        self._push(counter[0], item)
+        return self
+
+    def _push(self, count, item):
+        heap = self._heap
+        heapq.heappush(heap, (count, item))
+        # Stale heap entries are left in place, so rebuild the heap once
+        # they outnumber the live entries.
+        if len(heap) > 4 * self.k + 16:
+            self._heap = [(counter[0], key) for key, counter in self.counters.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_min(self):
+        heap, counters = self._heap, self.counters
+        while True:
+            count, item = heapq.heappop(heap)
+            counter = counters.get(item)
+            if counter is not None and counter[0] == count:
+                return count, item
+
+    def top(self, n=None):
+        """Returns the most frequent items.
+
+        Keyword arguments:
+        @param n: The number of items to return. Defaults to all counted items.
+
+        @return: A list of (item, count, error) tuples, most frequent first,
+        where count - error is a lower bound of the item's true count.
+        """
+        items = [(counter[0], counter[1], item) for item, counter in self.counters.items()]
+        items.sort()
+        items.reverse()
+        return [(item, count, error) for count, error, item in items[:n]]
+
+    def merge(self, other):
+        """Merges another summary into this summary.
+
+        Items missing from a full summary may have occurred up to its
+        smallest count, so that count is added to their counts and errors.
+
+        @return: self
+        """
+        if isinstance(other, dict):
+            other = SpaceSaving.from_dict(other)
+        mine = self._floor()
+        theirs = other._floor()
+        merged = {}
+        for item, (count, error) in self.counters.items():
+            merged[item] = [count + theirs, error + theirs]
+        for item, (count, error) in other.counters.items():
+            if item in merged:
+                merged[item][0] += count - theirs
+                merged[item][1] += error - theirs
+            else:
+                merged[item] = [count + mine, error + mine]
+        items = [(counter[0], item) for item, counter in merged.items()]
+        items.sort()
+        items.reverse()
+        self.counters = {}
+        for count, item in items[:self.k]:
+            self.counters[item] = merged[item]
+        self._heap = [(counter[0], item) for item, counter in self.counters.items()]
+        heapq.heapify(self._heap)
+        self.total += other.total
+        return self
+
+    def _floor(self):
+        if len(self.counters) < self.k:
+            return 0
+        return min([counter[0] for counter in self.counters.values()])
+
+    def to_dict(self):
+        """Returns the summary as a dictionary."""
+        return {'type': 'space-saving', 'k': self.k, 'total': self.total,
+                'counters': [[item, count, error] for item, count, error in self.top()]}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuilds a summary from a dictionary returned by to_dict()."""
+        summary = cls(data['k'])
+        summary.total = data['total']
+        for item, count, error in data['counters']:
+            summary.counters[item] = [count, error]
+        summary._heap = [(counter[0], item) for item, counter in summary.counters.items()]
+        heapq.heapify(summary._heap)
+        return summary
+
+class HyperLogLog(object):
+    """HyperLogLog distinct counter.
+
+    Counts distinct items with a standard error of about
+    1.04 / sqrt(2 ** precision) using 2 ** precision small registers.
+
+    Keyword arguments:
+    @param precision: The number of index bits, from 4 to 16.
+    """
+    def __init__(self, precision=14):
+        if precision < 4 or precision > 16:
+            raise ValueError("HyperLogLog precision must be between 4 and 16.")
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = [0] * self.m
+
+    def add(self, item):
+        """Adds an item to the counter.
+
+        @return: self
+        """
+        h = hash128(item)[0]
+        p = self.precision
+        index = h >> (64 - p)
+        w = (h << p) & _MASK64
+        rank = 1
+        while rank <= 64 - p and not w & (1 << 63):
+            rank += 1
+            w <<= 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+        return self
+
+    def count(self):
+        """Returns the estimated number of distinct items."""
+        m = self.m
+        if m == 16:
+            alpha = 0.673
+        elif m == 32:
+            alpha = 0.697
+        elif m == 64:
+            alpha = 0.709
+        else:
+            alpha = 0.7213 / (1 + 1.079 / m)
+        total = 0.0
+        zeros = 0
+        for register in self.registers:
+            total += 2.0 ** -register
+            if register == 0:
+                zeros += 1
+        estimate = alpha * m * m / total
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(float(m) / zeros)
+        return int(round(estimate))
+
+    __len__ = count
+
+    def merge(self, other):
+        """Merges another counter of the same precision into this counter.
+
+        @return: self
+        """
+        if isinstance(other, dict):
+            other = HyperLogLog.from_dict(other)
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog counters with different precisions.")
+        self.registers = map(max, self.registers, other.registers)
+        return self
+
+    def to_dict(self):
+        """Returns the counter as a dictionary."""
+        return {'type': 'hyperloglog', 'precision': self.precision, 'registers': self.registers}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuilds a counter from a dictionary returned by to_dict()."""
+        counter = cls(data['precision'])
+        counter.registers = list(data['registers'])
+        return counter
+
+_TYPES = {
+    'count-min': CountMin,
+    'space-saving': SpaceSaving,
+    'hyperloglog': HyperLogLog,
+}
@@ -0,0 +1,538 @@
+# Copyright 2014 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os, struct, tempfile, cPickle, cStringIO
+from UserDict import DictMixin
+from hashing import hash128
+
+# Approximate per-object overheads in bytes, used to estimate memory use.
+_OBJECT_SIZE = 16
+_ENTRY_SIZE = 64
+
+def sizeof(value):
+    """Estimates the memory used by a value in bytes.
+
+    The estimate covers strings, numbers and nested lists, tuples, sets
+    and dictionaries. It is meant for budgeting, not exact accounting.
+    """
+    size = 0
+    stack = [value]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, basestring):
+            size += _OBJECT_SIZE + len(value) * (isinstance(value, unicode) and 2 or 1)
+        elif isinstance(value, dict):
+            size += _OBJECT_SIZE + len(value) * _OBJECT_SIZE
+            stack.extend(value.keys())
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple, set, frozenset)):
+            size += _OBJECT_SIZE + len(value) * 8
+            stack.extend(value)
+        else:
+            size += _OBJECT_SIZE
+    return size
+
+def _dump(value):
+    return cPickle.dumps(value, 2)
+
+def _canonical(key):
+    """Returns a key in the form keys equal in memory share on disk.
+
+    Byte strings are decoded from UTF-8 where possible, so that str and
+    unicode keys match, and longs are turned into ints where they fit.
+    """
+    if isinstance(key, str):
+        try:
+            return key.decode('utf-8')
+        except UnicodeError:
+            return key
+    elif isinstance(key, long):
+        return int(key)
+    elif isinstance(key, tuple):
+        return tuple([_canonical(item) for item in key])
+    return key
+
+def _dump_key(key):
+    # Without a memo, the pickle of a key does not depend on how many
+    # references to its parts exist, so equal keys always pickle alike.
+    buffer = cStringIO.StringIO()
+    pickler = cPickle.Pickler(buffer, 2)
+    pickler.fast = 1
+    pickler.dump(_canonical(key))
+    return buffer.getvalue()
+
+# Index slots hold a key hash and one more than the offset of the key's
+# record in the data file. An offset of zero marks an empty slot and -1
+# marks a slot whose key was deleted.
+_SLOT = '>Qq'
+_SLOT_SIZE = struct.calcsize(_SLOT)
+_RECORD = '>ii'
+_RECORD_SIZE = struct.calcsize(_RECORD)
+_EMPTY, _DELETED = 0, -1
+_MIN_SLOTS = 1024
+_SCAN_SLOTS = 4096
+# Data files are only compacted once they hold this many dead bytes.
+_MIN_COMPACT = 1048576
+
+def _remove(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+class DiskTable(object):
+    """On-disk hash table of byte string keys and values.
+
+    Records are appended to a data file, and an open-addressing hash index
+    of record offsets is kept in an index file rather than in memory, so
+    memory use does not grow with the number of keys. Lookups, inserts,
+    updates and deletes each read or write a few index slots and a record.
+
+    Updated and deleted records stay in the data file until the dead space
+    exceeds the live data, when the data file is compacted. The index is
+    rebuilt once it is half full. Both are amortized O(1) per write.
+
+    Keyword arguments:
+    @param path: The path of the table, without a file extension. Any
+    previous table at the path is removed.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._count = self._deleted = 0
+        self._live = self._dead = 0
+        for extension in ('.idx', '.dat', '.idx.tmp', '.dat.tmp'):
+            _remove(path + extension)
+        self._data = open(path + '.dat', 'w+b')
+        self._index = self._create_index(path + '.idx', _MIN_SLOTS)
+        self._slots = _MIN_SLOTS
+
+    def _create_index(self, path, slots):
+        index = open(path, 'w+b')
+        empty = struct.pack(_SLOT, 0, _EMPTY) * _SCAN_SLOTS
+        remaining = slots
+        while remaining > 0:
+            count = min(remaining, _SCAN_SLOTS)
+            index.write(empty[:count * _SLOT_SIZE])
+            remaining -= count
+        return index
+
+    def __len__(self):
+        return self._count
+
+    def _read_slot(self, slot):
+        self._index.seek(slot * _SLOT_SIZE)
+        return struct.unpack(_SLOT, self._index.read(_SLOT_SIZE))
+
+    def _write_slot(self, slot, digest, offset):
+        self._index.seek(slot * _SLOT_SIZE)
+        self._index.write(struct.pack(_SLOT, digest, offset))
+
+    def _read_record(self, offset):
+        data = self._data
+        data.seek(offset)
+        key_length, value_length = struct.unpack(_RECORD, data.read(_RECORD_SIZE))
+        record = data.read(key_length + value_length)
+        return record[:key_length], record[key_length:]
+
+    def _append(self, key, value):
+        data = self._data
+        data.seek(0, 2)
+        offset = data.tell()
+        data.write(struct.pack(_RECORD, len(key), len(value)))
+        data.write(key)
+        data.write(value)
+        self._live += _RECORD_SIZE + len(key) + len(value)
+        return offset
+
+    def _find(self, key, digest):
+        """Returns the slot holding a key, and the first free slot probed."""
+        mask = self._slots - 1
+        slot = digest & mask
+        free = None
+        while True:
+            slot_digest, offset = self._read_slot(slot)
+            if offset == _EMPTY:
+                if free is None:
+                    free = slot
+                return None, free
+            elif offset == _DELETED:
+                if free is None:
+                    free = slot
+            elif slot_digest == digest and self._read_record(offset - 1)[0] == key:
+                return slot, free
+            slot = (slot + 1) & mask
+
+    def _hash(self, key):
+        return hash128(key)[0]
+
+    def get(self, key, default=None):
+        """Returns the value of a key, or default if the key is not in the table."""
+        slot, free = self._find(key, self._hash(key))
+        if slot is None:
+            return default
+        return self._read_record(self._read_slot(slot)[1] - 1)[1]
+
+    def __contains__(self, key):
+        return self._find(key, self._hash(key))[0] is not None
+
+    def __setitem__(self, key, value):
+        digest = self._hash(key)
+        slot, free = self._find(key, digest)
+        offset = self._append(key, value)
+        if slot is not None:
+            self._release(self._read_slot(slot)[1] - 1)
+        else:
+            slot = free
+            if self._read_slot(slot)[1] == _DELETED:
+                self._deleted -= 1
+            self._count += 1
+        self._write_slot(slot, digest, offset + 1)
+        if (self._count + self._deleted) * 2 > self._slots:
+            self._rebuild()
+        self._collect()
+
+    def __delitem__(self, key):
+        digest = self._hash(key)
+        slot, free = self._find(key, digest)
+        if slot is None:
+            raise KeyError(key)
+        self._release(self._read_slot(slot)[1] - 1)
+        self._write_slot(slot, 0, _DELETED)
+        self._count -= 1
+        self._deleted += 1
+        self._collect()
+
+    def _collect(self):
+        if self._dead > self._live and self._dead > _MIN_COMPACT:
+            self._compact()
+
+    def _release(self, offset):
+        self._data.seek(offset)
+        key_length, value_length = struct.unpack(_RECORD, self._data.read(_RECORD_SIZE))
+        size = _RECORD_SIZE + key_length + value_length
+        self._live -= size
+        self._dead += size
+
+    def _entries(self):
+        """Iterates over the hashes and record offsets of all keys."""
+        index = self._index
+        for start in xrange(0, self._slots, _SCAN_SLOTS):
+            index.seek(start * _SLOT_SIZE)
+            block = index.read(min(_SCAN_SLOTS, self._slots - start) * _SLOT_SIZE)
+            for position in xrange(0, len(block), _SLOT_SIZE):
+                digest, offset = struct.unpack(_SLOT, block[position:position + _SLOT_SIZE])
+                if offset > 0:
+                    yield digest, offset - 1
+
+    def iteritems(self):
+        """Iterates over all keys and values, reading one record at a time.
+
+        The table must not be changed while it is iterated.
+        """
+        for digest, offset in self._entries():
+            yield self._read_record(offset)
+
+    def iterkeys(self):
+        for key, value in self.iteritems():
+            yield key
+
+    __iter__ = iterkeys
+
+    def _rebuild(self, data=None):
+        """Rebuilds the index with room for twice the current keys."""
+        slots = _MIN_SLOTS
+        while slots < self._count * 4:
+            slots *= 2
+        path = self.path + '.idx'
+        index = self._create_index(path + '.tmp', slots)
+        mask = slots - 1
+        for digest, offset in self._entries():
+            if data is not None:
+                offset = data(offset)
+            slot = digest & mask
+            while True:
+                index.seek(slot * _SLOT_SIZE)
+                if struct.unpack(_SLOT, index.read(_SLOT_SIZE))[1] == _EMPTY:
+                    break
+                slot = (slot + 1) & mask
+            index.seek(slot * _SLOT_SIZE)
+            index.write(struct.pack(_SLOT, digest, offset + 1))
+        self._index.close()
+        index.close()
+        _remove(path)
+        os.rename(path + '.tmp', path)
+        self._index = open(path, 'r+b')
+        self._slots = slots
+        self._deleted = 0
+
+    def _compact(self):
+        """Copies the live records to a new data file and rebuilds the index."""
+        path = self.path + '.dat'
+        compacted = open(path + '.tmp', 'w+b')
+        def copy(offset):
+            key, value = self._read_record(offset)
+            position = compacted.tell()
+            compacted.write(struct.pack(_RECORD, len(key), len(value)))
+            compacted.write(key)
+            compacted.write(value)
+            return position
+        self._rebuild(copy)
+        self._data.close()
+        compacted.close()
+        _remove(path)
+        os.rename(path + '.tmp', path)
+        self._data = open(path, 'r+b')
+        self._dead = 0
+
+    def sync(self):
+        """Flushes the table's files."""
+        self._index.flush()
+        self._data.flush()
+
+    def close(self):
+        """Closes the table's files."""
+        self._index.close()
+        self._data.close()
+
+_stores = {}
+
+def open_store(name, address, max_bytes=16777216, path=None):
+    """Returns a named state store, creating it on first use.
+
+    Keyword arguments:
+    @param name: The name of the store.
+    @param address: The address of the component instance owning the store.
+    @param max_bytes: The approximate memory budget of the store's hot set in bytes.
+    @param path: The path of the on-disk store. Defaults to a file named after
+    the component instance and store in the system temporary directory.
+
+    @return: The state store.
+    """
+    if name not in _stores:
+        if path is None:
+            path = os.path.join(tempfile.gettempdir(), 'vertigo-state', '%s-%s' % (address, name))
+        _stores[name] = StateStore(path, max_bytes)
+    return _stores[name]
+
+class StateStore(DictMixin, object):
+    """Keyed state with a bounded in-memory hot set.
+
+    Recently used keys are held in memory in least-recently-used order.
+    When the estimated size of the hot set exceeds max_bytes, the least
+    recently used keys are spilled to an on-disk DiskTable and loaded again
+    when they are next read. The table's index is kept on disk, so memory
+    use is bounded by the hot set rather than by the number of keys. Keys
+    and values must be picklable.
+
+    Values are only written to disk when they are spilled, so a value that
+    is mutated in place must be stored again for the change to be kept:
+
+        counts = state[word]
+        counts.append(1)
+        state[word] = counts
+
+    Keyword arguments:
+    @param path: The path of the on-disk store, without a file extension.
+    @param max_bytes: The approximate memory budget of the hot set in bytes.
+    @param sizeof: A function estimating the size of a key and value in bytes.
+    """
+    def __init__(self, path, max_bytes=16777216, sizeof=sizeof):
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.bytes = 0
+        self.spills = 0
+        self.loads = 0
+        # Keys changed since the last call to changes().
+        self._updated = set()
+        self._deleted = set()
+        # Hot entries are [previous, next, key, value, size, clean, on_disk]
+        # nodes in a circular list whose root's next node is the least
+        # recently used. Clean nodes hold the value stored on disk.
+        self._hot = {}
+        self._root = root = []
+        root[:] = [root, root, None, None, 0, True, False]
+        # The number of hot keys that also have a copy on disk.
+        self._shadowed = 0
+        self._disk = DiskTable(path)
+
+    def _link(self, node):
+        root = self._root
+        last = root[0]
+        node[0], node[1] = last, root
+        last[1] = root[0] = node
+
+    def _unlink(self, node):
+        previous, next = node[0], node[1]
+        previous[1], next[0] = next, previous
+
+    def _touch(self, node):
+        self._unlink(node)
+        self._link(node)
+
+    def _load(self, key):
+        node = self._hot.get(key)
+        if node is not None:
+            self._touch(node)
+            return node
+        data = self._disk.get(_dump_key(key))
+        if data is None:
+            return None
+        self.loads += 1
+        value = cPickle.loads(data)
+        node = [None, None, key, value, self.sizeof(key) + self.sizeof(value) + _ENTRY_SIZE, True, True]
+        self._shadowed += 1
+        self._insert(node)
+        return node
+
+    def _insert(self, node):
+        self._hot[node[2]] = node
+        self._link(node)
+        self.bytes += node[4]
+        self._spill()
+
+    def _spill(self):
+        """Spills least recently used keys until the hot set fits the budget."""
+        root, hot = self._root, self._hot
+        while self.bytes > self.max_bytes and len(hot) > 1:
+            node = root[1]
+            self._unlink(node)
+            del hot[node[2]]
+            self.bytes -= node[4]
+            if node[6]:
+                self._shadowed -= 1
+            if not node[5]:
+                self._disk[_dump_key(node[2])] = _dump(node[3])
+            self.spills += 1
+
+    def __getitem__(self, key):
+        node = self._load(key)
+        if node is None:
+            raise KeyError(key)
+        return node[3]
+
+    def __setitem__(self, key, value):
+        self._updated.add(key)
+        self._deleted.discard(key)
+        size = self.sizeof(key) + self.sizeof(value) + _ENTRY_SIZE
+        node = self._hot.get(key)
+        if node is not None:
+            self._touch(node)
+            self.bytes += size - node[4]
+            node[3], node[4], node[5] = value, size, False
+            self._spill()
+        else:
+            on_disk = _dump_key(key) in self._disk
+            if on_disk:
+                self._shadowed += 1
+            self._insert([None, None, key, value, size, False, on_disk])
+
+    def __delitem__(self, key):
+        node = self._hot.get(key)
+        data = _dump_key(key)
+        if node is None:
+            if data not in self._disk:
+                raise KeyError(key)
+            del self._disk[data]
+        else:
+            del self._hot[key]
+            self._unlink(node)
+            self.bytes -= node[4]
+            if node[6]:
+                self._shadowed -= 1
+                del self._disk[data]
+        self._updated.discard(key)
+        self._deleted.add(key)
+
+    def __contains__(self, key):
+        return key in self._hot or _dump_key(key) in self._disk
+
+    has_key = __contains__
+
+    def __iter__(self):
+        hot = self._hot
+        for key in hot.keys():
+            yield key
+        for data in self._disk.iterkeys():
+            key = cPickle.loads(data)
+            if key not in hot:
+                yield key
+
+    def keys(self):
+        return list(self)
+
+    def __len__(self):
+        return len(self._hot) + len(self._disk) - self._shadowed
+
+    def _peek(self, key):
+        node = self._hot.get(key)
+        if node is not None:
+            return node[3]
+        return cPickle.loads(self._disk.get(_dump_key(key)))
+
+    def scan(self):
+        """Iterates over all keys and values without changing the hot set.
+
+        @return: An iterator of (key, value) tuples.
+        """
+        hot = self._hot
+        for key, node in hot.items():
+            yield key, node[3]
+        for data, value in self._disk.iteritems():
+            key = cPickle.loads(data)
+            if key not in hot:
+                yield key, cPickle.loads(value)
+
+    def changes(self):
+        """Returns and resets the changes made since the last call.
+
+        @return: A tuple of a dictionary of updated keys and their values
+        and a list of deleted keys.
+        """
+        updated = {}
+        for key in self._updated:
+            updated[key] = self._peek(key)
+        deleted = list(self._deleted)
+        self._updated, self._deleted = set(), set()
+        return updated, deleted
+
+    def flush(self):
+        """Writes all modified hot values to disk."""
+        node = self._root[1]
+        while node is not self._root:
+            if not node[5]:
+                self._disk[_dump_key(node[2])] = _dump(node[3])
+                node[5] = True
+                if not node[6]:
+                    node[6] = True
+                    self._shadowed += 1
+            node = node[1]
+        self._disk.sync()
+        return self
+
+    def clear(self):
+        """Removes all keys from memory and disk."""
+        self._deleted.update(self)
+        self._updated.clear()
+        self._hot.clear()
+        root = self._root
+        root[0] = root[1] = root
+        self.bytes = 0
+        self._shadowed = 0
+        self._disk.close()
+        self._disk = DiskTable(self.path)
+
+    def close(self):
+        """Closes the on-disk store."""
+        self._disk.close()
@@ -0,0 +1,211 @@
+# Copyright 2014 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import sys, time, component, vertx
+import org.vertx.java.core.json.JsonObject
+from java.lang import System
+from java.lang.management import ManagementFactory
+from core.event_bus import EventBus
+from histogram import Histogram
+
+if component._component is None:
+    raise ImportError("Not a valid Vertigo component.")
+
+this = sys.modules[__name__]
+
+# Traced messages carry their trace in this reserved field.
+TRACE = 'vertigo.trace'
+
+# Nanosecond timestamps are only comparable within a single JVM.
+_JVM = ManagementFactory.getRuntimeMXBean().getName()
+
+_enabled = False
+_ports = {}
+
+# The trace of the message currently being handled, if any.
+_current = None
+
+def enable():
+    """Enables tracing.
+
+    @return: The tracing module.
+    """
+    global _enabled
+    _enabled = True
+    return this
+
+def disable():
+    """Disables tracing.
+
+    @return: The tracing module.
+    """
+    global _enabled
+    _enabled = False
+    return this
+
+def is_enabled():
+    """Indicates whether tracing is enabled."""
+    return _enabled
+
+def port_trace(name):
+    """Returns the latency histograms for an input port.
+
+    Keyword arguments:
+    @param name: The input port name.
+
+    @return: The port trace.
+    """
+    if name not in _ports:
+        _ports[name] = PortTrace(name)
+    return _ports[name]
+
+def stamp(value):
+    """Stamps an encoded message with a trace.
+
+    Messages sent while a traced message is being handled continue that
+    message's trace with an incremented hop count. Other messages start a
+    new trace. Only Json objects can be stamped, so raw, array and
+    compressed messages are sent untraced.
+
+    Keyword arguments:
+    @param value: The encoded Vert.x value.
+
+    @return: The stamped value.
+    """
+    if not _enabled or not isinstance(value, org.vertx.java.core.json.JsonObject):
+        return value
+    now, nanos = System.currentTimeMillis(), System.nanoTime()
+    trace = org.vertx.java.core.json.JsonObject()
+    current = _current
+    if current is None:
+        trace.putNumber('origin', now)
+        trace.putNumber('origin_nanos', nanos)
+        trace.putString('origin_jvm', _JVM)
+        trace.putNumber('hops', 1)
+    else:
+        trace.putNumber('origin', current.getLong('origin'))
+        trace.putNumber('origin_nanos', current.getLong('origin_nanos'))
+        trace.putString('origin_jvm', current.getString('origin_jvm'))
+        trace.putNumber('hops', current.getInteger('hops') + 1)
+    trace.putNumber('sent', now)
+    trace.putNumber('sent_nanos', nanos)
+    trace.putString('jvm', _JVM)
+    value.putObject(TRACE, trace)
+    return value
+
+def strip(value):
+    """Removes the trace from a received message.
+
+    Keyword arguments:
+    @param value: The received Vert.x value.
+
+    @return: The message trace, or None if the message is not traced.
+    """
+    if isinstance(value, org.vertx.java.core.json.JsonObject) and value.containsField(TRACE):
+        return value.removeField(TRACE)
+    return None
+
+def _elapsed(millis, nanos, jvm, now, now_nanos):
+    """Returns the time in microseconds since a timestamp.
+
+    Timestamps taken in this JVM are compared with nanoTime. Timestamps
+    taken in other JVMs are compared with wall clock time, so their
+    accuracy depends on clock synchronization between nodes.
+    """
+    if jvm == _JVM:
+        return (now_nanos - nanos) / 1000
+    return (now - millis) * 1000
+
+def snapshot():
+    """Returns a snapshot of the component's latency histograms.
+
+    Latencies are recorded in microseconds. Snapshots from several
+    instances can be combined with merge().
+
+    @return: A dictionary with the component address and the hop and
+    end-to-end latency histograms of each input port.
+    """
+    ports = {}
+    for name, trace in _ports.items():
+        ports[name] = trace.to_dict()
+    return {'address': component._component.context().address(), 'time': int(time.time() * 1000), 'ports': ports}
+
+def merge(snapshots):
+    """Merges snapshots from several component instances.
+
+    Keyword arguments:
+    @param snapshots: A sequence of snapshots returned by snapshot().
+
+    @return: A dictionary with the merged histograms of each input port.
+    """
+    merged = {}
+    for snapshot in snapshots:
+        for name, histograms in snapshot['ports'].items():
+            if name not in merged:
+                merged[name] = {}
+            for kind, histogram in histograms.items():
+                if kind in merged[name]:
+                    merged[name][kind].merge(histogram)
+                else:
+                    merged[name][kind] = Histogram.from_dict(histogram)
+    result = {}
+    for name, histograms in merged.items():
+        result[name] = {}
+        for kind, histogram in histograms.items():
+            result[name][kind] = histogram.to_dict()
+    return {'ports': result}
+
+def reset():
+    """Resets all latency histograms.
+
+    @return: The tracing module.
+    """
+    for trace in _ports.values():
+        trace.reset()
+    return this
+
+def publish(address, interval=1000):
+    """Periodically publishes tracing snapshots on the event bus.
+
+    Keyword arguments:
+    @param address: The event bus address to which to publish snapshots.
+    @param interval: The publish interval in milliseconds.
+
+    @return: The periodic timer ID.
+    """
+    enable()
+    def publish_snapshot(timer_id):
+        EventBus.publish(address, snapshot())
+    return vertx.set_periodic(interval, publish_snapshot)
+
+class PortTrace(object):
+    """Hop and end-to-end latency histograms for an input port."""
+    def __init__(self, name):
+        self.name = name
+        self.hop = Histogram()
+        self.end_to_end = Histogram()
+
+    def reset(self):
+        """Resets the histograms."""
+        self.hop.reset()
+        self.end_to_end.reset()
+
+    def received(self, trace):
+        """Records the latencies of a received message trace."""
+        now, nanos = System.currentTimeMillis(), System.nanoTime()
+        self.hop.record(_elapsed(trace.getLong('sent'), trace.getLong('sent_nanos'), trace.getString('jvm'), now, nanos))
+        self.end_to_end.record(_elapsed(trace.getLong('origin'), trace.getLong('origin_nanos'), trace.getString('origin_jvm'), now, nanos))
+
+    def to_dict(self):
+        """Returns the histograms as a dictionary."""
+        return {'hop': self.hop.to_dict(), 'end_to_end': self.end_to_end.to_dict()}
@@ -0,0 +1,200 @@
+# Copyright 2014 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import traceback
+import java.util.Timer
+import java.util.TimerTask
+from java.lang import System, Thread
+from java.util.concurrent.atomic import AtomicBoolean
+
+def _stack_sample(thread, limit=20):
+    """Formats a stack sample, preferring the Python frames of a Jython stack."""
+    frames = thread.getStackTrace()
+    python = [frame for frame in frames if frame.getFileName() is not None and frame.getFileName().endswith('.py')]
+    if python:
+        return ['%s (%s:%d)' % (frame.getMethodName().split('$')[0], frame.getFileName(), frame.getLineNumber()) for frame in python[:limit]]
+    return [str(frame) for frame in frames[:limit]]
+
+class _Call(object):
+    """A running handler invocation."""
+    def __init__(self, name, thread, start):
+        self.name = name
+        self.thread = thread
+        self.start = start
+        # Claimed by whichever of the watchdog and the handler reports first.
+        self.reported = AtomicBoolean()
+
+class BlockedHandler(object):
+    """Blocking statistics for a handler."""
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.max = 0.0
+        self.stack = None
+
+class BlockingDetector(object):
+    """Watches handlers for event loop blocking.
+
+    Handler invocations are registered while they run, and a daemon timer
+    started by start() checks them every half threshold. When an invocation
+    has run for longer than the threshold its thread's stack is sampled
+    while it is still blocking, so the sample shows where the handler is
+    stuck. Invocations that end past the threshold before they were checked
+    are reported without a stack sample. Reports from the watchdog thread
+    are handed to run_on_context, so statistics are only updated, and
+    on_blocked only called, on the component's context.
+
+    Keyword arguments:
+    @param threshold_ms: The time in milliseconds after which a handler is considered blocking.
+    @param multi_threaded: Whether to advise deploying as a multi-threaded worker.
+    @param on_blocked: An optional function to be called with the blocked
+    handler's statistics, the blocking time in milliseconds and whether the
+    handler was reported for the first time.
+    @param clock: A function returning the time in nanoseconds.
+    @param run_on_context: A function to be called with a function and its
+    arguments to call it on the component's context. Defaults to calling
+    it directly.
+    """
+    def __init__(self, threshold_ms=100, multi_threaded=False, on_blocked=None, clock=System.nanoTime, run_on_context=None):
+        self.threshold = threshold_ms * 1000000
+        self.multi_threaded = multi_threaded
+        self.on_blocked = on_blocked
+        self.clock = clock
+        self.run_on_context = run_on_context or _call
+        self.blocked = {}
+        self.current = None
+        self.enabled = True
+        self.timer = None
+
+    def start(self):
+        """Starts the detector's watchdog thread."""
+        if self.timer is None:
+            self.timer = java.util.Timer('vertigo-blocking-detector', True)
+            period = max(1, self.threshold / 2000000)
+            self.timer.scheduleAtFixedRate(_CheckTask(self), period, period)
+        return self
+
+    def stop(self):
+        """Stops the detector's watchdog thread."""
+        self.enabled = False
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        return self
+
+    def wrap(self, name, handler):
+        """Wraps a handler to be watched."""
+        def watched(*args):
+            return self.call(name, handler, args)
+        return watched
+
+    def call(self, name, handler, args):
+        """Calls a handler while watching it.
+
+        Keyword arguments:
+        @param name: A name identifying the handler in reports.
+        @param handler: The handler to call.
+        @param args: A tuple of the arguments with which to call the handler.
+
+        @return: The handler's result.
+        """
+        call = _Call(name, Thread.currentThread(), self.clock())
+        self.current = call
+        try:
+            return handler(*args)
+        finally:
+            self.current = None
+            elapsed = self.clock() - call.start
+            if elapsed > self.threshold:
+                self._finished(call, elapsed)
+
+    def check(self):
+        """Samples the running handler if it has blocked past the threshold."""
+        call = self.current
+        if call is None or call.reported.get():
+            return
+        elapsed = self.clock() - call.start
+        if elapsed > self.threshold and call.reported.compareAndSet(False, True):
+            self.run_on_context(self._report, call, elapsed, _stack_sample(call.thread))
+
+    def _record(self, name):
+        if name not in self.blocked:
+            self.blocked[name] = BlockedHandler(name)
+        return self.blocked[name]
+
+    def _report(self, call, elapsed, stack):
+        blocked = self._record(call.name)
+        first = blocked.count == 0
+        blocked.count += 1
+        if stack is not None:
+            blocked.stack = stack
+        if elapsed / 1000000.0 > blocked.max:
+            blocked.max = elapsed / 1000000.0
+        if self.on_blocked is not None:
+            self.on_blocked(blocked, elapsed / 1000000, first)
+
+    def _finished(self, call, elapsed):
+        if call.reported.compareAndSet(False, True):
+            self._report(call, elapsed, None)
+        else:
+            blocked = self._record(call.name)
+            if elapsed / 1000000.0 > blocked.max:
+                blocked.max = elapsed / 1000000.0
+
+    def recommendation(self):
+        """Returns the recommended deployment options."""
+        if self.multi_threaded:
+            return 'worker = True and multi_threaded = True'
+        return 'worker = True'
+
+    def advice(self, network, component):
+        """Returns the deployment advice for each blocking handler.
+
+        Keyword arguments:
+        @param network: The name of the component's network.
+        @param component: The name of the component.
+
+        @return: A list of advice dictionaries.
+        """
+        return [self.handler_advice(blocked, network, component) for blocked in self.blocked.values()]
+
+    def handler_advice(self, blocked, network, component):
+        """Returns the deployment advice for a blocking handler."""
+        return {
+            'network': network,
+            'component': component,
+            'handler': blocked.name,
+            'count': blocked.count,
+            'max_ms': blocked.max,
+            'stack': blocked.stack,
+            'worker': True,
+            'multi_threaded': self.multi_threaded,
+        }
+
+def _call(function, *args):
+    function(*args)
+
+class _CheckTask(java.util.TimerTask):
+    def __init__(self, detector):
+        self.detector = detector
+    def run(self):
+        try:
+            self.detector.check()
+        except:
+            # An exception would cancel the timer and stop detection, so it
+            # is logged and the next check goes ahead.
+            try:
+                import logger
+                logger.error("Blocking detector check failed:\n%s" % traceback.format_exc())
+            except ImportError:
+                traceback.print_exc()
@@ -0,0 +1,239 @@
+# Copyright 2014 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import time
+
+def _now():
+    return int(time.time() * 1000)
+
+def _getter(field):
+    if field is None:
+        return lambda message: message
+    elif callable(field):
+        return field
+    return lambda message: message[field]
+
+class Aggregate(object):
+    """Base incremental aggregate.
+
+    Aggregates hold one accumulator per window and key, which is updated
+    as each message arrives so window results never have to be recomputed.
+    """
+    def zero(self):
+        """Returns an empty accumulator."""
+        return None
+
+    def add(self, acc, message):
+        """Adds a message to an accumulator and returns the new accumulator."""
+        raise NotImplementedError
+
+    def result(self, acc):
+        """Returns the result of an accumulator."""
+        return acc
+
+class Count(Aggregate):
+    """Counts messages."""
+    def zero(self):
+        return 0
+
+    def add(self, acc, message):
+        return acc + 1
+
+class Sum(Aggregate):
+    """Sums a message field.
+
+    Keyword arguments:
+    @param field: A message field name or a function returning the value to sum.
+    """
+    def __init__(self, field=None):
+        self.value = _getter(field)
+
+    def zero(self):
+        return 0
+
+    def add(self, acc, message):
+        return acc + self.value(message)
+
+class Min(Aggregate):
+    """Tracks the minimum of a message field.
+
+    Keyword arguments:
+    @param field: A message field name or a function returning the value to compare.
+    """
+    def __init__(self, field=None):
+        self.value = _getter(field)
+
+    def add(self, acc, message):
+        value = self.value(message)
+        if acc is None or value < acc:
+            return value
+        return acc
+
+class Max(Aggregate):
+    """Tracks the maximum of a message field.
+
+    Keyword arguments:
+    @param field: A message field name or a function returning the value to compare.
+    """
+    def __init__(self, field=None):
+        self.value = _getter(field)
+
+    def add(self, acc, message):
+        value = self.value(message)
+        if acc is None or value > acc:
+            return value
+        return acc
+
+class Reduce(Aggregate):
+    """Reduces messages with a function.
+
+    Keyword arguments:
+    @param function: A function taking the accumulator and a message and
+    returning the new accumulator.
+    @param initial: The initial accumulator.
+    """
+    def __init__(self, function, initial=None):
+        self.function = function
+        self.initial = initial
+
+    def zero(self):
+        return self.initial
+
+    def add(self, acc, message):
+        return self.function(acc, message)
+
+class Sketch(Aggregate):
+    """Adds a message field to a sketch from vertigo.sketch.
+
+    Results are sketch dictionaries, which can be sent on output ports and
+    merged downstream with vertigo.sketch.merge().
+
+    Keyword arguments:
+    @param factory: A function returning a new sketch, such as a sketch class.
+    @param field: A message field name or a function returning the item to add.
+    """
+    def __init__(self, factory, field=None):
+        self.factory = factory
+        self.value = _getter(field)
+
+    def zero(self):
+        return self.factory()
+
+    def add(self, acc, message):
+        return acc.add(self.value(message))
+
+    def result(self, acc):
+        return acc.to_dict()
+
+class Windows(object):
+    """Tumbling or sliding processing time windows.
+
+    Windows of size milliseconds start every slide milliseconds, aligned to
+    the epoch. Without a slide, windows are tumbling. Each message is added
+    to the aggregates of every open window containing its arrival time,
+    under its key if a key is given. When a window closes one result is
+    emitted for each of its keys and the window is evicted, so memory is
+    bounded by the number of open windows and their keys.
+
+    Results are dictionaries holding the window's start and end times, the
+    key if a key is given, and the result of each named aggregate.
+
+    Keyword arguments:
+    @param size: The window size in milliseconds.
+    @param slide: The interval in milliseconds at which windows start.
+    @param key: A message field name or a function returning a message's key.
+    @param aggregates: A dictionary of named aggregates. Defaults to a count.
+    @param emit: A function to be called with each window result.
+    @param set_timer: A function scheduling a callback after a delay in
+    milliseconds, used to close windows on time.
+    """
+    def __init__(self, size, slide=None, key=None, aggregates=None, emit=None, set_timer=None, clock=_now):
+        if slide is None:
+            slide = size
+        if size <= 0 or slide <= 0:
+            raise ValueError("Window size and slide must be positive.")
+        if slide > size:
+            raise ValueError("Window slide must not be greater than the window size.")
+        if aggregates is None:
+            aggregates = {'count': Count()}
+        self.size = size
+        self.slide = slide
+        self.key = _getter(key) if key is not None else None
+        self.aggregates = aggregates.items()
+        self.emit = emit
+        self.set_timer = set_timer
+        self.clock = clock
+        self.windows = {}
+        self.timer_id = None
+
+    def add(self, message):
+        """Adds a message to the open windows containing the current time."""
+        now = self.clock()
+        key = self.key(message) if self.key is not None else None
+        size, slide, windows, aggregates = self.size, self.slide, self.windows, self.aggregates
+        start = now - now % slide
+        while start + size > now:
+            if start not in windows:
+                windows[start] = {}
+            window = windows[start]
+            accs = window.get(key)
+            if accs is None:
+                accs = window[key] = [aggregate.zero() for name, aggregate in aggregates]
+            for i in range(len(aggregates)):
+                accs[i] = aggregates[i][1].add(accs[i], message)
+            start -= slide
+        if self.set_timer is not None and self.timer_id is None:
+            self._schedule(now)
+
+    def next_close(self):
+        """Returns the time at which the next open window closes."""
+        if not self.windows:
+            return None
+        return min(self.windows) + self.size
+
+    def close(self, now=None):
+        """Closes and evicts windows that have ended.
+
+        @return: A list of the closed windows' results.
+        """
+        if now is None:
+            now = self.clock()
+        results = []
+        size, aggregates = self.size, self.aggregates
+        for start in sorted(self.windows):
+            if start + size > now:
+                break
+            window = self.windows.pop(start)
+            for key, accs in window.items():
+                result = {'start': start, 'end': start + size}
+                if self.key is not None:
+                    result['key'] = key
+                for i in range(len(aggregates)):
+                    name, aggregate = aggregates[i]
+                    result[name] = aggregate.result(accs[i])
+                results.append(result)
+        if self.emit is not None:
+            for result in results:
+                self.emit(result)
+        return results
+
+    def _schedule(self, now):
+        close = self.next_close()
+        if close is None:
+            self.timer_id = None
+        else:
+            self.timer_id = self.set_timer(max(1, close - now), self._timeout)
+
+    def _timeout(self, timer_id):
+        self.close()
+        self._schedule(self.clock())
@@ -0,0 +1,74 @@
+# Copyright 2014 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import org.vertx.java.core.buffer.Buffer
+from test import TestCase, run_test
+from vertigo.binary import BufferView
+
+class BinaryTestCase(TestCase):
+    """A buffer view test case."""
+    def create_view(self):
+        buffer = org.vertx.java.core.buffer.Buffer()
+        buffer.appendBytes('\x01\x02\xff\x00\x00\x01\x00hello')
+        return BufferView(buffer)
+
+    def assert_out_of_range(self, read, *args):
+        try:
+            read(*args)
+        except IndexError:
+            pass
+        else:
+            self.assert_true(False)
+
+    def test_index(self):
+        """Tests reading bytes by positive and negative index."""
+        view = self.create_view()
+        self.assert_equals(12, len(view))
+        self.assert_equals(1, view[0])
+        self.assert_equals(255, view[2])
+        self.assert_equals(-1, view.get_byte(2))
+        self.assert_equals(ord('o'), view[-1])
+        self.assert_equals(1, view[-12])
+        self.assert_equals(256, view.get_int(3))
+        self.assert_equals(u'hello', view.get_string(7))
+        self.complete()
+
+    def test_slice(self):
+        """Tests that slices are views of the same buffer."""
+        view = self.create_view()
+        data = view[7:]
+        self.assert_true(isinstance(data, BufferView))
+        self.assert_true(data.java_obj is view.java_obj)
+        self.assert_equals(5, len(data))
+        self.assert_equals(ord('h'), data[0])
+        self.assert_equals(ord('l'), data[-2])
+        self.assert_equals('ell', data[1:4].tostring())
+        self.assert_equals('hel', view[-5:-2].tostring())
+        self.assert_equals(0, len(view[8:2]))
+        self.assert_equals(12, len(view[:100]))
+        self.complete()
+
+    def test_out_of_range(self):
+        """Tests that reads outside of a view raise IndexError."""
+        view = self.create_view()
+        data = view[7:9]
+        self.assert_out_of_range(view.__getitem__, 12)
+        self.assert_out_of_range(view.__getitem__, -13)
+        self.assert_out_of_range(data.__getitem__, 2)
+        self.assert_out_of_range(data.__getitem__, -3)
+        self.assert_out_of_range(view.get_int, 9)
+        self.assert_out_of_range(data.get_short, 1)
+        self.assert_out_of_range(data.get_string, 0, 3)
+        self.complete()
+
+run_test(BinaryTestCase())
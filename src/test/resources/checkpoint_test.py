@@ -0,0 +1,76 @@
+# Copyright 2014 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os, tempfile, cPickle
+from test import TestCase, run_test
+from vertigo.state import StateStore
+from vertigo.checkpoint import Checkpointer
+
+class CheckpointTestCase(TestCase):
+    """A state checkpoint test case."""
+    def test_restore_deltas(self):
+        """Tests restoring a snapshot followed by deltas."""
+        directory = tempfile.mkdtemp()
+        store = StateStore(os.path.join(directory, 'state'), max_bytes=1024)
+        checkpointer = Checkpointer(store, os.path.join(directory, 'checkpoints'), snapshot_every=10)
+        for i in range(100):
+            store[i] = i
+        self.assert_true(os.path.basename(checkpointer.checkpoint()).startswith('snapshot-'))
+        store[1] = 'one'
+        del store[2]
+        self.assert_true(os.path.basename(checkpointer.checkpoint()).startswith('delta-'))
+        self.assert_null(checkpointer.checkpoint())
+
+        restored = StateStore(os.path.join(directory, 'restored'))
+        self.assert_equals(2, Checkpointer(restored, os.path.join(directory, 'checkpoints')).restore())
+        self.assert_equals(99, len(restored))
+        self.assert_equals('one', restored[1])
+        self.assert_false(2 in restored)
+        self.assert_equals(99, restored[99])
+        self.complete()
+
+    def test_compaction(self):
+        """Tests that snapshots replace older checkpoints."""
+        directory = tempfile.mkdtemp()
+        store = {}
+        checkpointer = Checkpointer(store, directory, snapshot_every=2)
+        for i in range(5):
+            store[i] = i
+            checkpointer.checkpoint()
+        self.assert_equals(['snapshot-5.pkl'], os.listdir(directory))
+        restored = {}
+        Checkpointer(restored, directory).restore()
+        self.assert_equals(store, restored)
+        self.complete()
+
+    def test_snapshot_records(self):
+        """Tests that snapshots write a record for each key."""
+        directory = tempfile.mkdtemp()
+        store = StateStore(os.path.join(directory, 'state'), max_bytes=1024)
+        for i in range(100):
+            store[i] = i
+        path = Checkpointer(store, os.path.join(directory, 'checkpoints')).snapshot()
+        records = []
+        f = open(path, 'rb')
+        try:
+            while True:
+                try:
+                    records.append(cPickle.load(f))
+                except EOFError:
+                    break
+        finally:
+            f.close()
+        self.assert_equals([(i, i) for i in range(100)], sorted(records))
+        self.complete()
+
+run_test(CheckpointTestCase())
@@ -0,0 +1,44 @@
+# Copyright 2014 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from test import TestCase, run_test
+import org.vertx.java.core.buffer.Buffer
+from vertigo.convert import map_to_vertx, map_from_vertx
+from vertigo.coalescing import pack, unpack, is_coalesced, packets
+
+class CoalescingTestCase(TestCase):
+    """A message coalescing test case."""
+    def test_pack(self):
+        """Tests that packed messages are unpacked in order."""
+        messages = [{'foo': 'bar'}, [1, 2], 'baz', 3]
+        envelope = pack([map_to_vertx(message) for message in messages])
+        self.assert_true(is_coalesced(envelope))
+        self.assert_false(is_coalesced(map_to_vertx({'foo': 'bar'})))
+        self.assert_false(is_coalesced('baz'))
+        self.assert_equals(messages, [map_from_vertx(value) for value in unpack(envelope)])
+        self.complete()
+
+    def test_packets(self):
+        """Tests that messages are split into envelopes around buffers."""
+        buffer = org.vertx.java.core.buffer.Buffer('raw')
+        values = packets([1, 2, 3, 4, 5, buffer, 6, buffer, 7, 8], 3)
+        self.assert_equals(6, len(values))
+        self.assert_equals([1, 2, 3], unpack(values[0]))
+        self.assert_equals([4, 5], unpack(values[1]))
+        self.assert_true(values[2] is buffer)
+        self.assert_equals(6, values[3])
+        self.assert_true(values[4] is buffer)
+        self.assert_equals([7, 8], unpack(values[5]))
+        self.complete()
+
+run_test(CoalescingTestCase())
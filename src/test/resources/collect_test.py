@@ -0,0 +1,119 @@
+# Copyright 2014 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from test import TestCase, run_test
+from vertigo.collect import GroupCollector
+
+class FakeGroup(object):
+    """Stands in for a Java input group."""
+    def __init__(self, id):
+        self._id = id
+        self.group_handlers = {}
+
+    def id(self):
+        return self._id
+
+    def messageHandler(self, handler):
+        self.message_handler = handler
+
+    def groupHandler(self, name, handler):
+        self.group_handlers[name] = handler
+
+    def endHandler(self, handler):
+        self.end_handler = handler
+
+    def send(self, *messages):
+        for message in messages:
+            self.message_handler.handle(message)
+
+    def end(self):
+        self.end_handler.handle(None)
+
+class CollectTestCase(TestCase):
+    """A group collection test case."""
+    def collector(self, **kwargs):
+        self.now, self.completed, self.evicted = [0.0], [], []
+        collector = GroupCollector(self.completed.append, lambda value: value, on_evict=self.evicted.append,
+                                   clock=lambda: self.now[0], **kwargs)
+        collector.close()
+        return collector
+
+    def start(self, collector, id, name='sentences'):
+        group = FakeGroup(id)
+        collector.group_handler(name).handle(group)
+        return group
+
+    def test_complete(self):
+        """Tests that a completed group is passed to the handler with its nested groups."""
+        collector = self.collector(nested=('words',))
+        group = self.start(collector, 'g1')
+        group.send('first')
+        words = FakeGroup('g2')
+        group.group_handlers['words'].handle(words)
+        words.send('foo', 'bar')
+        words.end()
+        self.assert_equals([], self.completed)
+        group.end()
+        self.assert_equals(1, len(self.completed))
+        completed = self.completed[0]
+        self.assert_equals('sentences', completed.name)
+        self.assert_equals('g1', completed.id)
+        self.assert_equals(['first'], completed.messages())
+        self.assert_equals(['foo', 'bar'], completed.groups['words'][0].messages())
+        self.assert_equals(0, collector.bytes)
+        self.assert_equals([], self.evicted)
+        self.complete()
+
+    def test_timeout(self):
+        """Tests that inactive groups are evicted and reported."""
+        collector = self.collector(timeout=10)
+        first = self.start(collector, 'g1')
+        first.send('foo')
+        self.now[0] = 5.0
+        second = self.start(collector, 'g2')
+        second.send('bar')
+        self.now[0] = 12.0
+        collector.sweep()
+        self.assert_equals(1, len(self.evicted))
+        info = self.evicted[0]
+        self.assert_equals('g1', info['id'])
+        self.assert_equals('sentences', info['name'])
+        self.assert_equals('timed out', info['reason'])
+        self.assert_equals(1, info['messages'])
+        self.assert_equals(3, info['bytes'])
+        self.assert_equals(12.0, info['age'])
+        self.assert_equals(3, collector.bytes)
+        first.send('baz')
+        first.end()
+        second.end()
+        self.assert_equals(['g2'], [group.id for group in self.completed])
+        self.complete()
+
+    def test_over_budget(self):
+        """Tests that the oldest groups are evicted when over budget."""
+        collector = self.collector(max_bytes=10)
+        first = self.start(collector, 'g1')
+        first.send('aaaaaa')
+        self.now[0] = 1.0
+        second = self.start(collector, 'g2')
+        second.send('bbbbbb')
+        self.assert_equals(['g1'], [info['id'] for info in self.evicted])
+        self.assert_equals('over budget', self.evicted[0]['reason'])
+        self.assert_equals(6, self.evicted[0]['bytes'])
+        self.assert_equals(6, collector.bytes)
+        self.assert_equals(1, collector.evicted)
+        second.end()
+        self.assert_equals(['bbbbbb'], self.completed[0].messages())
+        self.complete()
+
+run_test(CollectTestCase())
@@ -0,0 +1,66 @@
+# Copyright 2014 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import org.vertx.java.core.buffer.Buffer
+from test import TestCase, run_test
+from vertigo.convert import map_to_vertx, map_from_vertx
+from vertigo.compression import compressor, decompressor, inflate, is_compressed
+
+class CompressionTestCase(TestCase):
+    """A message compression test case."""
+    def test_object(self):
+        """Tests compressing Json objects with each codec."""
+        message = {'body': 'x' * 1000, 'count': 10}
+        decode = decompressor(map_from_vertx)
+        for codec in ('zlib', 'gzip'):
+            value = compressor(map_to_vertx, codec, threshold=100)(message)
+            self.assert_true(isinstance(value, org.vertx.java.core.buffer.Buffer))
+            self.assert_true(is_compressed(value))
+            self.assert_true(value.length() < 1000)
+            self.assert_equals(message, decode(value))
+        self.complete()
+
+    def test_array(self):
+        """Tests compressing Json arrays."""
+        message = ['foo'] * 100
+        value = compressor(map_to_vertx, threshold=100)(message)
+        self.assert_true(is_compressed(value))
+        self.assert_equals(message, decompressor(map_from_vertx)(value))
+        self.complete()
+
+    def test_buffer(self):
+        """Tests compressing buffers."""
+        buffer = org.vertx.java.core.buffer.Buffer()
+        buffer.appendBytes('y' * 1000)
+        value = compressor(lambda message: message, threshold=100)(buffer)
+        self.assert_true(is_compressed(value))
+        self.assert_equals('y' * 1000, inflate(value).getBytes().tostring())
+        self.complete()
+
+    def test_threshold(self):
+        """Tests that the threshold applies to the UTF-8 encoded size."""
+        encode = compressor(map_to_vertx, threshold=80)
+        self.assert_false(is_compressed(encode({'body': 'x' * 10})))
+        self.assert_true(is_compressed(encode({'body': u'\xe9' * 40})))
+        self.complete()
+
+    def test_uncompressed(self):
+        """Tests that uncompressed values are not inflated."""
+        buffer = org.vertx.java.core.buffer.Buffer()
+        buffer.appendBytes('\x00vz')
+        self.assert_false(is_compressed(buffer))
+        self.assert_true(inflate(buffer) is buffer)
+        self.assert_equals('foo', inflate('foo'))
+        self.complete()
+
+run_test(CompressionTestCase())
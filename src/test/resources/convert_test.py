@@ -0,0 +1,52 @@
+# Copyright 2014 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from java.util import HashMap, HashSet, ArrayList
+from test import TestCase, run_test
+from vertigo.convert import map_to_vertx, map_from_vertx
+
+class ConvertTestCase(TestCase):
+    """A message conversion test case."""
+    def test_round_trip(self):
+        """Tests converting nested messages to Vert.x types and back."""
+        message = {'name': u'caf\xe9', 'count': 10, 'total': 1099511627776L, 'ratio': 0.5,
+                   'flag': True, 'none': None, 'tags': [u'\u2603', 'foo', [1, [2L]]],
+                   'nested': {'deep': {'items': [{'id': 1}, {'id': 2}]}}}
+        self.assert_equals(message, map_from_vertx(map_to_vertx(message)))
+        self.assert_equals([1, 2, {'a': [3]}], map_from_vertx(map_to_vertx([1, 2, {'a': [3]}])))
+        self.complete()
+
+    def test_java_sets(self):
+        """Tests that Java sets become sets at any depth."""
+        tags = HashSet()
+        tags.add('foo')
+        tags.add('bar')
+        inner = HashSet()
+        inner.add(1)
+        items = ArrayList()
+        items.add(inner)
+        value = HashMap()
+        value.put('tags', tags)
+        value.put('items', items)
+        self.assert_equals(set(['foo', 'bar']), map_from_vertx(tags))
+        self.assert_equals({'tags': set(['foo', 'bar']), 'items': [set([1])]}, map_from_vertx(value))
+        self.complete()
+
+    def test_python_sets(self):
+        """Tests that sets are sent as Json arrays."""
+        value = map_from_vertx(map_to_vertx({'tags': set(['foo']), 'ids': frozenset([1])}))
+        self.assert_equals({'tags': ['foo'], 'ids': [1]}, value)
+        self.assert_equals([u'caf\xe9'], map_from_vertx(map_to_vertx(set([u'caf\xe9']))))
+        self.complete()
+
+run_test(ConvertTestCase())
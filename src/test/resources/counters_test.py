@@ -0,0 +1,71 @@
+# Copyright 2014 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import org.vertx.java.core.buffer.Buffer
+from test import TestCase, run_test
+from vertigo.convert import map_to_vertx
+from vertigo.counters import PortMetrics, message_size
+
+class CountersTestCase(TestCase):
+    """A port metrics test case."""
+    def test_message_size(self):
+        """Tests measuring string, buffer, Json and other messages."""
+        self.assert_equals(3, message_size('foo'))
+        self.assert_equals(4, message_size(org.vertx.java.core.buffer.Buffer('test')))
+        value = map_to_vertx({'foo': 'bar'})
+        self.assert_true(message_size(value) >= len('{"foo":"bar"}'))
+        self.assert_equals(len(value.encode()), message_size(value))
+        self.assert_equals(3, message_size(123))
+        self.assert_equals(0, message_size(None))
+        self.complete()
+
+    def test_input(self):
+        """Tests counting received messages and handler times."""
+        metrics = PortMetrics('input', 'in')
+        metrics.received('foo', 2000000)
+        metrics.received('barbaz', 4000000)
+        self.assert_equals({'messages': 2, 'bytes': 9, 'handler_time': 6.0, 'handler_max': 4.0, 'handler_mean': 3.0}, metrics.to_dict())
+        metrics.reset()
+        self.assert_equals({'messages': 0, 'bytes': 0, 'handler_time': 0.0, 'handler_max': 0.0}, metrics.to_dict())
+        self.complete()
+
+    def test_output(self):
+        """Tests counting sent messages and send queue full time."""
+        now = [0.0]
+        metrics = PortMetrics('output', 'out', clock=lambda: now[0])
+        metrics.sent('foo')
+        metrics.sent(None, 5)
+        metrics.sent(None, 2, 10)
+        metrics.full(100)
+        now[0] = 1.0
+        metrics.full(100)
+        now[0] = 2.0
+        metrics.drained()
+        metrics.drained()
+        self.assert_equals({'messages': 8, 'bytes': 13, 'queue_full': 1, 'queue_full_time': 2000.0, 'queue_max_size': 100}, metrics.to_dict())
+        self.complete()
+
+    def test_enabled(self):
+        """Tests that enabling metrics applies to all ports."""
+        metrics = PortMetrics('output', 'out')
+        self.assert_false(metrics.enabled)
+        PortMetrics.enabled = True
+        try:
+            self.assert_true(metrics.enabled)
+            self.assert_true(PortMetrics('input', 'in').enabled)
+        finally:
+            PortMetrics.enabled = False
+        self.assert_false(metrics.enabled)
+        self.complete()
+
+run_test(CountersTestCase())
@@ -0,0 +1,68 @@
+# Copyright 2013 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from test import TestCase, run_test
+from vertigo.dedupe import DedupeWindow, Deduplicator
+
+class DedupeTestCase(TestCase):
+    """A message deduplication test case."""
+    def test_window_size(self):
+        """Tests that a window only remembers the most recent keys."""
+        window = DedupeWindow(window=2)
+        self.assert_equals([False, True, False, False, False], [window.seen(key) for key in ['a', 'a', 'b', 'c', 'a']])
+        self.assert_equals(2, len(window))
+        self.complete()
+
+    def test_window_recent(self):
+        """Tests that repeated keys are moved to the back of the window."""
+        window = DedupeWindow(window=2)
+        self.assert_equals([False, False, True, False, True, False], [window.seen(key) for key in ['a', 'b', 'a', 'c', 'a', 'b']])
+        self.assert_equals(2, len(window))
+        self.assert_true('a' in window)
+        self.assert_false('c' in window)
+        self.complete()
+
+    def test_window_compact(self):
+        """Tests that a hot key does not grow the eviction queue."""
+        window = DedupeWindow(window=2)
+        for i in range(1000):
+            window.seen('hot')
+        self.assert_true(len(window._order) <= 2 * len(window) + 33)
+        self.assert_false(window.seen('cold'))
+        self.assert_false(window.seen('other'))
+        self.assert_false('hot' in window)
+        self.complete()
+
+    def test_window_ttl(self):
+        """Tests that a window forgets keys a ttl after they were last seen."""
+        now = [0.0]
+        window = DedupeWindow(ttl=10, clock=lambda: now[0])
+        self.assert_false(window.seen('a'))
+        now[0] = 5.0
+        self.assert_true(window.seen('a'))
+        now[0] = 10.0
+        self.assert_true(window.seen('a'))
+        now[0] = 20.0
+        self.assert_false(window.seen('a'))
+        self.complete()
+
+    def test_filter(self):
+        """Tests filtering duplicate messages."""
+        messages = []
+        handler = Deduplicator('id', window=10).filter(messages.append)
+        for message in [{'id': 1}, {'id': 2}, {'id': 1}]:
+            handler(message)
+        self.assert_equals([{'id': 1}, {'id': 2}], messages)
+        self.complete()
+
+run_test(DedupeTestCase())
@@ -0,0 +1,49 @@
+# Copyright 2013 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from test import TestCase, run_test
+from vertigo.flow import AdaptiveQueueSize
+
+class Clock(object):
+    """A manually advanced clock."""
+    def __init__(self):
+        self.time = 0.0
+    def __call__(self):
+        return self.time
+
+class FlowTestCase(TestCase):
+    """A flow control test case."""
+    def test_adaptive_increase(self):
+        """Tests that fast drains grow the queue size."""
+        clock = Clock()
+        adaptive = AdaptiveQueueSize(1000, min_size=100, max_size=1150, target_latency_ms=50, step=100, clock=clock)
+        for i in range(3):
+            adaptive.full()
+            clock.time += 0.01
+            adaptive.drained()
+        self.assert_equals(1150, adaptive.size)
+        self.complete()
+
+    def test_adaptive_decrease(self):
+        """Tests that slow drains shrink the queue size."""
+        clock = Clock()
+        sizes = []
+        adaptive = AdaptiveQueueSize(1000, min_size=200, target_latency_ms=50, factor=0.5, on_resize=sizes.append, clock=clock)
+        for i in range(3):
+            adaptive.full()
+            clock.time += 0.1
+            adaptive.drained()
+        self.assert_equals([500, 250, 200], sizes)
+        self.complete()
+
+run_test(FlowTestCase())
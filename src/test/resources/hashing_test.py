@@ -0,0 +1,42 @@
+# Copyright 2014 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from test import TestCase, run_test
+from vertigo.hashing import hash32, hash128
+
+class HashingTestCase(TestCase):
+    """A stable hashing test case."""
+    def test_strings(self):
+        """Tests that equal str and unicode strings hash alike."""
+        self.assert_equals(hash32('foo'), hash32(u'foo'))
+        self.assert_equals(hash32('\xc3\xa9'), hash32(u'\xe9'))
+        self.assert_equals(hash128('foo'), hash128(u'foo'))
+        self.assert_true(hash32('foo') != hash32('bar'))
+        self.complete()
+
+    def test_integers(self):
+        """Tests that equal int and long values hash alike."""
+        self.assert_equals(hash32(5), hash32(5L))
+        self.assert_equals(hash128(5), hash128(5L))
+        self.assert_equals(hash32(2 ** 40), hash32(long(2 ** 40)))
+        self.assert_true(hash32(True) != hash32(1))
+        self.complete()
+
+    def test_tuples(self):
+        """Tests that tuples hash by their normalized items."""
+        self.assert_equals(hash32(('foo', 5)), hash32((u'foo', 5L)))
+        self.assert_equals(hash32((5,)), hash32((5L,)))
+        self.assert_true(hash32((5,)) != hash32(5))
+        self.complete()
+
+run_test(HashingTestCase())
@@ -0,0 +1,54 @@
+# Copyright 2014 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from test import TestCase, run_test
+from vertigo.histogram import Histogram
+
+class HistogramTestCase(TestCase):
+    """A latency histogram test case."""
+    def test_percentiles(self):
+        """Tests that percentiles are within the histogram's precision."""
+        histogram = Histogram(sub_buckets=64)
+        for value in range(1, 10001):
+            histogram.record(value)
+        self.assert_equals(10000, histogram.count)
+        self.assert_equals(1, histogram.min)
+        self.assert_equals(10000, histogram.max)
+        self.assert_true(abs(histogram.percentile(50) - 5000) <= 5000 / 64.0)
+        self.assert_true(abs(histogram.percentile(99) - 9900) <= 9900 / 64.0)
+        self.complete()
+
+    def test_bounded(self):
+        """Tests that values above the highest trackable value are clamped."""
+        histogram = Histogram(sub_buckets=16, highest=1000)
+        histogram.record(10 ** 9)
+        histogram.record(-5)
+        self.assert_equals(1000, histogram.max)
+        self.assert_equals(0, histogram.min)
+        self.assert_equals(2, len(histogram.counts))
+        self.complete()
+
+    def test_merge(self):
+        """Tests merging histograms and their dictionaries."""
+        first, second = Histogram(), Histogram()
+        for value in range(100):
+            first.record(value)
+            second.record(value + 1000)
+        merged = Histogram.from_dict(first.to_dict()).merge(second.to_dict())
+        self.assert_equals(200, merged.count)
+        self.assert_equals(0, merged.min)
+        self.assert_equals(1099, merged.max)
+        self.assert_equals(first.percentile(100), merged.percentile(50))
+        self.complete()
+
+run_test(HistogramTestCase())
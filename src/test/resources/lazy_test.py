@@ -0,0 +1,78 @@
+# Copyright 2014 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from test import TestCase, run_test
+from vertigo.convert import map_to_vertx
+from vertigo.lazy import lazy_from_vertx, LazyObject, LazyArray
+
+class LazyTestCase(TestCase):
+    """A lazy message view test case."""
+    def create_view(self):
+        return lazy_from_vertx(map_to_vertx({'name': u'foo', 'count': 3, 'empty': None,
+                                             'nested': {'items': [1, [2, 3], {'id': 4}]}}))
+
+    def test_fields(self):
+        """Tests reading fields from a lazy view."""
+        view = self.create_view()
+        self.assert_true(isinstance(view, LazyObject))
+        self.assert_equals(u'foo', view['name'])
+        self.assert_equals(3, view['count'])
+        self.assert_null(view['empty'])
+        self.assert_true('empty' in view)
+        self.assert_false('missing' in view)
+        self.assert_equals(5, view.get('missing', 5))
+        self.assert_equals(['count', 'empty', 'name', 'nested'], sorted(view.keys()))
+        try:
+            view['missing']
+        except KeyError:
+            pass
+        else:
+            self.assert_true(False)
+        try:
+            view['name'] = 'bar'
+        except TypeError:
+            pass
+        else:
+            self.assert_true(False)
+        self.complete()
+
+    def test_cache(self):
+        """Tests that converted fields are cached."""
+        view = self.create_view()
+        nested = view['nested']
+        self.assert_true(nested is view['nested'])
+        self.assert_true(nested['items'] is view['nested']['items'])
+        self.assert_true(nested['items'][2] is nested['items'][2])
+        self.complete()
+
+    def test_nested_arrays(self):
+        """Tests reading nested arrays from a lazy view."""
+        items = self.create_view()['nested']['items']
+        self.assert_true(isinstance(items, LazyArray))
+        self.assert_equals(3, len(items))
+        self.assert_equals(1, items[0])
+        self.assert_equals([2, 3], items[1])
+        self.assert_equals(3, items[1][-1])
+        self.assert_equals(4, items[-1]['id'])
+        self.assert_equals([1, [2, 3]], items[:2])
+        self.assert_true(3 in items[1])
+        try:
+            items[3]
+        except IndexError:
+            pass
+        else:
+            self.assert_true(False)
+        self.assert_equals([1, [2, 3], {'id': 4}], items.to_list())
+        self.complete()
+
+run_test(LazyTestCase())
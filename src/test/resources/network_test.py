@@ -30,6 +30,28 @@ class NetworkTestCase(TestCase):
         self.assert_equals('test_verticle3.py', component2.main)
         self.complete()
 
+    def test_apply_advice(self):
+        """Tests applying blocking advice to verticle, module and unknown components."""
+        network = vertigo.create_network('test-advice')
+        verticle = network.add_verticle('verticle', main='test_verticle1.py')
+        other = network.add_verticle('other', main='test_verticle2.py')
+        network.add_module('module', module='net.kuujo~test-module~1.0')
+        updated = network.apply_advice([
+            {'network': 'test-advice', 'component': 'verticle', 'worker': True, 'multi_threaded': True},
+            {'network': 'test-advice', 'component': 'module', 'worker': True},
+            {'network': 'test-advice', 'component': 'unknown', 'worker': True},
+            {'network': 'other-network', 'component': 'other', 'worker': True},
+        ])
+        self.assert_equals(['verticle'], [component.name for component in updated])
+        self.assert_true(verticle.worker)
+        self.assert_true(verticle.multi_threaded)
+        self.assert_false(other.worker)
+        updated = network.apply_advice({'component': 'other', 'worker': True})
+        self.assert_equals(['other'], [component.name for component in updated])
+        self.assert_true(other.worker)
+        self.assert_false(other.multi_threaded)
+        self.complete()
+
     def test_basic_send(self):
         """Test sending a basic message between two components."""
         network = vertigo.create_network('test-basic')
@@ -69,4 +91,95 @@ class NetworkTestCase(TestCase):
             cluster.deploy_network(network, handler=deploy_handler)
         vertigo.deploy_cluster('test_batch_send', handler=cluster_handler)
 
+    def test_many_send(self):
+        """Test sending a sequence of messages between two components."""
+        network = vertigo.create_network('test-many')
+        network.add_verticle('sender', main='test_many_sender.py')
+        network.add_verticle('receiver', main='test_many_receiver.py')
+        network.create_connection(('sender', 'out'), ('receiver', 'in'))
+        def cluster_handler(error, cluster):
+            self.assert_null(error)
+            def deploy_handler(error, network):
+                self.assert_null(error)
+            cluster.deploy_network(network, handler=deploy_handler)
+        vertigo.deploy_cluster('test_many_send', handler=cluster_handler)
+
+    def test_stream_send(self):
+        """Test streaming messages through a small send queue."""
+        network = vertigo.create_network('test-stream')
+        network.add_verticle('sender', main='test_stream_sender.py')
+        network.add_verticle('receiver', main='test_stream_receiver.py')
+        network.create_connection(('sender', 'out'), ('receiver', 'in'))
+        def cluster_handler(error, cluster):
+            self.assert_null(error)
+            def deploy_handler(error, network):
+                self.assert_null(error)
+            cluster.deploy_network(network, handler=deploy_handler)
+        vertigo.deploy_cluster('test_stream_send', handler=cluster_handler)
+
+    def test_batch_message_receive(self):
+        """Test receiving messages in lists between two components."""
+        network = vertigo.create_network('test-batch-message')
+        network.add_verticle('sender', main='test_many_sender.py')
+        network.add_verticle('receiver', main='test_batch_message_receiver.py')
+        network.create_connection(('sender', 'out'), ('receiver', 'in'))
+        def cluster_handler(error, cluster):
+            self.assert_null(error)
+            def deploy_handler(error, network):
+                self.assert_null(error)
+            cluster.deploy_network(network, handler=deploy_handler)
+        vertigo.deploy_cluster('test_batch_message_receive', handler=cluster_handler)
+
+    def test_executor_receive(self):
+        """Test handling messages on a thread pool with per-key ordering."""
+        network = vertigo.create_network('test-executor')
+        network.add_verticle('sender', main='test_many_sender.py')
+        network.add_verticle('receiver', main='test_executor_receiver.py')
+        network.create_connection(('sender', 'out'), ('receiver', 'in'))
+        def cluster_handler(error, cluster):
+            self.assert_null(error)
+            def deploy_handler(error, network):
+                self.assert_null(error)
+            cluster.deploy_network(network, handler=deploy_handler)
+        vertigo.deploy_cluster('test_executor_receive', handler=cluster_handler)
+
+    def test_bulk_group_send(self):
+        """Test sending and collecting nested groups in bulk."""
+        network = vertigo.create_network('test-bulk-group')
+        network.add_verticle('sender', main='test_bulk_group_sender.py')
+        network.add_verticle('receiver', main='test_bulk_group_receiver.py')
+        network.create_connection(('sender', 'out'), ('receiver', 'in'))
+        def cluster_handler(error, cluster):
+            self.assert_null(error)
+            def deploy_handler(error, network):
+                self.assert_null(error)
+            cluster.deploy_network(network, handler=deploy_handler)
+        vertigo.deploy_cluster('test_bulk_group_send', handler=cluster_handler)
+
+    def test_coalesce_send(self):
+        """Test coalescing messages by size and by delay into plain message handlers."""
+        network = vertigo.create_network('test-coalesce')
+        network.add_verticle('sender', main='test_coalesce_sender.py')
+        network.add_verticle('receiver', main='test_coalesce_receiver.py')
+        network.create_connection(('sender', 'out'), ('receiver', 'in'))
+        def cluster_handler(error, cluster):
+            self.assert_null(error)
+            def deploy_handler(error, network):
+                self.assert_null(error)
+            cluster.deploy_network(network, handler=deploy_handler)
+        vertigo.deploy_cluster('test_coalesce_send', handler=cluster_handler)
+
+    def test_compressed_send(self):
+        """Test sending compressed messages between two components."""
+        network = vertigo.create_network('test-compressed')
+        network.add_verticle('sender', main='test_compressed_sender.py')
+        network.add_verticle('receiver', main='test_compressed_receiver.py')
+        network.create_connection(('sender', 'out'), ('receiver', 'in'))
+        def cluster_handler(error, cluster):
+            self.assert_null(error)
+            def deploy_handler(error, network):
+                self.assert_null(error)
+            cluster.deploy_network(network, handler=deploy_handler)
+        vertigo.deploy_cluster('test_compressed_send', handler=cluster_handler)
+
 run_test(NetworkTestCase())
@@ -0,0 +1,64 @@
+# Copyright 2014 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from test import TestCase, run_test
+from vertigo.convert import map_to_vertx
+from vertigo.compression import compressor, is_compressed
+from vertigo.partition import key_extractor, key_hash, partitioner
+
+class PartitionTestCase(TestCase):
+    """A keyed partitioning test case."""
+    def test_key_extractor(self):
+        """Tests extracting keys by field paths and functions."""
+        message = {'user': {'id': 10, 'name': 'foo'}, 'score': 1}
+        self.assert_equals(1, key_extractor('score')(message))
+        self.assert_equals(10, key_extractor('user.id')(message))
+        self.assert_null(key_extractor('user.email')(message))
+        self.assert_null(key_extractor('score.value')(message))
+        self.assert_equals('foo', key_extractor(lambda m: m['user']['name'])(message))
+        self.complete()
+
+    def test_key_hash(self):
+        """Tests that key hashes are stable signed 32-bit ints."""
+        self.assert_equals(key_hash('user1'), key_hash(u'user1'))
+        self.assert_equals(key_hash(5), key_hash(5L))
+        for i in range(1000):
+            value = key_hash('user%d' % i)
+            self.assert_true(-2147483648 <= value <= 2147483647)
+        self.complete()
+
+    def test_partitioner(self):
+        """Tests that encoded messages hash by their key only."""
+        encode = partitioner(map_to_vertx, 'user_id')
+        first = encode({'user_id': 'user1', 'body': 'foo'})
+        second = encode({'user_id': 'user1', 'body': 'bar' * 100})
+        other = encode({'user_id': 'user2', 'body': 'foo'})
+        self.assert_equals(first.hashCode(), second.hashCode())
+        self.assert_equals(key_hash('user1'), first.hashCode())
+        self.assert_false(first.hashCode() == other.hashCode())
+        self.assert_equals('bar' * 100, second.getString('body'))
+        self.assert_equals('foo', encode('foo'))
+        self.complete()
+
+    def test_compressed_partitioner(self):
+        """Tests that compressed messages keep hashing by their key."""
+        encode = partitioner(compressor(map_to_vertx, threshold=64), 'user_id')
+        small = encode({'user_id': 'user1', 'body': 'foo'})
+        large = encode({'user_id': 'user1', 'body': 'bar' * 100})
+        self.assert_false(is_compressed(small))
+        self.assert_true(is_compressed(large))
+        self.assert_equals(key_hash('user1'), small.hashCode())
+        self.assert_equals(key_hash('user1'), large.hashCode())
+        self.complete()
+
+run_test(PartitionTestCase())
@@ -0,0 +1,66 @@
+# Copyright 2014 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from test import TestCase, run_test
+from vertigo.profiler import Profiler
+from vertigo import profiler as profiling
+
+def busy():
+    total = 0
+    for i in range(10000):
+        total += i
+    return total
+
+class ProfilerTestCase(TestCase):
+    """A handler profiler test case."""
+    def test_sampling(self):
+        """Tests that a sample of invocations is profiled."""
+        profiler = Profiler(sample_rate=0.5).enable()
+        results = []
+        handler = profiler.wrap('handler', lambda message: results.append(busy()))
+        for i in range(10):
+            handler(i)
+        profile = profiler.handlers['handler']
+        self.assert_equals(10, len(results))
+        self.assert_equals(10, profile.calls)
+        self.assert_equals(5, profile.samples)
+        elapsed, stack = profile.hottest(1)[0]
+        self.assert_true(stack[-1].startswith('busy '))
+        self.complete()
+
+    def test_disable(self):
+        """Tests that a disabled profiler does not count invocations."""
+        profiler = Profiler(sample_rate=1)
+        handler = profiler.wrap('handler', lambda message: None)
+        handler(1)
+        profiler.enable()
+        handler(2)
+        profiler.disable()
+        handler(3)
+        self.assert_equals(1, profiler.handlers['handler'].calls)
+        self.assert_true('handler: 1 calls, 1 sampled' in profiler.report())
+        self.complete()
+
+    def test_wrap_before_start(self):
+        """Tests that handlers wrapped before profiling starts are profiled."""
+        handler = profiling.wrap('early handler', lambda message: None)
+        handler(1)
+        started = profiling.start(sample_rate=1)
+        handler(2)
+        profiling.stop()
+        handler(3)
+        self.assert_equals(1, started.handlers['early handler'].calls)
+        self.assert_equals(1, started.handlers['early handler'].samples)
+        self.complete()
+
+run_test(ProfilerTestCase())
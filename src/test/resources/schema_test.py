@@ -0,0 +1,53 @@
+# Copyright 2013 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from test import TestCase, run_test
+from vertigo.schema import compile_schema, SchemaError
+
+SCHEMA = {
+    'id': int,
+    'name': str,
+    'score': float,
+    'tags': [str],
+    'position': {'x': int, 'y': int},
+}
+
+class SchemaTestCase(TestCase):
+    """A message schema test case."""
+    def test_encode_decode(self):
+        """Tests encoding and decoding a message with a schema."""
+        codec = compile_schema(SCHEMA)
+        message = {'id': 1, 'name': 'foo', 'score': 1.5, 'tags': ['a', 'b'], 'position': {'x': 1, 'y': 2}}
+        self.assert_equals(message, codec.decode(codec.encode(message)))
+        self.complete()
+
+    def test_encode_invalid(self):
+        """Tests encoding messages that do not match a schema."""
+        codec = compile_schema(SCHEMA)
+        message = {'id': 1, 'name': 'foo', 'score': 1.5, 'tags': ['a', 'b'], 'position': {'x': 1, 'y': 2}}
+        invalid = [
+            dict(message, id='1'),
+            dict(message, extra=True),
+            dict(message, tags=['a', 1]),
+            dict(message, position={'x': 1}),
+        ]
+        for value in invalid:
+            try:
+                codec.encode(value)
+            except SchemaError:
+                pass
+            else:
+                self.assert_true(False, "Expected a schema error for %r" % (value,))
+        self.complete()
+
+run_test(SchemaTestCase())
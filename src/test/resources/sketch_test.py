@@ -0,0 +1,57 @@
+# Copyright 2014 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from test import TestCase, run_test
+from vertigo.sketch import CountMin, SpaceSaving, HyperLogLog, merge
+
+class SketchTestCase(TestCase):
+    """A probabilistic sketch test case."""
+    def test_count_min(self):
+        """Tests that Count-Min estimates never undercount and merge."""
+        first, second = CountMin(width=512, depth=4), CountMin(width=512, depth=4)
+        for i in range(2000):
+            first.add('item%d' % (i % 100))
+            second.add('item%d' % (i % 50))
+        merged = merge([first, second.to_dict()])
+        self.assert_equals(4000, merged.total)
+        self.assert_true(merged.estimate('item0') >= 60)
+        self.assert_true(merged.estimate('item99') >= 20)
+        self.assert_true(merged.estimate('item99') < 40)
+        self.complete()
+
+    def test_space_saving(self):
+        """Tests that Space-Saving keeps the heavy hitters."""
+        first, second = SpaceSaving(k=10), SpaceSaving(k=10)
+        for i in range(1000):
+            first.add('heavy')
+            first.add('item%d' % i)
+            second.add('heavy' if i % 2 else 'other')
+        merged = merge([first, second])
+        item, count, error = merged.top(1)[0]
+        self.assert_equals('heavy', item)
+        self.assert_true(count - error <= 1500 <= count)
+        self.assert_equals(10, len(merged.counters))
+        self.complete()
+
+    def test_hyperloglog(self):
+        """Tests HyperLogLog distinct counts and merges."""
+        first, second = HyperLogLog(precision=12), HyperLogLog(precision=12)
+        for i in range(10000):
+            first.add(i)
+            second.add(i + 5000)
+        merged = merge([first.to_dict(), second.to_dict()])
+        self.assert_true(abs(merged.count() - 15000) < 15000 * 0.05)
+        self.assert_equals(0, HyperLogLog().count())
+        self.complete()
+
+run_test(SketchTestCase())
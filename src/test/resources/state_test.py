@@ -0,0 +1,119 @@
+# Copyright 2014 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os, tempfile
+from test import TestCase, run_test
+from vertigo.state import StateStore, DiskTable
+
+class StateTestCase(TestCase):
+    """A state store test case."""
+    def test_spill(self):
+        """Tests that cold keys are spilled to disk and loaded again."""
+        store = StateStore(os.path.join(tempfile.mkdtemp(), 'state'), max_bytes=2048)
+        for i in range(500):
+            store['key%d' % i] = i
+        self.assert_true(store.bytes <= 2048)
+        self.assert_true(store.spills > 0)
+        for i in range(500):
+            store['key%d' % i] = store['key%d' % i] + 1
+        self.assert_equals(500, len(store))
+        self.assert_equals(1, store['key0'])
+        self.assert_equals(500, store['key499'])
+        store.close()
+        self.complete()
+
+    def test_delete(self):
+        """Tests deleting hot and spilled keys."""
+        store = StateStore(os.path.join(tempfile.mkdtemp(), 'state'), max_bytes=512)
+        for i in range(50):
+            store[i] = 'value%d' % i
+        del store[0]
+        del store[49]
+        self.assert_false(0 in store)
+        self.assert_false(49 in store)
+        self.assert_equals(48, len(store))
+        self.assert_equals('value1', store.get(1))
+        store.close()
+        self.complete()
+
+    def test_spill_mixed_keys(self):
+        """Tests that spilled keys are found by equal keys of other types."""
+        store = StateStore(os.path.join(tempfile.mkdtemp(), 'state'), max_bytes=512)
+        store['user'] = 'str'
+        store[5] = 'int'
+        store[(u'pair', 7L)] = 'tuple'
+        for i in range(100):
+            store['filler%d' % i] = i
+        self.assert_true(store.spills > 0)
+        self.assert_equals('str', store[u'user'])
+        self.assert_equals('int', store[5L])
+        self.assert_equals('tuple', store[('pair', 7)])
+        self.assert_true(u'user' in store)
+        self.assert_equals(103, len(store))
+        for i in range(100):
+            store['filler%d' % i] = i
+        del store[5L]
+        self.assert_false(5 in store)
+        self.assert_equals(102, len(store))
+        store.close()
+        self.complete()
+
+    def test_delete_missing(self):
+        """Tests that deleting a missing key is not recorded as a change."""
+        store = StateStore(os.path.join(tempfile.mkdtemp(), 'state'), max_bytes=512)
+        store['foo'] = 'bar'
+        store.changes()
+        try:
+            del store['nope']
+        except KeyError:
+            pass
+        else:
+            self.assert_true(False)
+        self.assert_equals(({}, []), store.changes())
+        store.close()
+        self.complete()
+
+    def test_iterate(self):
+        """Tests iterating over hot and spilled keys."""
+        store = StateStore(os.path.join(tempfile.mkdtemp(), 'state'), max_bytes=1024)
+        for i in range(200):
+            store[i] = i * 2
+        store[0] = 'hot'
+        self.assert_equals(range(200), sorted(store))
+        self.assert_equals(200, len(store))
+        values = dict(store.scan())
+        self.assert_equals('hot', values[0])
+        self.assert_equals(398, values[199])
+        store.close()
+        self.complete()
+
+    def test_disk_table(self):
+        """Tests growing, updating and compacting a disk table."""
+        table = DiskTable(os.path.join(tempfile.mkdtemp(), 'table'))
+        for i in range(2000):
+            table['key%d' % i] = 'x' * 1024
+        for i in range(2000):
+            table['key%d' % i] = str(i)
+        for i in range(0, 2000, 2):
+            del table['key%d' % i]
+        self.assert_equals(1000, len(table))
+        self.assert_equals('1', table.get('key1'))
+        self.assert_true(table.get('key0') is None)
+        self.assert_false('key1998' in table)
+        self.assert_equals(1000, len(list(table.iteritems())))
+        table.sync()
+        self.assert_true(os.path.getsize(table.path + '.dat') < 1572864)
+        table.close()
+        self.complete()
+
+run_test(StateTestCase())
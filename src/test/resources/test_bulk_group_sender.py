@@ -0,0 +1,21 @@
+# Copyright 2014 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from vertigo import component, output
+
+@component.start_handler
+def start_handler(error):
+    # The done message is only sent once every nested group has been sent.
+    def sent():
+        output.send('out', 'done')
+    output.send_group('out', 'sentences', [['foo', 'bar'], ['baz'], ['a', 'b', 'c']], nested='words', handler=sent)
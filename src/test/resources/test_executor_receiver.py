@@ -0,0 +1,30 @@
+# Copyright 2014 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from vertigo import input, executor
+from test import Test, Assert
+
+pool = executor.pool(threads=4, max_pending=100, lanes=8)
+received = {}
+
+def check(count):
+    lane = received.setdefault(count % 8, [])
+    if lane:
+        Assert.true(lane[-1] < count)
+    lane.append(count)
+    if sum([len(counts) for counts in received.values()]) == 1000:
+        Test.complete()
+
+@input.message_handler(port='in', executor=pool, key=lambda message: message['count'] % 8)
+def message_handler(message):
+    pool.run_on_context(check, message['count'])
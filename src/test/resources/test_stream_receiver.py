@@ -0,0 +1,28 @@
+# Copyright 2014 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from vertigo import input
+from test import Test, Assert
+
+received = []
+
+@input.message_handler(port='in')
+def message_handler(message):
+    if 'done' in message:
+        Assert.equals(len(received), 100)
+        Assert.equals(message['done'], 1)
+        Assert.true(message['drains'] > 0)
+        Test.complete()
+    else:
+        Assert.equals(len(received), message['count'])
+        received.append(message['count'])
@@ -0,0 +1,34 @@
+# Copyright 2014 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from vertigo import component, output
+
+output.port('out').send_queue_max_size = 2
+
+drains = []
+completions = []
+
+@output.drain_handler(port='out')
+def drain_handler():
+    drains.append(1)
+
+def messages():
+    for i in range(100):
+        yield {'count': i}
+
+@component.start_handler
+def start_handler(error):
+    def complete():
+        completions.append(1)
+        output.send('out', {'done': len(completions), 'drains': len(drains)})
+    output.stream('out', messages(), on_complete=complete)
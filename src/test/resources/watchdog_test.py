@@ -0,0 +1,93 @@
+# Copyright 2014 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from test import TestCase, run_test
+from vertigo.watchdog import BlockingDetector
+
+class WatchdogTestCase(TestCase):
+    """A blocking detector test case."""
+    def create_detector(self, **kwargs):
+        self.now, self.reports = [0], []
+        def blocked(handler, elapsed, first):
+            self.reports.append((handler.name, elapsed, first))
+        return BlockingDetector(threshold_ms=100, on_blocked=blocked, clock=lambda: self.now[0], **kwargs)
+
+    def block_for(self, handler, elapsed_ms, check=True):
+        """Runs a handler that blocks for elapsed_ms, checking it while it blocks."""
+        def block(message):
+            self.now[0] += elapsed_ms * 1000000
+            if check:
+                self.watched.check()
+        handler(block)
+
+    def test_threshold(self):
+        """Tests that only handlers blocking past the threshold are reported."""
+        detector = self.watched = self.create_detector()
+        handler = detector.wrap('handler', lambda block: block(None))
+        self.block_for(handler, 50)
+        self.assert_equals([], self.reports)
+        self.block_for(handler, 150)
+        self.block_for(handler, 300)
+        self.assert_equals([('handler', 150, True), ('handler', 300, False)], self.reports)
+        blocked = detector.blocked['handler']
+        self.assert_equals(2, blocked.count)
+        self.assert_equals(300.0, blocked.max)
+        self.assert_true(blocked.stack is not None)
+        self.complete()
+
+    def test_unchecked(self):
+        """Tests that handlers ending past the threshold before a check are reported."""
+        detector = self.watched = self.create_detector()
+        handler = detector.wrap('handler', lambda block: block(None))
+        self.block_for(handler, 150, check=False)
+        self.assert_equals([('handler', 150, True)], self.reports)
+        self.assert_null(detector.blocked['handler'].stack)
+        self.complete()
+
+    def test_run_on_context(self):
+        """Tests that watchdog reports are handed to the component's context."""
+        pending = []
+        def run_on_context(function, *args):
+            pending.append((function, args))
+        detector = self.watched = self.create_detector(run_on_context=run_on_context)
+        handler = detector.wrap('handler', lambda block: block(None))
+        self.block_for(handler, 150)
+        self.assert_equals([], self.reports)
+        self.assert_equals(0, detector.blocked['handler'].count)
+        self.assert_equals(1, len(pending))
+        function, args = pending.pop()
+        function(*args)
+        self.assert_equals([('handler', 150, True)], self.reports)
+        self.assert_equals(1, detector.blocked['handler'].count)
+        self.assert_true(detector.blocked['handler'].stack is not None)
+        self.complete()
+
+    def test_advice(self):
+        """Tests deployment advice for blocking handlers."""
+        detector = self.watched = self.create_detector(multi_threaded=True)
+        self.assert_equals([], detector.advice('network', 'component'))
+        handler = detector.wrap('handler', lambda block: block(None))
+        self.block_for(handler, 200)
+        advice = detector.advice('network', 'component')
+        self.assert_equals(1, len(advice))
+        self.assert_equals('network', advice[0]['network'])
+        self.assert_equals('component', advice[0]['component'])
+        self.assert_equals('handler', advice[0]['handler'])
+        self.assert_equals(1, advice[0]['count'])
+        self.assert_equals(200.0, advice[0]['max_ms'])
+        self.assert_true(advice[0]['worker'])
+        self.assert_true(advice[0]['multi_threaded'])
+        self.assert_equals('worker = True and multi_threaded = True', detector.recommendation())
+        self.complete()
+
+run_test(WatchdogTestCase())
@@ -0,0 +1,53 @@
+# Copyright 2014 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from test import TestCase, run_test
+from vertigo.window import Windows, Count, Sum, Max
+
+class Clock(object):
+    """A manually advanced clock."""
+    def __init__(self):
+        self.time = 0
+    def __call__(self):
+        return self.time
+
+class WindowTestCase(TestCase):
+    """A window aggregation test case."""
+    def test_tumbling(self):
+        """Tests aggregating keyed messages over tumbling windows."""
+        clock = Clock()
+        results = []
+        windows = Windows(1000, key='word', aggregates={'count': Count(), 'total': Sum('n')}, emit=results.append, clock=clock)
+        for time, word, n in [(100, 'a', 1), (200, 'b', 2), (300, 'a', 3), (1200, 'a', 4)]:
+            clock.time = time
+            windows.add({'word': word, 'n': n})
+        self.assert_equals(2, len(windows.close(1000)))
+        results.sort(lambda x, y: cmp(x['key'], y['key']))
+        self.assert_equals({'start': 0, 'end': 1000, 'key': 'a', 'count': 2, 'total': 4}, results[0])
+        self.assert_equals({'start': 0, 'end': 1000, 'key': 'b', 'count': 1, 'total': 2}, results[1])
+        self.assert_equals([1000], windows.windows.keys())
+        self.complete()
+
+    def test_sliding(self):
+        """Tests that messages are aggregated in each overlapping window."""
+        clock = Clock()
+        windows = Windows(1000, 500, aggregates={'max': Max()}, clock=clock)
+        for time, value in [(100, 1), (600, 5), (1100, 3)]:
+            clock.time = time
+            windows.add(value)
+        results = windows.close(1500)
+        self.assert_equals([(-500, 1), (0, 5), (500, 5)], [(result['start'], result['max']) for result in results])
+        self.assert_equals(2000, windows.next_close())
+        self.complete()
+
+run_test(WindowTestCase())